@@ -1,20 +1,30 @@
 import os
 import sys
-from flask import Flask, render_template, request, jsonify
+import json
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 from dotenv import load_dotenv
 from neo4j import GraphDatabase
 
 # Setup Path agar modul src terbaca
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from src.modules.rag.retriever import GraphRetriever
-from src.modules.rag.generator import RAGGenerator
+from src.core.metrics import REGISTRY, collect_timings, span, summarize_timings
+from src.core.singleflight import SingleFlight, ask_key
+from src.modules.rag.retriever import GraphRetriever, load_vector_index
+from src.modules.rag.generator import BEST_OF_N_MAX, GENERATION_MODES, RAGGenerator, valid_n_drafts
+from src.modules.rag.answer_cache import AnswerCache
+from src.modules.rag.graph_store import on_document_ingested
+from src.modules.rag.graph_view import GraphView
+from src.modules.auditor.batch import BatchAuditRunner
 
 # Load Environment
 load_dotenv()
 
 app = Flask(__name__)
 
+# Pertanyaan identik yang masuk bersamaan (misal satu tim klik pertanyaan yang sama) cukup diproses sekali
+ask_flight = SingleFlight("ask")
+
 # --- INISIALISASI SISTEM (Hanya sekali saat server nyala) ---
 try:
     uri = os.getenv("NEO4J_URI")
@@ -22,8 +32,22 @@ try:
     password = os.getenv("NEO4J_PASSWORD")
     
     driver = GraphDatabase.driver(uri, auth=(user, password))
-    retriever = GraphRetriever(driver)
-    generator = RAGGenerator()
+    # Index vektor lokal (opsional, VECTOR_INDEX_PATH): vector search tanpa membebani Neo4j
+    vector_index = load_vector_index()
+    if vector_index is not None:
+        on_document_ingested(vector_index.mark_dirty)
+    retriever = GraphRetriever(driver, vector_index=vector_index)
+    # Ukuran dokumen (untuk pencarian per dokumen) di-cache, reset saat dokumen di-ingest ulang
+    on_document_ingested(retriever.invalidate_document)
+    # Cache jawaban semantik: pertanyaan mirip + pasal sama -> jawaban instan
+    answer_cache = AnswerCache(retriever.embedder)
+    on_document_ingested(answer_cache.invalidate_document)
+    generator = RAGGenerator(answer_cache=answer_cache)
+    # Data graph /get-graph di-cache per (dokumen, set pasal)
+    graph_view = GraphView(driver)
+    on_document_ingested(graph_view.invalidate_document)
+    # Checklist audit (banyak pertanyaan sekaligus) sebagai job di background
+    batch_runner = BatchAuditRunner(retriever, generator)
     print("✅ Flask siap! Terkoneksi ke Neo4j.")
 except Exception as e:
     print(f"❌ Gagal koneksi Database: {e}")
@@ -42,89 +66,201 @@ def ask():
 
     data = request.json
     user_question = data.get('question')
+    # Mode generate per request: "sequential" (default) atau "parallel" (Best-of-N)
+    mode = data.get('mode')
+    n_drafts = data.get('n_drafts')
+    # Opsional: batasi pencarian ke satu dokumen (filename), misal saat mengaudit satu kontrak
+    document = data.get('document') or None
+    # Opsional: sertakan rincian waktu per tahap di response ({"timings": true} atau ?timings=1)
+    want_timings = bool(data.get('timings')) or request.args.get('timings') == '1'
 
     if not user_question:
         return jsonify({"error": "Pertanyaan kosong"}), 400
+    if mode and mode not in GENERATION_MODES:
+        return jsonify({"error": f"Mode harus salah satu dari: {', '.join(GENERATION_MODES)}"}), 400
+    if not valid_n_drafts(n_drafts):
+        return jsonify({"error": f"'n_drafts' harus bilangan bulat 1-{BEST_OF_N_MAX}"}), 400
+    if document is not None and not isinstance(document, str):
+        return jsonify({"error": "'document' harus berupa nama file"}), 400
 
-    print(f"📩 Menerima pertanyaan: {user_question}")
+    print(f"📩 Menerima pertanyaan: {user_question}" + (f" (dokumen: {document})" if document else ""))
 
-    try:
+    def answer():
         # 1. Retrieve (Cari Pasal)
-        context = retriever.retrieve(user_question, top_k=3)
-        
-        if not context:
-            return jsonify({
-                "answer": "Maaf, saya tidak menemukan pasal yang relevan dalam dokumen kontrak ini.",
-                "sources": []
-            })
+        context, retrieval_stats = retriever.retrieve(user_question, top_k=3, return_stats=True, document=document)
+        # 2. Generate
+        result = generator.generate_answer_detailed(user_question, context, mode=mode, n_drafts=n_drafts) if context else None
+        return context, retrieval_stats, result
 
-        # 2. Generate 
-        answer = generator.generate_answer(user_question, context)
+    try:
+        with collect_timings() as timings, span("ask"):
+            (context, retrieval_stats, result), coalesced = ask_flight.do(
+                ask_key(user_question, document=document, mode=mode, n_drafts=n_drafts), answer)
 
-        # 3. Kirim Balik ke Browser
-        return jsonify({
-            "answer": answer,
-            "sources": context  # Kita kirim juga sumbernya biar keren
-        })
+        if not context:
+            response = {
+                "answer": "Maaf, saya tidak menemukan pasal yang relevan dalam dokumen kontrak ini.",
+                "sources": [],
+                "retrieval": retrieval_stats
+            }
+        else:
+            # 3. Kirim Balik ke Browser (result bisa dipakai bersama request lain, jangan diubah)
+            generation = {key: value for key, value in result.items() if key != "answer"}
+            response = {
+                "answer": result["answer"],
+                "sources": context,  # Kita kirim juga sumbernya biar keren
+                "retrieval": retrieval_stats,
+                "generation": generation  # mode, status, critiques, llm_calls, dst.
+            }
+        if coalesced:
+            response["coalesced"] = True
+        if want_timings:
+            response["timings"] = summarize_timings(timings)
+        return jsonify(response)
 
     except Exception as e:
         print(f"Error: {e}")
         return jsonify({"error": "Terjadi kesalahan internal"}), 500
-    # --- ROUTE BARU: API UNTUK VISUALISASI GRAPH ---
-@app.route('/get-graph', methods=['POST'])
-def get_graph():
-    data = request.json
-    # Kita ambil pasal yang ditemukan dari hasil search sebelumnya
-    # (Di aplikasi real, logic ini bisa lebih kompleks)
-    pasal_list = data.get('pasal_list', []) # List nomor pasal, misal [4, 2]
-    
-    if not pasal_list:
-        return jsonify({"nodes": [], "edges": []})
-
-    # Query Cypher untuk mengambil Pasal DAN Ayat-ayatnya untuk digambar
-    cypher_query = """
-    MATCH (p:Pasal)-[r:BERISI]->(a:Ayat)
-    WHERE p.nomor IN $pasal_list
-    RETURN p.nomor AS pasal, p.judul AS judul, a.teks AS ayat, elementId(a) as ayat_id
+
+# --- ROUTE: METRIK (format teks Prometheus) ---
+@app.route('/metrics')
+def metrics():
+    """Histogram latency per tahap + counter token LLM, retry Critic, dan hit/miss cache."""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+def _sse(event: str, data) -> str:
+    """Format 1 event Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# --- ROUTE 2B: API TANYA JAWAB VERSI STREAMING (SSE) ---
+@app.route('/ask/stream', methods=['POST'])
+def ask_stream():
     """
-    
-    nodes = []
-    edges = []
-    added_nodes = set()
-
-    with driver.session() as session:
-        records = session.run(cypher_query, pasal_list=pasal_list)
-        
-        for record in records:
-            p_id = f"pasal_{record['pasal']}"
-            a_id = f"ayat_{record['ayat_id']}"
-            
-            # 1. Buat Node PASAL (Induk) - Warna Biru
-            if p_id not in added_nodes:
-                nodes.append({
-                    "id": p_id, 
-                    "label": f"Pasal {record['pasal']}\n{record['judul']}", 
-                    "color": "#3498db",
-                    "shape": "box",
-                    "font": {"color": "white"}
+    Urutan event: 'sources' (langsung setelah retrieval) -> 'token' (draft Writer,
+    per potongan) -> 'critique' (hasil review) -> 'final' (jawaban akhir).
+    Kalau gagal di tengah jalan, dikirim event 'error'.
+    """
+    if not driver:
+        return jsonify({"error": "Database tidak terkoneksi."}), 500
+
+    data = request.json
+    user_question = data.get('question')
+    mode = data.get('mode')
+    n_drafts = data.get('n_drafts')
+    document = data.get('document') or None
+
+    if not user_question:
+        return jsonify({"error": "Pertanyaan kosong"}), 400
+    if mode and mode not in GENERATION_MODES:
+        return jsonify({"error": f"Mode harus salah satu dari: {', '.join(GENERATION_MODES)}"}), 400
+    if not valid_n_drafts(n_drafts):
+        return jsonify({"error": f"'n_drafts' harus bilangan bulat 1-{BEST_OF_N_MAX}"}), 400
+    if document is not None and not isinstance(document, str):
+        return jsonify({"error": "'document' harus berupa nama file"}), 400
+
+    print(f"📩 Menerima pertanyaan (stream): {user_question}" + (f" (dokumen: {document})" if document else ""))
+
+    def event_stream():
+        try:
+            # 1. Retrieve (Cari Pasal) -> sumber langsung dikirim ke browser
+            context, retrieval_stats = retriever.retrieve(user_question, top_k=3, return_stats=True,
+                                                          document=document)
+            yield _sse("sources", {"sources": context, "retrieval": retrieval_stats})
+
+            if not context:
+                yield _sse("final", {
+                    "answer": "Maaf, saya tidak menemukan pasal yang relevan dalam dokumen kontrak ini.",
+                    "status": "NO_CONTEXT", "revised": False, "attempts": 0
                 })
-                added_nodes.add(p_id)
-
-            # 2. Buat Node AYAT (Anak) - Warna Kuning
-            # Kita potong teksnya biar gak kepanjangan di layar
-            short_text = record['ayat'][:20] + "..."
-            nodes.append({
-                "id": a_id, 
-                "label": short_text, 
-                "title": record['ayat'], # Tooltip (muncul pas mouse hover)
-                "color": "#f1c40f",
-                "shape": "ellipse"
-            })
-            
-            # 3. Buat Garis Hubung
-            edges.append({"from": p_id, "to": a_id})
-
-    return jsonify({"nodes": nodes, "edges": edges})
+                return
+
+            # 2. Generate (token Writer + verdict Critic)
+            for event in generator.stream_answer(user_question, context, mode=mode, n_drafts=n_drafts):
+                yield _sse(event["event"], event["data"])
+
+        except Exception as e:
+            print(f"Error: {e}")
+            yield _sse("error", {"error": "Terjadi kesalahan internal"})
+
+    return Response(
+        stream_with_context(event_stream()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# --- ROUTE: CHECKLIST AUDIT (BATCH) ---
+@app.route('/audit/batch', methods=['POST'])
+def audit_batch():
+    """
+    Body: {"questions": [...], "document": "kontrak.pdf", "mode": "sequential"}
+    Mengembalikan job_id (202); hasilnya di-polling lewat GET /audit/batch/<job_id>.
+    """
+    if not driver:
+        return jsonify({"error": "Database tidak terkoneksi."}), 500
+
+    data = request.json or {}
+    questions = data.get('questions')
+    mode = data.get('mode')
+    if not isinstance(questions, list):
+        return jsonify({"error": "'questions' harus berupa list"}), 400
+    if mode and mode not in GENERATION_MODES:
+        return jsonify({"error": f"Mode harus salah satu dari: {', '.join(GENERATION_MODES)}"}), 400
+
+    try:
+        job = batch_runner.submit(questions, document=data.get('document'), mode=mode)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    response = jsonify({"job_id": job.job_id, "status": job.status, "total": len(job.questions)})
+    response.status_code = 202
+    response.headers['Location'] = f"/audit/batch/{job.job_id}"
+    return response
+
+@app.route('/audit/batch/<job_id>')
+def audit_batch_status(job_id):
+    if not driver:
+        return jsonify({"error": "Database tidak terkoneksi."}), 500
+    job = batch_runner.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job tidak ditemukan"}), 404
+    return jsonify(job.to_dict())
+
+    # --- ROUTE BARU: API UNTUK VISUALISASI GRAPH ---
+@app.route('/get-graph', methods=['GET', 'POST'])
+def get_graph():
+    if not driver:
+        return jsonify({"error": "Database tidak terkoneksi."}), 500
+
+    # GET /get-graph?document=kontrak.pdf&pasal=4&pasal=2 (bisa di-cache browser via ETag)
+    # atau POST {"document": "kontrak.pdf", "pasal_list": [4, 2]}
+    if request.method == 'GET':
+        document = request.args.get('document')
+        pasal_list = request.args.getlist('pasal')
+    else:
+        data = request.json or {}
+        document = data.get('document')
+        pasal_list = data.get('pasal_list', []) # List nomor pasal, misal [4, 2]
+
+    if not document:
+        return jsonify({"error": "Parameter 'document' wajib diisi"}), 400
+
+    try:
+        graph = graph_view.render(document, pasal_list)
+    except Exception as e:
+        print(f"Error: {e}")
+        return jsonify({"error": "Terjadi kesalahan internal"}), 500
+    if graph is None:
+        return jsonify({"error": f"Dokumen tidak ditemukan: {document}"}), 404
+
+    # Browser sudah punya versi yang sama -> 304 tanpa body
+    if request.if_none_match.contains(graph.etag):
+        response = Response(status=304)
+    else:
+        response = Response(graph.body, mimetype='application/json')
+    response.set_etag(graph.etag)
+    # Boleh disimpan, tapi selalu divalidasi ulang (supaya ingest ulang langsung kelihatan)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
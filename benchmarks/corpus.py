@@ -0,0 +1,82 @@
+import random
+from typing import List, Tuple
+
+# Topik pasal yang umum di PPJB / perjanjian properti: (judul, template ayat, template pertanyaan)
+TOPICS = [
+    ("DEFINISI", [
+        '"Tanah" adalah sebidang tanah seluas {luas} meter persegi yang terletak di {kota}.',
+        '"Bangunan" adalah rumah tinggal tipe {tipe} yang berdiri di atas Tanah.',
+        '"Harga Jual Beli" adalah harga yang disepakati Para Pihak sebagaimana diatur dalam perjanjian ini.',
+    ], ["Apa yang dimaksud dengan tanah dalam perjanjian ini?", "Apa definisi bangunan?"]),
+    ("HARGA DAN CARA PEMBAYARAN", [
+        "Harga jual beli Tanah dan Bangunan adalah sebesar Rp {harga} juta.",
+        "Pembayaran dilakukan secara bertahap sebanyak {tahap} kali melalui rekening bank Penjual.",
+        "Tahap pertama sebesar {persen}% dibayar paling lambat {hari} hari setelah perjanjian ditandatangani.",
+    ], ["Berapa harga jual beli rumah?", "Bagaimana cara pembayaran dilakukan?"]),
+    ("DENDA KETERLAMBATAN", [
+        "Apabila Pembeli terlambat membayar, Pembeli dikenakan denda sebesar {denda}% per hari dari jumlah yang terlambat.",
+        "Denda keterlambatan paling banyak sebesar {maks}% dari harga jual beli.",
+        "Denda wajib dibayar bersamaan dengan pembayaran angsuran berikutnya.",
+    ], ["Berapa denda keterlambatan pembayaran?", "Apa sanksi jika pembeli terlambat membayar?"]),
+    ("SERAH TERIMA", [
+        "Penjual wajib menyerahkan Bangunan kepada Pembeli paling lambat {bulan} bulan setelah pelunasan.",
+        "Serah terima dituangkan dalam berita acara yang ditandatangani Para Pihak.",
+        "Risiko atas Bangunan beralih kepada Pembeli sejak tanggal serah terima.",
+    ], ["Kapan serah terima bangunan dilakukan?", "Kapan risiko beralih ke pembeli?"]),
+    ("PEMBATALAN", [
+        "Perjanjian ini dapat dibatalkan apabila Pembeli tidak membayar selama {bulan} bulan berturut-turut.",
+        "Dalam hal pembatalan, Penjual mengembalikan {persen}% dari uang yang telah dibayarkan.",
+        "Pembatalan harus diberitahukan secara tertulis paling lambat {hari} hari sebelumnya.",
+    ], ["Kapan perjanjian dapat dibatalkan?", "Berapa uang yang dikembalikan jika perjanjian batal?"]),
+    ("KEADAAN MEMAKSA", [
+        "Keadaan memaksa meliputi bencana alam, perang, huru-hara, dan kebijakan pemerintah.",
+        "Pihak yang mengalami keadaan memaksa wajib memberitahukan pihak lain dalam {hari} hari.",
+        "Keterlambatan akibat keadaan memaksa tidak dikenakan denda.",
+    ], ["Apa saja yang termasuk keadaan memaksa?", "Apakah keterlambatan karena bencana dikenakan denda?"]),
+    ("PAJAK DAN BIAYA", [
+        "Pajak Penghasilan atas penjualan ditanggung oleh Penjual.",
+        "Bea Perolehan Hak atas Tanah dan Bangunan ditanggung oleh Pembeli.",
+        "Biaya notaris sebesar Rp {biaya} juta ditanggung bersama oleh Para Pihak.",
+    ], ["Siapa yang menanggung pajak penghasilan?", "Siapa yang membayar biaya notaris?"]),
+    ("PENYELESAIAN SENGKETA", [
+        "Sengketa diselesaikan terlebih dahulu secara musyawarah dalam waktu {hari} hari.",
+        "Apabila musyawarah tidak tercapai, sengketa diselesaikan melalui Pengadilan Negeri {kota}.",
+        "Selama sengketa berlangsung, Para Pihak tetap melaksanakan kewajibannya.",
+    ], ["Bagaimana penyelesaian sengketa diatur?", "Di pengadilan mana sengketa diselesaikan?"]),
+]
+
+KOTA = ["Jakarta Selatan", "Bandung", "Surabaya", "Medan", "Makassar", "Denpasar", "Yogyakarta"]
+
+
+def _fill(template: str, rng: random.Random) -> str:
+    return template.format(
+        luas=rng.randint(60, 500), kota=rng.choice(KOTA), tipe=rng.choice([36, 45, 54, 70, 120]),
+        harga=rng.randint(300, 5000), tahap=rng.randint(2, 12), persen=rng.choice([10, 20, 30, 50]),
+        hari=rng.choice([7, 14, 30, 60]), denda=rng.choice(["0,1", "0,5", "1"]), maks=rng.choice([5, 10, 20]),
+        bulan=rng.randint(1, 24), biaya=rng.randint(5, 50),
+    )
+
+
+def generate_document(doc_no: int, n_pasal: int, seed: int = 0) -> str:
+    """Satu dokumen sintetis dengan format yang dibaca LegalDocParser (PASAL n / judul / ayat bernomor)."""
+    rng = random.Random(seed * 100_003 + doc_no)
+    lines = [f"PERJANJIAN PENGIKATAN JUAL BELI NOMOR {doc_no:05d}", "Para Pihak sepakat sebagai berikut:"]
+    for nomor in range(1, n_pasal + 1):
+        judul, templates, _ = TOPICS[(nomor - 1) % len(TOPICS)]
+        lines.append(f"PASAL {nomor}")
+        lines.append(judul)
+        for urutan, template in enumerate(templates, start=1):
+            lines.append(f"{urutan}. {_fill(template, rng)}")
+    return "\n".join(lines) + "\n"
+
+
+def generate_corpus(n_docs: int, n_pasal: int, seed: int = 0) -> List[Tuple[str, str]]:
+    """[(filename, teks)] untuk n_docs dokumen."""
+    return [(f"bench_ppjb_{i:05d}.pdf", generate_document(i, n_pasal, seed)) for i in range(n_docs)]
+
+
+def generate_questions(n: int, seed: int = 0) -> List[Tuple[str, str]]:
+    """[(pertanyaan, judul pasal yang relevan)] untuk mengukur latency & ketepatan retrieval."""
+    rng = random.Random(seed)
+    pool = [(question, judul) for judul, _, questions in TOPICS for question in questions]
+    return [rng.choice(pool) for _ in range(n)]
@@ -0,0 +1,360 @@
+import asyncio
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from src.modules.rag.graph_store import GraphStore
+from src.modules.rag.retriever import SCOPE_SIZE_QUERY
+from src.modules.rag.vector_index import DOC_VECTORS_QUERY, DOC_VERSIONS_QUERY
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_PASAL_IN_CONTEXT = re.compile(r"PASAL:\s*(\S+)\s*\|\s*JUDUL:\s*([^|\n]+)")
+_SCOPED_KEYWORD = re.compile(r'\+source_doc:"((?:[^"\\]|\\.)*)" \+teks:\((.*)\)')
+
+
+def _tokens(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def hash_embedding(text: str, dim: int) -> List[float]:
+    """
+    Embedding deterministik (hashing trick): teks dengan kata yang sama dapat vektor
+    yang mirip, jadi hasil retrieval tetap masuk akal tanpa model sungguhan.
+    """
+    vector = [0.0] * dim
+    for token in _tokens(text):
+        h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+        vector[h % dim] += 1.0 if (h >> 32) & 1 else -1.0
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def _usage(prompt: str, completion: str = "") -> SimpleNamespace:
+    # Kira-kira 4 karakter per token, cukup untuk menghitung volume relatif
+    return SimpleNamespace(prompt_tokens=len(prompt) // 4 + 1,
+                           completion_tokens=len(completion) // 4 + 1 if completion else 0)
+
+
+# --- OPENAI PALSU ---
+class FakeOpenAI:
+    """
+    Pengganti OpenAI/AsyncOpenAI untuk benchmark offline: embeddings.create dan
+    chat.completions.create (biasa, JSON mode, dan stream) dengan latency yang bisa diatur.
+    Critic menolak sebagian draft secara deterministik sesuai critic_fail_rate.
+    """
+
+    def __init__(self, dim: int = 64, embed_latency: float = 0.0, chat_latency: float = 0.0,
+                 critic_fail_rate: float = 0.0, is_async: bool = False):
+        self.dim = dim
+        self.embed_latency = embed_latency
+        self.chat_latency = chat_latency
+        self.critic_fail_rate = critic_fail_rate
+        self.is_async = is_async
+        self.embeddings = SimpleNamespace(create=self._aembed if is_async else self._embed)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._achat if is_async else self._chat))
+
+    # Embeddings
+    def _embedding_response(self, input, model):
+        inputs = [input] if isinstance(input, str) else list(input)
+        data = [SimpleNamespace(index=i, embedding=hash_embedding(text, self.dim)) for i, text in enumerate(inputs)]
+        return SimpleNamespace(data=data, model=model, usage=_usage(" ".join(inputs)))
+
+    def _embed(self, input, model, **kwargs):
+        if self.embed_latency:
+            time.sleep(self.embed_latency)
+        return self._embedding_response(input, model)
+
+    async def _aembed(self, input, model, **kwargs):
+        if self.embed_latency:
+            await asyncio.sleep(self.embed_latency)
+        return self._embedding_response(input, model)
+
+    # Chat
+    def _reply(self, messages, response_format=None) -> str:
+        prompt = messages[-1]["content"]
+        if response_format:
+            # Critic: verdict ditentukan hash draft supaya hasil run bisa diulang
+            draft = prompt.split("JAWABAN JUNIOR:")[-1]
+            bucket = int(hashlib.md5(draft.encode("utf-8")).hexdigest(), 16) % 1000
+            status = "FAIL" if bucket < self.critic_fail_rate * 1000 else "PASS"
+            feedback = "Sebutkan nomor pasal dengan lebih jelas." if status == "FAIL" else "Oke"
+            return json.dumps({"status": status, "feedback": feedback})
+
+        # Writer: kutip pasal pertama di konteks (konteks ada di awalan prompt)
+        full_prompt = "\n".join(m["content"] for m in messages if m["role"] == "user")
+        match = _PASAL_IN_CONTEXT.search(full_prompt)
+        if not match:
+            return "Maaf, konteks tidak memuat pasal yang relevan."
+        revision = " (revisi)" if "INSTRUKSI REVISI" in prompt else ""
+        return (f"Berdasarkan Pasal {match.group(1)} tentang {match.group(2).strip()}, "
+                f"ketentuan tersebut berlaku sebagaimana tercantum dalam perjanjian{revision}.")
+
+    def _chat_response(self, model, messages, response_format):
+        content = self._reply(messages, response_format)
+        prompt = "".join(m["content"] for m in messages)
+        return content, SimpleNamespace(
+            model=model, usage=_usage(prompt, content),
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        )
+
+    def _stream_chunks(self, model, messages, content):
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            text = word if i == len(words) - 1 else word + " "
+            yield SimpleNamespace(model=model, usage=None,
+                                  choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+        prompt = "".join(m["content"] for m in messages)
+        yield SimpleNamespace(model=model, usage=_usage(prompt, content), choices=[])
+
+    def _chat(self, model, messages, temperature=None, response_format=None, stream=False, **kwargs):
+        content, response = self._chat_response(model, messages, response_format)
+        if not stream:
+            if self.chat_latency:
+                time.sleep(self.chat_latency)
+            return response
+
+        def generate():
+            chunks = list(self._stream_chunks(model, messages, content))
+            for chunk in chunks:
+                if self.chat_latency:
+                    time.sleep(self.chat_latency / len(chunks))
+                yield chunk
+        return generate()
+
+    async def _achat(self, model, messages, temperature=None, response_format=None, **kwargs):
+        if self.chat_latency:
+            await asyncio.sleep(self.chat_latency)
+        return self._chat_response(model, messages, response_format)[1]
+
+
+# --- NEO4J PALSU (IN-MEMORY) ---
+class _Result:
+    def __init__(self, records: List[Dict]):
+        self._records = records
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def __aiter__(self):
+        return self._aiter()
+
+    async def _aiter(self):
+        for record in self._records:
+            yield record
+
+    def single(self) -> Optional[Dict]:
+        return self._records[0] if self._records else None
+
+    def consume(self):
+        return None
+
+
+class _AsyncResult(_Result):
+    async def single(self) -> Optional[Dict]:
+        return super().single()
+
+
+class MemoryGraph:
+    """
+    Backend graph in-memory yang mengerti query Cypher yang dipakai GraphStore &
+    GraphRetriever (ingest inkremental, hybrid search + hydrate Pasal, sinkron index lokal).
+    Query lain ditolak dengan NotImplementedError supaya ketahuan kalau ada yang belum didukung.
+    """
+
+    def __init__(self, query_latency: float = 0.0):
+        self.query_latency = query_latency
+        self._lock = threading.RLock()
+        self.documents: Dict[str, Dict] = {}  # filename -> {content_hash, ingested_at}
+        self.pasal: Dict[tuple, Dict] = {}  # (doc, nomor) -> {judul, content_hash}
+        self.ayat: Dict[tuple, Dict] = {}  # (doc, nomor, urutan) -> {id, teks, embedding, ...}
+        self._next_id = 0
+        self._version = 0
+
+    # Driver API (sync)
+    def session(self, **kwargs):
+        return _Session(self)
+
+    def close(self):
+        pass
+
+    def run(self, query: str, **params) -> _Result:
+        if self.query_latency:
+            time.sleep(self.query_latency)
+        with self._lock:
+            return _Result(self._dispatch(query, params))
+
+    def _dispatch(self, query: str, params: Dict) -> List[Dict]:
+        q = query.strip()
+        if q.startswith("CREATE"):
+            return []
+        if "RETURN d.content_hash AS doc_hash, ayat" in q:
+            return self._plan(params["filename"])
+        if "ON CREATE SET d.created_at" in q:
+            self.documents.setdefault(params["filename"], {"content_hash": None, "ingested_at": None})
+            return []
+        if q == GraphStore.WRITE_ROWS_QUERY.strip():
+            return self._write_rows(params["filename"], params["rows"])
+        if q == GraphStore.DELETE_ROWS_QUERY.strip():
+            for row in params["rows"]:
+                self.ayat.pop((params["filename"], row["nomor"], row["urutan"]), None)
+            return []
+        if "WHERE NOT p.nomor IN $pasal_list" in q:
+            keep = set(params["pasal_list"])
+            for key in [k for k in self.pasal if k[0] == params["filename"] and k[1] not in keep]:
+                del self.pasal[key]
+                for ayat_key in [a for a in self.ayat if a[:2] == key]:
+                    del self.ayat[ayat_key]
+            return []
+        if "SET d.ingested_at" in q:
+            self._version += 1
+            doc = self.documents[params["filename"]]
+            doc["ingested_at"] = f"v{self._version}"
+            doc["content_hash"] = params["doc_hash"] if params["complete"] else None
+            return []
+        if "UNWIND $queries AS q" in q:
+            return self._batch_hybrid(q, params)
+        if "MATCH (p:Pasal)-[:BERISI]->(node)" in q:
+            return self._hybrid(q, params)
+        if q == SCOPE_SIZE_QUERY.strip():
+            return [{"size": sum(1 for key, a in self.ayat.items() if key[0] == params["document"] and a["embedding"])}]
+        if q == DOC_VERSIONS_QUERY.strip():
+            return [{"doc": name, "version": doc["ingested_at"]} for name, doc in self.documents.items()]
+        if q == DOC_VECTORS_QUERY.strip():
+            return [{"id": a["id"], "embedding": a["embedding"]}
+                    for key, a in self.ayat.items() if key[0] == params["doc"]]
+        raise NotImplementedError(f"MemoryGraph belum mendukung query:\n{q}")
+
+    def _plan(self, filename: str) -> List[Dict]:
+        ayat = [{"source_pasal": key[1], "urutan": key[2], "content_hash": a["content_hash"]}
+                for key, a in self.ayat.items() if key[0] == filename]
+        doc = self.documents.get(filename)
+        return [{"doc_hash": doc["content_hash"] if doc else None, "ayat": ayat}]
+
+    def _write_rows(self, filename: str, rows: List[Dict]) -> List[Dict]:
+        for row in rows:
+            self.pasal[(filename, row["nomor"])] = {"judul": row["judul"], "content_hash": row["pasal_hash"]}
+            key = (filename, row["nomor"], row["urutan"])
+            existing = self.ayat.get(key)
+            if existing is None:
+                self._next_id += 1
+                existing = self.ayat[key] = {"id": f"ayat:{self._next_id}"}
+            existing.update(teks=row["teks"], embedding=row["vector"], content_hash=row["content_hash"])
+        return []
+
+    def _batch_hybrid(self, query: str, params: Dict) -> List[Dict]:
+        """retrieve_many: jalankan _hybrid per baris $queries, saring dokumen, tandai idx."""
+        legs = ("$vector_hits" if "UNWIND q.hits" in query else "")
+        legs += " ayat_fulltext_doc" if "ayat_fulltext_doc" in query else " ayat_fulltext"
+        if "MATCH (node:Ayat {source_doc: $document})" in query:
+            legs += " MATCH (node:Ayat {source_doc: $document})"
+        records = []
+        for row in params["queries"]:
+            sub = {"top_k": params["top_k"], "candidates": params["candidates"], "vector_hits": row["hits"],
+                   "query_vector": row["vector"], "keyword_query": row["keyword"], "document": params["document"]}
+            for record in self._hybrid(legs, sub):
+                if params["document"] is None or record["source_doc"] == params["document"]:
+                    records.append({"idx": row["idx"], **record})
+        return records
+
+    def _hybrid(self, query: str, params: Dict) -> List[Dict]:
+        top_k = params["candidates"]
+        by_id = {a["id"]: (key, a) for key, a in self.ayat.items()}
+        candidates = []
+
+        # Kaki vector: dari index lokal ($vector_hits), scan eksak 1 dokumen, atau "ANN" global (brute force)
+        if "$vector_hits" in query:
+            candidates += [(by_id[h["id"]], h["score"], "vector") for h in params["vector_hits"] if h["id"] in by_id]
+        elif params["query_vector"]:
+            qv = params["query_vector"]
+            limit = top_k
+            ayat = self.ayat.items()
+            if "MATCH (node:Ayat {source_doc: $document})" in query:
+                limit = params["top_k"]
+                ayat = [(key, a) for key, a in ayat if key[0] == params["document"]]
+            scored = [(sum(x * y for x, y in zip(qv, a["embedding"])), key, a) for key, a in ayat]
+            scored.sort(key=lambda item: item[0], reverse=True)
+            candidates += [((key, a), score, "vector") for score, key, a in scored[:limit]]
+
+        # Kaki keyword: jumlah token query yang muncul di teks. Versi per dokumen membaca
+        # klausa +source_doc:"..." +teks:(...) dari query Lucene (build_scoped_keyword_query).
+        if "ayat_fulltext" in query and params.get("keyword_query"):
+            keyword_query, limit, ayat = params["keyword_query"], top_k, self.ayat.items()
+            if "ayat_fulltext_doc" in query:
+                match = _SCOPED_KEYWORD.fullmatch(keyword_query)
+                document = re.sub(r"\\(.)", r"\1", match.group(1))
+                keyword_query, limit = match.group(2), params["top_k"]
+                ayat = [(key, a) for key, a in ayat if key[0] == document]
+            terms = set(keyword_query.split(" OR "))
+            scored = []
+            for key, a in ayat:
+                score = len(terms & set(_tokens(a["teks"])))
+                if score:
+                    scored.append((score, key, a))
+            scored.sort(key=lambda item: item[0], reverse=True)
+            candidates += [((key, a), float(score), "keyword") for score, key, a in scored[:limit]]
+
+        records = []
+        for (key, a), score, source in candidates:
+            pasal = self.pasal.get(key[:2])
+            if pasal is None:
+                continue
+            if "WHERE node.source_doc = $document" in query and key[0] != params["document"]:
+                continue
+            records.append({
+                "ayat_id": a["id"], "teks": a["teks"], "source_doc": key[0],
+                "doc_version": self.documents.get(key[0], {}).get("ingested_at"),
+                "nomor": key[1], "judul": pasal["judul"], "score": score, "source": source,
+            })
+        return records
+
+
+class _Session:
+    def __init__(self, graph: MemoryGraph):
+        self.graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query: str, **params) -> _Result:
+        return self.graph.run(query, **params)
+
+    def execute_write(self, fn, *args, **kwargs):
+        return fn(self, *args, **kwargs)
+
+
+class AsyncMemoryGraph:
+    """Versi AsyncDriver dari MemoryGraph (berbagi data yang sama)."""
+
+    def __init__(self, graph: MemoryGraph):
+        self.graph = graph
+
+    def session(self, **kwargs):
+        return _AsyncSession(self.graph)
+
+    async def close(self):
+        pass
+
+
+class _AsyncSession:
+    def __init__(self, graph: MemoryGraph):
+        self.graph = graph
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def run(self, query: str, **params) -> _AsyncResult:
+        if self.graph.query_latency:
+            await asyncio.sleep(self.graph.query_latency)
+        with self.graph._lock:
+            return _AsyncResult(self.graph._dispatch(query, params))
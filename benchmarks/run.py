@@ -0,0 +1,286 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Sequence
+
+# --- FIX PATH --- (benchmarks -> ROOT)
+project_root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.corpus import generate_corpus, generate_questions
+from benchmarks.fakes import FakeOpenAI, MemoryGraph
+from src.core.metrics import STAGE_LATENCY
+from src.modules.ingestion.parser import LegalDocParser
+from src.modules.rag.embeddings import EmbeddingService
+from src.modules.rag.generator import GENERATION_MODES, RAGGenerator
+from src.modules.rag.graph_store import GraphStore
+from src.modules.rag.retriever import GraphRetriever
+
+DEFAULT_OUTPUT_DIR = os.path.join(project_root, "benchmarks", "results")
+
+
+# --- STATISTIK ---
+def percentile(values: Sequence[float], p: float) -> float:
+    """Persentil dengan interpolasi linear (p dalam 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def latency_summary(latencies: List[float], elapsed: float, errors: int = 0) -> Dict:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        "max_ms": round(max(latencies) * 1000, 2) if latencies else 0.0,
+        "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def run_concurrent(fn: Callable, items: Sequence, concurrency: int):
+    """Jalankan fn(item) dengan `concurrency` thread. Mengembalikan (latencies, elapsed, errors, outputs)."""
+    latencies, outputs = [], []
+    errors = [0]
+    lock = threading.Lock()
+
+    def timed(item):
+        started = time.perf_counter()
+        try:
+            output = fn(item)
+        except Exception as e:
+            print(f"   ❌ {e}")
+            with lock:
+                errors[0] += 1
+            return
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            outputs.append((item, output))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, items))
+    return latencies, time.perf_counter() - started, errors[0], outputs
+
+
+# --- BACKEND ---
+def build_driver(args):
+    """Backend graph: 'memory' (offline, default) atau 'neo4j' (pakai kredensial di .env, sebaiknya DB kosong)."""
+    if args.backend == "memory":
+        return MemoryGraph(query_latency=args.query_latency_ms / 1000)
+    from neo4j import GraphDatabase
+    return GraphDatabase.driver(os.getenv("NEO4J_URI"),
+                                auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD")))
+
+
+# --- SKENARIO ---
+def bench_ingest(store: GraphStore, corpus) -> Dict:
+    parser = LegalDocParser()
+    latencies, clauses = [], 0
+    started = time.perf_counter()
+    for filename, text in corpus:
+        t0 = time.perf_counter()
+        articles = parser.parse(text)
+        report = store.ingest_document(filename, articles)
+        latencies.append(time.perf_counter() - t0)
+        clauses += report["total"]
+    elapsed = time.perf_counter() - started
+    summary = latency_summary(latencies, elapsed)
+    summary.update({
+        "documents": len(corpus),
+        "clauses": clauses,
+        "documents_per_s": round(len(corpus) / elapsed, 2) if elapsed else 0.0,
+        "clauses_per_s": round(clauses / elapsed, 2) if elapsed else 0.0,
+    })
+    return summary
+
+
+def bench_retrieval(retriever: GraphRetriever, questions, levels: List[int], top_k: int) -> Dict:
+    results = {}
+    for concurrency in levels:
+        latencies, elapsed, errors, outputs = run_concurrent(
+            lambda item: retriever.retrieve(item[0], top_k=top_k), questions, concurrency)
+        summary = latency_summary(latencies, elapsed, errors)
+        # Ketepatan kasar: apakah pasal dengan judul yang diharapkan ada di top_k
+        hits = sum(1 for (question, judul), found in outputs if any(r["judul"] == judul for r in found))
+        summary["hit_rate_at_k"] = round(hits / len(outputs), 4) if outputs else 0.0
+        results[f"c{concurrency}"] = summary
+        print(f"   🔍 retrieval c={concurrency}: p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, "
+              f"{summary['throughput_per_s']} q/s, hit@{top_k} {summary['hit_rate_at_k']}")
+    return results
+
+
+def bench_ask(driver, retriever: GraphRetriever, generator: RAGGenerator, questions,
+              levels: List[int], mode: str) -> Dict:
+    """Lewat route /ask Flask sungguhan (test client), dengan retriever & generator palsu disuntikkan."""
+    import app as web_app
+
+    web_app.driver = driver
+    web_app.retriever = retriever
+    web_app.generator = generator
+    local = threading.local()
+
+    def ask(item):
+        if not hasattr(local, "client"):
+            local.client = web_app.app.test_client()
+        response = local.client.post("/ask", json={"question": item[0], "mode": mode})
+        if response.status_code != 200:
+            raise RuntimeError(f"/ask HTTP {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return response.get_json()
+
+    results = {}
+    for concurrency in levels:
+        latencies, elapsed, errors, outputs = run_concurrent(ask, questions, concurrency)
+        summary = latency_summary(latencies, elapsed, errors)
+        passed = sum(1 for _, body in outputs if body.get("generation", {}).get("status") == "PASS")
+        summary["pass_rate"] = round(passed / len(outputs), 4) if outputs else 0.0
+        results[f"c{concurrency}"] = summary
+        print(f"   💬 /ask c={concurrency}: p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, "
+              f"p99 {summary['p99_ms']} ms, {summary['throughput_per_s']} req/s")
+    return results
+
+
+def stage_breakdown() -> Dict[str, Dict[str, float]]:
+    """Rata-rata latency per tahap dari histogram metrik (src/core/metrics.py)."""
+    return {
+        stage: {"count": data["count"], "mean_ms": round(data["sum"] / data["count"] * 1000, 3)}
+        for stage, data in sorted(STAGE_LATENCY.summary().items()) if data["count"]
+    }
+
+
+# --- PERBANDINGAN ANTAR RUN ---
+def _flatten(data, prefix=""):
+    flat = {}
+    for key, value in data.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Bandingkan metrik latency (*_ms, makin kecil makin baik) dan throughput
+    (*_per_s, makin besar makin baik). Mengembalikan daftar regresi > threshold.
+    """
+    regressions = []
+    old, new = _flatten(baseline.get("results", {})), _flatten(current.get("results", {}))
+    for path in sorted(set(old) & set(new)):
+        # max_ms terlalu berisik untuk dijadikan patokan regresi
+        if not old[path] or path.endswith("max_ms") or not (path.endswith("_ms") or path.endswith("_per_s")):
+            continue
+        change = (new[path] - old[path]) / old[path]
+        worse = change > threshold if path.endswith("_ms") else change < -threshold
+        marker = "❌" if worse else "  "
+        print(f"{marker} {path:<45} {old[path]:>12} -> {new[path]:>12} ({change:+.1%})")
+        if worse:
+            regressions.append(path)
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=project_root, text=True).strip()
+    except Exception:
+        return None
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark offline: ingest, retrieval, dan /ask.")
+    arg_parser.add_argument("--backend", choices=["memory", "neo4j"], default="memory")
+    arg_parser.add_argument("--docs", type=int, default=50)
+    arg_parser.add_argument("--pasal", type=int, default=12, help="Jumlah pasal per dokumen")
+    arg_parser.add_argument("--questions", type=int, default=200)
+    arg_parser.add_argument("--concurrency", default="1,8,32", help="Level konkurensi, pisahkan dengan koma")
+    arg_parser.add_argument("--top-k", type=int, default=3)
+    arg_parser.add_argument("--mode", choices=GENERATION_MODES, default=GENERATION_MODES[0])
+    arg_parser.add_argument("--dim", type=int, default=None, help="Dimensi embedding palsu (default 64, 1536 untuk neo4j)")
+    arg_parser.add_argument("--embed-latency-ms", type=float, default=20)
+    arg_parser.add_argument("--chat-latency-ms", type=float, default=300)
+    arg_parser.add_argument("--query-latency-ms", type=float, default=1, help="Latency per query (backend memory)")
+    arg_parser.add_argument("--critic-fail-rate", type=float, default=0.2)
+    arg_parser.add_argument("--scenarios", default="ingest,retrieval,ask")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--output", default=None, help="File JSON hasil (default benchmarks/results/<waktu>.json)")
+    arg_parser.add_argument("--compare", default=None, help="File JSON hasil run sebelumnya sebagai baseline")
+    arg_parser.add_argument("--threshold", type=float, default=0.10, help="Batas regresi (0.10 = 10%%)")
+    arg_parser.add_argument("--fail-on-regression", action="store_true")
+    args = arg_parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",") if level]
+    scenarios = set(args.scenarios.split(","))
+    dim = args.dim or (1536 if args.backend == "neo4j" else 64)
+
+    fake = dict(dim=dim, embed_latency=args.embed_latency_ms / 1000, chat_latency=args.chat_latency_ms / 1000,
+                critic_fail_rate=args.critic_fail_rate)
+    # Cache embedding dimatikan supaya tiap run mengukur hal yang sama
+    os.environ["EMBEDDING_CACHE_PATH"] = ""
+    embedder = EmbeddingService(client=FakeOpenAI(**fake),
+                                async_client=FakeOpenAI(is_async=True, **fake))
+    driver = build_driver(args)
+    store = GraphStore(driver=driver, embedder=embedder)
+    retriever = GraphRetriever(driver, embedder=embedder)
+    generator = RAGGenerator(client=FakeOpenAI(**fake), async_client=FakeOpenAI(is_async=True, **fake))
+
+    corpus = generate_corpus(args.docs, args.pasal, seed=args.seed)
+    questions = generate_questions(args.questions, seed=args.seed)
+
+    print(f"🏁 [Benchmark] backend={args.backend}, {args.docs} dokumen x {args.pasal} pasal, "
+          f"{args.questions} pertanyaan, konkurensi {levels}")
+    results = {}
+    if "ingest" in scenarios:
+        store.setup_database()
+        results["ingest"] = bench_ingest(store, corpus)
+        print(f"   📥 ingest: {results['ingest']['documents_per_s']} dok/s, {results['ingest']['clauses_per_s']} ayat/s")
+    if "retrieval" in scenarios:
+        results["retrieval"] = bench_retrieval(retriever, questions, levels, args.top_k)
+    if "ask" in scenarios:
+        results["ask"] = bench_ask(driver, retriever, generator, questions, levels, args.mode)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {**vars(args), "dim": dim},
+        },
+        "results": results,
+        "stages": stage_breakdown(),
+    }
+
+    output = args.output or os.path.join(DEFAULT_OUTPUT_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"💾 Hasil disimpan ke {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"⚠️ {len(regressions)} metrik regresi lebih dari {args.threshold:.0%}.")
+            if args.fail_on_regression:
+                sys.exit(1)
+
+    driver.close()
+
+
+if __name__ == "__main__":
+    main()
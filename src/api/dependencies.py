@@ -0,0 +1,51 @@
+import os
+from aiohttp import web
+from dotenv import load_dotenv
+from neo4j import AsyncDriver, AsyncGraphDatabase
+
+from src.modules.rag.answer_cache import AnswerCache
+from src.modules.rag.embeddings import EmbeddingService
+from src.modules.rag.generator import RAGGenerator
+from src.modules.rag.graph_store import on_document_ingested
+from src.modules.rag.retriever import AsyncGraphRetriever, load_vector_index
+
+load_dotenv()
+
+# Kunci resource yang dipakai bersama oleh semua request di 1 proses
+DRIVER_KEY = web.AppKey("driver", AsyncDriver)
+RETRIEVER_KEY = web.AppKey("retriever", AsyncGraphRetriever)
+GENERATOR_KEY = web.AppKey("generator", RAGGenerator)
+
+
+async def init_resources(app: web.Application):
+    """
+    Cleanup context aiohttp: buat driver Neo4j async & service sekali saat server start,
+    lalu tutup saat shutdown.
+    """
+    uri = os.getenv("NEO4J_URI")
+    user = os.getenv("NEO4J_USERNAME")
+    password = os.getenv("NEO4J_PASSWORD")
+
+    # Pool koneksi dibuat cukup besar karena ratusan pertanyaan bisa menunggu bersamaan
+    driver = AsyncGraphDatabase.driver(
+        uri, auth=(user, password),
+        max_connection_pool_size=int(os.getenv("NEO4J_POOL_SIZE", "200"))
+    )
+    await driver.verify_connectivity()
+
+    embedder = EmbeddingService()
+    answer_cache = AnswerCache(embedder)
+    on_document_ingested(answer_cache.invalidate_document)
+    vector_index = load_vector_index()
+    if vector_index is not None:
+        on_document_ingested(vector_index.mark_dirty)
+
+    app[DRIVER_KEY] = driver
+    app[RETRIEVER_KEY] = AsyncGraphRetriever(driver, embedder=embedder, vector_index=vector_index)
+    on_document_ingested(app[RETRIEVER_KEY].invalidate_document)
+    app[GENERATOR_KEY] = RAGGenerator(answer_cache=answer_cache)
+    print("✅ Async server siap! Terkoneksi ke Neo4j.")
+
+    yield
+
+    await driver.close()
@@ -0,0 +1,104 @@
+import os
+import sys
+from aiohttp import web
+
+# --- FIX PATH --- (api -> src -> ROOT), supaya bisa juga dijalankan sebagai script
+project_root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../.."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.api.dependencies import GENERATOR_KEY, RETRIEVER_KEY, init_resources
+from src.core.metrics import REGISTRY, collect_timings, span, summarize_timings
+from src.core.singleflight import AsyncSingleFlight, ask_key
+from src.modules.rag.generator import BEST_OF_N_MAX, GENERATION_MODES, valid_n_drafts
+
+ASK_FLIGHT_KEY = web.AppKey("ask_flight", AsyncSingleFlight)
+
+
+# --- API TANYA JAWAB (ASYNC) ---
+async def ask(request: web.Request) -> web.Response:
+    """
+    Sama seperti /ask di app.py, tapi semua I/O (embedding, Neo4j, Writer & Critic)
+    di-await. Selama menunggu OpenAI/Neo4j, event loop bebas melayani pertanyaan lain,
+    jadi 1 proses bisa menampung ratusan pertanyaan sekaligus.
+    """
+    try:
+        data = await request.json()
+    except ValueError:
+        return web.json_response({"error": "Body harus JSON"}, status=400)
+
+    user_question = data.get('question')
+    mode = data.get('mode')
+    n_drafts = data.get('n_drafts')
+    document = data.get('document') or None
+    want_timings = bool(data.get('timings')) or request.query.get('timings') == '1'
+    if not user_question:
+        return web.json_response({"error": "Pertanyaan kosong"}, status=400)
+    if mode and mode not in GENERATION_MODES:
+        return web.json_response({"error": f"Mode harus salah satu dari: {', '.join(GENERATION_MODES)}"}, status=400)
+    if not valid_n_drafts(n_drafts):
+        return web.json_response({"error": f"'n_drafts' harus bilangan bulat 1-{BEST_OF_N_MAX}"}, status=400)
+    if document is not None and not isinstance(document, str):
+        return web.json_response({"error": "'document' harus berupa nama file"}, status=400)
+
+    print(f"📩 [Async] Menerima pertanyaan: {user_question}" + (f" (dokumen: {document})" if document else ""))
+
+    retriever = request.app[RETRIEVER_KEY]
+    generator = request.app[GENERATOR_KEY]
+
+    async def answer():
+        # 1. Retrieve (Cari Pasal)
+        context, retrieval_stats = await retriever.retrieve(user_question, top_k=3, return_stats=True,
+                                                            document=document)
+        # 2. Generate
+        result = None
+        if context:
+            result = await generator.agenerate_answer_detailed(user_question, context, mode=mode, n_drafts=n_drafts)
+        return context, retrieval_stats, result
+
+    try:
+        with collect_timings() as timings, span("ask"):
+            # Pertanyaan identik yang sedang diproses cukup ditunggu hasilnya
+            (context, retrieval_stats, result), coalesced = await request.app[ASK_FLIGHT_KEY].do(
+                ask_key(user_question, document=document, mode=mode, n_drafts=n_drafts), answer)
+
+        if not context:
+            response = {
+                "answer": "Maaf, saya tidak menemukan pasal yang relevan dalam dokumen kontrak ini.",
+                "sources": [],
+                "retrieval": retrieval_stats
+            }
+        else:
+            response = {
+                "answer": result["answer"],
+                "sources": context,
+                "retrieval": retrieval_stats,
+                "generation": {key: value for key, value in result.items() if key != "answer"}
+            }
+        if coalesced:
+            response["coalesced"] = True
+        if want_timings:
+            response["timings"] = summarize_timings(timings)
+        return web.json_response(response)
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return web.json_response({"error": "Terjadi kesalahan internal"}, status=500)
+
+
+async def metrics(request: web.Request) -> web.Response:
+    return web.Response(text=REGISTRY.render(), content_type="text/plain")
+
+
+def create_app() -> web.Application:
+    app = web.Application()
+    app[ASK_FLIGHT_KEY] = AsyncSingleFlight("ask")
+    app.cleanup_ctx.append(init_resources)
+    app.router.add_post('/ask', ask)
+    app.router.add_get('/metrics', metrics)
+    return app
+
+
+if __name__ == '__main__':
+    # Jalankan: python -m src.api.main  (default port 8000, Flask tetap di 5000)
+    web.run_app(create_app(), port=int(os.getenv("ASYNC_PORT", "8000")))
@@ -0,0 +1,207 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Batas bucket histogram latency (detik): dari query Neo4j cepat sampai loop agentic panjang
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels.get(name, "")) for name in self.labels), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    """Nilai yang bisa naik-turun (misal batas konkurensi saat ini)."""
+
+    def set(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # Per kombinasi label: [jumlah per bucket..., sum, count]
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """{label (digabung koma): {"count", "sum"}} untuk laporan non-Prometheus (misal benchmark)."""
+        with self._lock:
+            return {",".join(key): {"count": series[-1], "sum": series[-2]} for key, series in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for i, bound in enumerate(self.buckets):
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {series[i]}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Registry metrik in-process, di-render dalam format teks Prometheus untuk route /metrics."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._metrics.setdefault(name, Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_LATENCY = REGISTRY.histogram(
+    "legal_auditor_stage_seconds", "Latency per tahap (embedding, retrieval, writer, critic, ingest, ...)", ("stage",))
+LLM_TOKENS = REGISTRY.counter(
+    "legal_auditor_llm_tokens_total", "Token OpenAI yang terpakai", ("model", "kind"))
+CRITIC_RETRIES = REGISTRY.counter(
+    "legal_auditor_critic_retries_total", "Draft yang ditolak Critic (memicu revisi / draft lain)", ("mode",))
+CACHE_LOOKUPS = REGISTRY.counter(
+    "legal_auditor_cache_lookups_total", "Hasil lookup cache (hit / miss)", ("cache", "result"))
+OPENAI_RETRIES = REGISTRY.counter(
+    "legal_auditor_openai_retries_total", "Request OpenAI yang diulang (rate_limit / timeout / connection / server)", ("traffic", "reason"))
+OPENAI_CONCURRENCY = REGISTRY.gauge(
+    "legal_auditor_openai_concurrency_limit", "Batas request OpenAI paralel saat ini (AIMD)", ("traffic",))
+COALESCED_REQUESTS = REGISTRY.counter(
+    "legal_auditor_coalesced_requests_total", "Request yang menumpang hasil request identik yang sedang berjalan", ("flight",))
+VERIFIER_VERDICTS = REGISTRY.counter(
+    "legal_auditor_verifier_verdicts_total", "Hasil verifier lokal sebelum Critic LLM (PASS / FAIL / INCONCLUSIVE)", ("verdict",))
+
+# Breakdown per request (opsional): list (stage, detik) milik request yang sedang jalan
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def span(stage: str):
+    """
+    Ukur durasi sebuah tahap: selalu masuk histogram, dan ikut breakdown request
+    kalau sedang di dalam collect_timings().
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def record_stage(stage: str, elapsed: float):
+    """Catat durasi tahap yang diukur sendiri (misal generator streaming, lihat span)."""
+    STAGE_LATENCY.observe(elapsed, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, elapsed))
+
+
+@contextmanager
+def collect_timings():
+    """
+    Kumpulkan semua span selama blok ini jalan (termasuk di task asyncio / thread
+    yang menyalin context). Yield list yang bisa diringkas dengan summarize_timings().
+    """
+    timings: List[Tuple[str, float]] = []
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def summarize_timings(timings: List[Tuple[str, float]]) -> Dict[str, Dict[str, float]]:
+    """{stage: {"ms": total milidetik, "count": berapa kali}} sesuai urutan pertama muncul."""
+    summary: Dict[str, Dict[str, float]] = {}
+    for stage, elapsed in list(timings):
+        entry = summary.setdefault(stage, {"ms": 0.0, "count": 0})
+        entry["ms"] += elapsed * 1000
+        entry["count"] += 1
+    for entry in summary.values():
+        entry["ms"] = round(entry["ms"], 2)
+    return summary
+
+
+def record_llm_usage(model: str, usage):
+    """Catat token dari field `usage` response OpenAI (chat maupun embedding)."""
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, model=model, kind="completion")
+
+
+def record_cache_lookup(cache: str, hits: int, misses: int):
+    if hits:
+        CACHE_LOOKUPS.inc(hits, cache=cache, result="hit")
+    if misses:
+        CACHE_LOOKUPS.inc(misses, cache=cache, result="miss")
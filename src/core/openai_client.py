@@ -0,0 +1,413 @@
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+from openai import APIConnectionError, APIStatusError, APITimeoutError, AsyncOpenAI, OpenAI, RateLimitError
+
+from src.core.metrics import OPENAI_CONCURRENCY, OPENAI_RETRIES
+from src.modules.rag.tokenizer import count_tokens
+
+load_dotenv()
+
+# Lapisan client OpenAI bersama untuk seluruh proses:
+# - batas request paralel adaptif (AIMD) per jenis traffic: turun setengah saat 429, naik pelan saat sukses
+# - budget request & token per menit (token bucket), kapasitasnya belajar dari header x-ratelimit-*
+# - retry dengan exponential backoff + jitter (menghormati Retry-After)
+# Traffic "embedding" dan "chat" punya limiter & budget sendiri karena kuotanya juga terpisah di OpenAI.
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Format reset OpenAI ("20ms", "1s", "6m0s", "1h2m3.5s") -> detik."""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def _resolve(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class AdaptiveLimiter:
+    """
+    Batas jumlah request paralel yang menyesuaikan diri (AIMD, seperti congestion control TCP):
+    - tiap request sukses: limit naik 1/limit (kira-kira +1 per satu putaran penuh)
+    - kena 429: limit dipotong setengah, maksimal sekali per cooldown (satu ledakan 429 = satu potongan)
+    Bisa dipakai bersamaan dari thread (acquire) maupun asyncio (aacquire).
+    """
+
+    def __init__(self, name: str, initial: int, minimum: int = 1, maximum: int = 64, cooldown: float = 1.0):
+        self.name = name
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self.cooldown = cooldown
+        self.in_flight = 0
+
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._async_waiters = []
+        self._last_decrease = 0.0
+        OPENAI_CONCURRENCY.set(int(self.limit), traffic=name)
+
+    def _has_slot(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def acquire(self):
+        with self._cond:
+            while not self._has_slot():
+                self._cond.wait()
+            self.in_flight += 1
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._has_slot():
+                    self.in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with self._lock:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+                raise
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._wake_locked()
+
+    def _wake_locked(self):
+        # Bangunkan semua yang menunggu, masing-masing cek ulang slot-nya sendiri
+        self._cond.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, waiter)
+            except RuntimeError:
+                pass  # event loop-nya sudah ditutup
+
+    def on_success(self):
+        """Dipanggil sebelum release: naikkan limit hanya kalau slot memang sedang terpakai penuh."""
+        with self._lock:
+            before = int(self.limit)
+            if self.in_flight < before:
+                return
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            if int(self.limit) > before:
+                OPENAI_CONCURRENCY.set(int(self.limit), traffic=self.name)
+                self._wake_locked()
+
+    def on_throttle(self):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self.limit = max(self.minimum, self.limit / 2)
+            OPENAI_CONCURRENCY.set(int(self.limit), traffic=self.name)
+        print(f"🐢 [OpenAI] {self.name}: kena rate limit, request paralel diturunkan ke {int(self.limit)}")
+
+
+class _Bucket:
+    def __init__(self, per_minute: float):
+        self.limit = per_minute  # 0 = belum diketahui -> tidak dibatasi
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        if self.limit:
+            self.level = min(self.limit, self.level + (now - self.updated) * self.limit / 60)
+        self.updated = now
+
+
+class RateBudget:
+    """
+    Budget request & token per menit (token bucket dengan reservasi).
+    Kapasitas awal dari env (0 = belum diketahui), lalu mengikuti header x-ratelimit-limit-*
+    dan x-ratelimit-remaining-* dari OpenAI, jadi throughput menempel di plafon kuota akun.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self._lock = threading.Lock()
+        self._buckets = {"requests": _Bucket(requests_per_minute), "tokens": _Bucket(tokens_per_minute)}
+        self._paused_until = 0.0
+
+    def reserve(self, tokens: int) -> float:
+        """Pesan 1 request + `tokens` token. Mengembalikan berapa detik harus menunggu sebelum kirim."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._paused_until - now)
+            for kind, amount in (("requests", 1), ("tokens", tokens)):
+                bucket = self._buckets[kind]
+                bucket.refill(now)
+                if not bucket.limit:
+                    continue
+                # Request yang lebih besar dari kapasitas tetap boleh jalan (tidak menunggu selamanya)
+                bucket.level -= min(amount, bucket.limit)
+                if bucket.level < 0:
+                    wait = max(wait, -bucket.level * 60 / bucket.limit)
+            return wait
+
+    def pause(self, seconds: float):
+        """Tahan semua request sampai `seconds` dari sekarang (misal dari Retry-After)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def update_from_headers(self, headers):
+        if not headers:
+            return
+        with self._lock:
+            now = time.monotonic()
+            for kind, bucket in self._buckets.items():
+                limit = headers.get(f"x-ratelimit-limit-{kind}")
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                try:
+                    if limit is not None:
+                        bucket.refill(now)
+                        bucket.limit = float(limit)
+                    if remaining is not None:
+                        remaining = float(remaining)
+                        bucket.refill(now)
+                        # Angka server sudah termasuk pemakaian proses lain
+                        bucket.level = min(bucket.level, remaining)
+                        if remaining <= 0:
+                            reset = parse_reset(headers.get(f"x-ratelimit-reset-{kind}"))
+                            if reset:
+                                self._paused_until = max(self._paused_until, now + reset)
+                except ValueError:
+                    continue
+
+
+class Traffic:
+    """Limiter + budget untuk satu jenis traffic (embedding / chat)."""
+
+    def __init__(self, name: str, concurrency: int, max_concurrency: int, rpm: float, tpm: float):
+        self.name = name
+        self.limiter = AdaptiveLimiter(name, concurrency, maximum=max_concurrency)
+        self.budget = RateBudget(rpm, tpm)
+
+
+_traffic_lock = threading.Lock()
+_traffic: Dict[str, Traffic] = {}
+
+
+def get_traffic(name: str) -> Traffic:
+    """Traffic bersama per proses. Env: OPENAI_<EMBED|CHAT>_CONCURRENCY / _MAX_CONCURRENCY / _RPM / _TPM."""
+    with _traffic_lock:
+        if name not in _traffic:
+            prefix = "OPENAI_EMBED" if name == "embedding" else "OPENAI_CHAT"
+            defaults = {"embedding": ("4", "32"), "chat": ("8", "64")}[name]
+            _traffic[name] = Traffic(
+                name,
+                concurrency=int(os.getenv(f"{prefix}_CONCURRENCY", defaults[0])),
+                max_concurrency=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", defaults[1])),
+                rpm=float(os.getenv(f"{prefix}_RPM", "0")),
+                tpm=float(os.getenv(f"{prefix}_TPM", "0")),
+            )
+        return _traffic[name]
+
+
+def _embedding_tokens(kwargs) -> int:
+    inputs = kwargs.get("input") or []
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    return sum(count_tokens(text) for text in inputs)
+
+
+def _chat_tokens(kwargs) -> int:
+    # OpenAI menghitung token rate limit = prompt + max_tokens, completion diperkirakan
+    prompt = sum(count_tokens(message.get("content") or "") + 4 for message in kwargs.get("messages") or [])
+    completion = kwargs.get("max_tokens") or int(os.getenv("CHAT_COMPLETION_TOKEN_ESTIMATE", "512"))
+    return prompt + completion
+
+
+def _retry_reason(error: Exception) -> Optional[str]:
+    if isinstance(error, RateLimitError):
+        # Kuota/billing habis bukan masalah sementara, percuma diulang
+        return None if getattr(error, "code", None) == "insufficient_quota" else "rate_limit"
+    if isinstance(error, APITimeoutError):
+        return "timeout"
+    if isinstance(error, APIConnectionError):
+        return "connection"
+    if isinstance(error, APIStatusError) and (error.status_code >= 500 or error.status_code in (408, 409)):
+        return "server"
+    return None
+
+
+def is_transient(error: Exception) -> bool:
+    """True kalau error-nya sementara (rate limit, timeout, koneksi, 5xx), bukan karena isi request."""
+    return _retry_reason(error) is not None
+
+
+def _error_headers(error: Exception):
+    response = getattr(error, "response", None)
+    return getattr(response, "headers", None) or {}
+
+
+def _retry_after(headers) -> Optional[float]:
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+class _ResilientEndpoint:
+    """Pengganti `client.embeddings` / `client.chat.completions`: create() lewat limiter, budget & retry."""
+
+    def __init__(self, owner: "ResilientOpenAI", endpoint, traffic: Traffic, estimate):
+        self._owner = owner
+        self._endpoint = endpoint
+        self._traffic = traffic
+        self._estimate = estimate
+
+    def create(self, **kwargs):
+        if self._owner.is_async:
+            return self._owner._acall(self._endpoint, self._traffic, self._estimate(kwargs), kwargs)
+        return self._owner._call(self._endpoint, self._traffic, self._estimate(kwargs), kwargs)
+
+
+class ResilientOpenAI:
+    """
+    Bungkus OpenAI / AsyncOpenAI dengan antarmuka yang sama (embeddings.create, chat.completions.create),
+    jadi EmbeddingService & RAGGenerator tidak perlu tahu soal retry dan rate limit.
+    """
+
+    def __init__(self, client, is_async: bool = False, max_retries: int = None,
+                 backoff_base: float = None, backoff_max: float = None):
+        self.client = client
+        self.is_async = is_async
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("OPENAI_MAX_RETRIES", "6"))
+        self.backoff_base = backoff_base or float(os.getenv("OPENAI_BACKOFF_BASE", "0.5"))
+        self.backoff_max = backoff_max or float(os.getenv("OPENAI_BACKOFF_MAX", "30"))
+
+        self.embeddings = _ResilientEndpoint(self, client.embeddings, get_traffic("embedding"), _embedding_tokens)
+        self.chat = SimpleNamespace(
+            completions=_ResilientEndpoint(self, client.chat.completions, get_traffic("chat"), _chat_tokens))
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        # Full jitter: acak 0..batas, supaya request yang gagal bareng tidak retry bareng lagi
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after:
+            delay = max(delay, retry_after + random.uniform(0, self.backoff_base))
+        return delay
+
+    def _on_error(self, traffic: Traffic, error: Exception, attempt: int) -> float:
+        """Catat error; raise kalau tidak layak diulang, kalau layak kembalikan lama jeda (detik)."""
+        reason = _retry_reason(error)
+        if reason is None or attempt >= self.max_retries:
+            raise error
+        headers = _error_headers(error)
+        retry_after = _retry_after(headers)
+        if reason == "rate_limit":
+            traffic.limiter.on_throttle()
+            traffic.budget.update_from_headers(headers)
+            if retry_after:
+                traffic.budget.pause(retry_after)
+        OPENAI_RETRIES.inc(traffic=traffic.name, reason=reason)
+        delay = self._backoff(attempt, retry_after)
+        print(f"⏳ [OpenAI] {traffic.name}: {reason}, coba lagi dalam {delay:.1f} detik "
+              f"(percobaan {attempt + 1}/{self.max_retries})")
+        return delay
+
+    @staticmethod
+    def _hold_until_done(stream, limiter: AdaptiveLimiter):
+        """Slot konkurensi stream baru dilepas setelah stream habis dibaca."""
+        try:
+            yield from stream
+        finally:
+            limiter.release()
+
+    def _call(self, endpoint, traffic: Traffic, tokens: int, kwargs):
+        attempt = 0
+        while True:
+            wait = traffic.budget.reserve(tokens)
+            if wait:
+                time.sleep(wait)
+            traffic.limiter.acquire()
+            try:
+                raw_api = getattr(endpoint, "with_raw_response", None)
+                if raw_api is not None:
+                    raw = raw_api.create(**kwargs)
+                    response, headers = raw.parse(), raw.headers
+                else:
+                    response, headers = endpoint.create(**kwargs), None
+            except Exception as e:
+                traffic.limiter.release()
+                time.sleep(self._on_error(traffic, e, attempt))
+                attempt += 1
+                continue
+
+            traffic.budget.update_from_headers(headers)
+            traffic.limiter.on_success()
+            if kwargs.get("stream"):
+                return self._hold_until_done(response, traffic.limiter)
+            traffic.limiter.release()
+            return response
+
+    async def _acall(self, endpoint, traffic: Traffic, tokens: int, kwargs):
+        attempt = 0
+        while True:
+            wait = traffic.budget.reserve(tokens)
+            if wait:
+                await asyncio.sleep(wait)
+            await traffic.limiter.aacquire()
+            try:
+                raw_api = getattr(endpoint, "with_raw_response", None)
+                if raw_api is not None:
+                    raw = await raw_api.create(**kwargs)
+                    response, headers = raw.parse(), raw.headers
+                else:
+                    response, headers = await endpoint.create(**kwargs), None
+            except Exception as e:
+                traffic.limiter.release()
+                await asyncio.sleep(self._on_error(traffic, e, attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                traffic.limiter.release()  # dibatalkan (client putus)
+                raise
+
+            traffic.budget.update_from_headers(headers)
+            traffic.limiter.on_success()  # sebelum release, sama seperti _call
+            traffic.limiter.release()
+            return response
+
+
+_shared_lock = threading.Lock()
+_shared: Dict[str, ResilientOpenAI] = {}
+
+
+def shared_clients() -> Tuple[ResilientOpenAI, ResilientOpenAI]:
+    """(client sync, client async) bersama untuk seluruh proses. Retry bawaan SDK dimatikan, diganti lapisan ini."""
+    with _shared_lock:
+        if not _shared:
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY tidak ditemukan di .env")
+            _shared["sync"] = ResilientOpenAI(OpenAI(api_key=api_key, max_retries=0))
+            _shared["async"] = ResilientOpenAI(AsyncOpenAI(api_key=api_key, max_retries=0), is_async=True)
+        return _shared["sync"], _shared["async"]
@@ -0,0 +1,89 @@
+import asyncio
+import re
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from src.core.metrics import COALESCED_REQUESTS
+
+_EDGE_PUNCTUATION = re.compile(r"^[\W_]+|[\W_]+$")
+
+
+def normalize_question(question: str) -> str:
+    """Bentuk normal pertanyaan untuk kunci coalescing: huruf kecil, whitespace rapi, tanda baca di ujung dibuang."""
+    return _EDGE_PUNCTUATION.sub("", " ".join(question.lower().split()))
+
+
+def ask_key(question: str, document: Optional[str] = None, mode: Optional[str] = None,
+            n_drafts: Optional[int] = None) -> Tuple:
+    """Kunci /ask: request dengan kunci sama menghasilkan jawaban yang sama, jadi cukup dihitung sekali."""
+    return normalize_question(question), document, mode, n_drafts
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Single-flight untuk kode berbasis thread (Flask): kalau ada beberapa request dengan
+    kunci sama yang jalan bersamaan, hanya yang pertama (leader) yang menjalankan fn,
+    sisanya (follower) menunggu lalu menerima hasil/error yang sama.
+    Begitu selesai kuncinya dilepas, jadi request berikutnya menghitung ulang (bukan cache).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Mengembalikan (hasil, shared). shared=True kalau hasilnya menumpang request lain."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            COALESCED_REQUESTS.inc(flight=self.name)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value, False
+
+
+class AsyncSingleFlight:
+    """
+    Versi asyncio dari SingleFlight (server aiohttp). Pekerjaannya dijalankan sebagai task
+    tersendiri dan tiap pemanggil menunggu lewat asyncio.shield, jadi kalau request leader
+    dibatalkan (client putus), follower tetap dapat hasilnya.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        task = self._tasks.get(key)
+        shared = task is not None
+        if shared:
+            COALESCED_REQUESTS.inc(flight=self.name)
+        else:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return await asyncio.shield(task), shared
@@ -0,0 +1,138 @@
+import contextvars
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from src.core.metrics import span
+
+NO_CONTEXT_ANSWER = "Maaf, saya tidak menemukan pasal yang relevan dalam dokumen kontrak ini."
+
+
+@dataclass
+class BatchAuditJob:
+    job_id: str
+    questions: List[str]
+    document: Optional[str] = None
+    mode: Optional[str] = None
+    status: str = "queued"  # queued -> running -> done / failed
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    retrieval: Dict = field(default_factory=dict)
+    results: List[Optional[Dict]] = field(default_factory=list)
+
+    @property
+    def completed(self) -> int:
+        return sum(1 for item in self.results if item is not None)
+
+    def to_dict(self) -> Dict:
+        finished = self.finished_at or time.time()
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "document": self.document,
+            "mode": self.mode,
+            "total": len(self.questions),
+            "completed": self.completed,
+            "elapsed_seconds": round(finished - self.created_at, 3),
+            "error": self.error,
+            "retrieval": self.retrieval,
+            # Urutan sama dengan urutan pertanyaan; yang belum selesai bernilai null
+            "results": self.results,
+        }
+
+
+class BatchAuditRunner:
+    """
+    Menjalankan checklist pertanyaan terhadap satu dokumen sebagai job di background:
+    1. Semua pertanyaan di-embed & di-retrieve sekaligus (GraphRetriever.retrieve_many).
+    2. Jawaban di-generate bersamaan lewat pool bersama (BATCH_AUDIT_CONCURRENCY),
+       jadi beberapa job sekaligus pun tidak melewati batas panggilan paralel ke OpenAI.
+    Hasil tiap pertanyaan langsung masuk ke job begitu selesai, client tinggal polling.
+    """
+
+    def __init__(self, retriever, generator, max_concurrency: int = None,
+                 max_questions: int = None, max_jobs: int = None, top_k: int = 3):
+        self.retriever = retriever
+        self.generator = generator
+        self.top_k = top_k
+        self.max_concurrency = max_concurrency or int(os.getenv("BATCH_AUDIT_CONCURRENCY", "8"))
+        self.max_questions = max_questions or int(os.getenv("BATCH_AUDIT_MAX_QUESTIONS", "200"))
+        # Job lama (yang sudah selesai) dibuang kalau jumlahnya melewati batas ini
+        self.max_jobs = max_jobs or int(os.getenv("BATCH_AUDIT_MAX_JOBS", "100"))
+
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="batch-audit")
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, BatchAuditJob]" = OrderedDict()
+
+    def submit(self, questions: List[str], document: str = None, mode: str = None) -> BatchAuditJob:
+        questions = [q.strip() for q in questions if isinstance(q, str) and q.strip()]
+        if not questions:
+            raise ValueError("Daftar pertanyaan kosong")
+        if len(questions) > self.max_questions:
+            raise ValueError(f"Maksimal {self.max_questions} pertanyaan per batch")
+
+        job = BatchAuditJob(job_id=uuid.uuid4().hex, questions=questions, document=document, mode=mode,
+                            results=[None] * len(questions))
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._evict()
+        threading.Thread(target=self._run, args=(job,), daemon=True, name=f"batch-audit-{job.job_id[:8]}").start()
+        print(f"📋 [BatchAudit] Job {job.job_id} dimulai: {len(questions)} pertanyaan")
+        return job
+
+    def get(self, job_id: str) -> Optional[BatchAuditJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in ("done", "failed")]
+        while len(self._jobs) > self.max_jobs and finished:
+            del self._jobs[finished.pop(0)]
+
+    def _run(self, job: BatchAuditJob):
+        job.status = "running"
+        try:
+            # 1. Retrieve semua pertanyaan sekaligus
+            with span("batch_audit.retrieve"):
+                contexts, job.retrieval = self.retriever.retrieve_many(job.questions, top_k=self.top_k,
+                                                                       document=job.document)
+
+            # 2. Generate bersamaan (dibatasi pool bersama)
+            futures = [
+                self._pool.submit(contextvars.copy_context().run, self._answer, job, i, context)
+                for i, context in enumerate(contexts)
+            ]
+            for future in futures:
+                future.result()
+            job.status = "done"
+        except Exception as e:
+            print(f"❌ [BatchAudit] Job {job.job_id} gagal: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            print(f"✅ [BatchAudit] Job {job.job_id} {job.status}: "
+                  f"{job.completed}/{len(job.questions)} dalam {job.finished_at - job.created_at:.1f} detik")
+
+    def _answer(self, job: BatchAuditJob, index: int, context: List[Dict]):
+        question = job.questions[index]
+        item = {"index": index, "question": question, "sources": context}
+        try:
+            if not context:
+                item["answer"] = NO_CONTEXT_ANSWER
+            else:
+                with span("batch_audit.generate"):
+                    result = self.generator.generate_answer_detailed(question, context, mode=job.mode)
+                item["answer"] = result["answer"]
+                item["generation"] = {key: value for key, value in result.items() if key != "answer"}
+        except Exception as e:
+            # Satu pertanyaan gagal tidak menggagalkan seluruh checklist
+            print(f"❌ [BatchAudit] Pertanyaan #{index + 1} gagal: {e}")
+            item["error"] = str(e)
+        job.results[index] = item
@@ -0,0 +1,93 @@
+import re
+from typing import Optional, Set, Tuple
+
+# Aturan ekstraksi fakta "mekanis" dari teks hukum Bahasa Indonesia:
+# nomor Pasal, nominal rupiah, persentase, tanggal, dan jangka waktu.
+# Semua nilai dinormalisasi supaya "Rp 500 juta" == "Rp500.000.000" dan "0,5%" == "0.5 persen".
+
+PASAL_REF = re.compile(r"\bpasal\s*:?\s*(\d+[a-z]?)\b", re.IGNORECASE)
+
+_NUMBER = r"\d[\d.,]*"
+# Bentuk seperti "30 (tiga puluh)" umum di kontrak: angka diikuti ejaannya dalam kurung
+_SPELLED = r"(?:\s*\([^)]*\))?"
+_MULTIPLIERS = {"ribu": 1e3, "juta": 1e6, "miliar": 1e9, "milyar": 1e9, "triliun": 1e12}
+_MULTIPLIER = r"(?:\s*(ribu|juta|miliar|milyar|triliun)\b)?"
+
+AMOUNT_RP = re.compile(rf"\brp\.?\s*({_NUMBER}){_MULTIPLIER}", re.IGNORECASE)
+AMOUNT_RUPIAH = re.compile(rf"\b({_NUMBER}){_MULTIPLIER}{_SPELLED}\s*rupiah\b", re.IGNORECASE)
+PERCENT = re.compile(rf"\b({_NUMBER}){_SPELLED}\s*(?:%|persen\b)", re.IGNORECASE)
+DURATION = re.compile(rf"\b(\d+){_SPELLED}\s*(hari|minggu|bulan|tahun)\b", re.IGNORECASE)
+
+_MONTHS = {
+    "januari": 1, "februari": 2, "maret": 3, "april": 4, "mei": 5, "juni": 6, "juli": 7,
+    "agustus": 8, "september": 9, "oktober": 10, "november": 11, "desember": 12,
+}
+DATE_TEXT = re.compile(rf"\b(\d{{1,2}})\s+({'|'.join(_MONTHS)})\s+(\d{{4}})\b", re.IGNORECASE)
+DATE_NUMERIC = re.compile(r"\b(\d{1,2})[/-](\d{1,2})[/-](\d{4})\b")
+
+# Pertanyaan yang jawabannya pasti berupa angka / waktu
+ASKS_FOR_VALUE = re.compile(r"\b(berapa|kapan|tanggal|jangka waktu|batas waktu|paling lambat)\b", re.IGNORECASE)
+
+
+def parse_number(raw: str) -> Optional[float]:
+    """
+    Angka format Indonesia ("1.500.000", "0,5", "1,5") maupun Inggris ("1,500,000", "0.5").
+    Pemisah yang diikuti tepat 3 digit dianggap pemisah ribuan, selain itu desimal.
+    Kalau bagian bulatnya 0 ("0,125") pemisahnya selalu desimal.
+    """
+    raw = raw.strip(".,")
+    if not raw:
+        return None
+    if "." in raw and "," in raw:
+        # Pemisah yang muncul terakhir adalah desimal
+        decimal = "," if raw.rfind(",") > raw.rfind(".") else "."
+        thousands = "." if decimal == "," else ","
+        raw = raw.replace(thousands, "").replace(decimal, ".")
+    else:
+        for sep in ".,":
+            if sep in raw:
+                groups = raw.split(sep)
+                leading_zero = not groups[0].strip("0")
+                if not leading_zero and (len(groups) > 2 or all(len(g) == 3 for g in groups[1:])):
+                    raw = raw.replace(sep, "")
+                else:
+                    raw = raw.replace(sep, ".")
+    try:
+        return float(raw)
+    except ValueError:
+        return None
+
+
+def extract_pasal_refs(text: str) -> Set[str]:
+    return {match.lower() for match in PASAL_REF.findall(text)}
+
+
+def extract_amounts(text: str) -> Set[int]:
+    """Nominal rupiah, dinormalisasi ke rupiah penuh."""
+    amounts = set()
+    for pattern in (AMOUNT_RP, AMOUNT_RUPIAH):
+        for number, multiplier in pattern.findall(text):
+            value = parse_number(number)
+            if value is not None:
+                amounts.add(round(value * _MULTIPLIERS.get(multiplier.lower(), 1)))
+    return amounts
+
+
+def extract_percentages(text: str) -> Set[float]:
+    values = set()
+    for number in PERCENT.findall(text):
+        value = parse_number(number)
+        if value is not None:
+            values.add(round(value, 4))
+    return values
+
+
+def extract_durations(text: str) -> Set[Tuple[int, str]]:
+    return {(int(number), unit.lower()) for number, unit in DURATION.findall(text)}
+
+
+def extract_dates(text: str) -> Set[Tuple[int, int, int]]:
+    """Tanggal sebagai (tahun, bulan, hari)."""
+    dates = {(int(y), _MONTHS[m.lower()], int(d)) for d, m, y in DATE_TEXT.findall(text)}
+    dates |= {(int(y), int(m), int(d)) for d, m, y in DATE_NUMERIC.findall(text)}
+    return dates
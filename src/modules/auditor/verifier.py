@@ -0,0 +1,87 @@
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from src.core.metrics import VERIFIER_VERDICTS
+from src.modules.auditor import rules
+
+PASS = "PASS"
+FAIL = "FAIL"
+INCONCLUSIVE = "INCONCLUSIVE"
+
+
+@dataclass
+class Verdict:
+    status: str  # PASS / FAIL / INCONCLUSIVE
+    feedback: str
+    problems: List[str] = field(default_factory=list)
+
+    def as_critique(self) -> Dict[str, str]:
+        """Bentuk yang sama dengan output Critic LLM."""
+        return {"status": self.status, "feedback": self.feedback}
+
+
+class LocalVerifier:
+    """
+    Pemeriksa deterministik yang jalan sebelum Critic LLM, tanpa panggilan API:
+    - Nomor Pasal yang dikutip draft harus ada di konteks.
+    - Nominal rupiah, persentase, tanggal, dan jangka waktu di draft harus muncul di pasal sumber.
+    Hasil:
+    - FAIL         : ada yang jelas salah -> langsung revisi, Critic tidak dipanggil.
+    - PASS         : draft mengutip Pasal & angka/tanggal, dan semuanya cocok dengan sumber -> Critic tidak dipanggil.
+    - INCONCLUSIVE : tidak cukup bukti (misal draft tidak mengutip Pasal, atau jawabannya kualitatif
+                     tanpa angka yang bisa dicek) -> serahkan ke Critic LLM.
+    """
+
+    def __init__(self, trust_pass: bool = None):
+        # Set VERIFIER_TRUST_PASS=0 kalau PASS lokal tetap mau dicek ulang oleh Critic LLM
+        if trust_pass is None:
+            trust_pass = os.getenv("VERIFIER_TRUST_PASS", "1") == "1"
+        self.trust_pass = trust_pass
+
+    def verify(self, question: str, context: str, draft: str) -> Verdict:
+        verdict = self._verify(question, context, draft)
+        if verdict.status == PASS and not self.trust_pass:
+            verdict = Verdict(INCONCLUSIVE, verdict.feedback)
+        VERIFIER_VERDICTS.inc(verdict=verdict.status)
+        return verdict
+
+    def _verify(self, question: str, context: str, draft: str) -> Verdict:
+        if not draft or not draft.strip():
+            return Verdict(FAIL, "Jawaban kosong. Tulis jawaban berdasarkan pasal di konteks.", ["draft kosong"])
+
+        problems = []
+
+        # 1. Pasal yang dikutip harus ada di konteks
+        cited = rules.extract_pasal_refs(draft)
+        unknown = sorted(cited - rules.extract_pasal_refs(context))
+        if unknown:
+            problems.append(f"Pasal {', '.join(unknown)} tidak ada di konteks")
+
+        # 2. Fakta angka harus ada di pasal sumber
+        draft_values = 0
+        checks = (
+            ("Nominal", rules.extract_amounts, lambda v: f"Rp {v:,}".replace(",", ".")),
+            ("Persentase", rules.extract_percentages, lambda v: f"{v:g}%"),
+            ("Jangka waktu", rules.extract_durations, lambda v: f"{v[0]} {v[1]}"),
+            ("Tanggal", rules.extract_dates, lambda v: f"{v[2]:02d}-{v[1]:02d}-{v[0]}"),
+        )
+        for label, extract, fmt in checks:
+            values = extract(draft)
+            draft_values += len(values)
+            missing = values - extract(context)
+            if missing:
+                problems.append(f"{label} {', '.join(fmt(v) for v in sorted(missing))} tidak ditemukan di pasal sumber")
+
+        if problems:
+            return Verdict(FAIL, "; ".join(problems) + ". Perbaiki supaya hanya memakai fakta dari konteks.", problems)
+
+        # 3. Tidak ada yang salah, tapi apakah cukup bukti untuk lolos?
+        if not cited:
+            return Verdict(INCONCLUSIVE, "Draft tidak mengutip nomor Pasal.")
+        if not draft_values:
+            # Klaim kualitatif ("boleh membatalkan sepihak") tidak bisa dicek secara mekanis
+            if rules.ASKS_FOR_VALUE.search(question):
+                return Verdict(INCONCLUSIVE, "Pertanyaan meminta angka/waktu, tapi draft tidak menyebutkannya.")
+            return Verdict(INCONCLUSIVE, "Draft tidak memuat angka/tanggal yang bisa dicek lokal.")
+        return Verdict(PASS, "Oke (verifikasi lokal: pasal & angka sesuai sumber)")
@@ -0,0 +1,291 @@
+import argparse
+import glob
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+# --- FIX PATH --- (ingestion -> modules -> src -> ROOT)
+project_root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../.."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.core.metrics import span
+from src.modules.ingestion.parser import LegalDocParser
+from src.modules.ingestion.pdf_extractor import PDFExtractor
+from src.modules.rag.graph_store import GraphStore
+
+STAGES = ("extract", "parse", "embed", "write")
+
+# Penanda akhir antrian
+_DONE = object()
+
+
+def _extract_document(file_path: str) -> List[str]:
+    """Worker process: baca 1 PDF per halaman (serial per dokumen, paralelnya antar dokumen)."""
+    # workers=1 -> OCR halaman scan juga dijalankan langsung di proses ini (tanpa pool bersarang)
+    return list(PDFExtractor(workers=1, ocr_workers=1).iter_pages(file_path, parallel=False))
+
+
+def list_input_files(source: str) -> List[str]:
+    """
+    `source` bisa berupa folder (semua *.pdf di dalamnya, rekursif) atau file manifest:
+    .json berisi list path, atau teks biasa dengan 1 path per baris.
+    """
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, "**", "*.pdf"), recursive=True))
+
+    with open(source, encoding="utf-8") as f:
+        if source.endswith(".json"):
+            paths = json.load(f)
+        else:
+            paths = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    base_dir = os.path.dirname(os.path.abspath(source))
+    return [path if os.path.isabs(path) else os.path.join(base_dir, path) for path in paths]
+
+
+def document_names(files: Iterable[str], root: Optional[str] = None) -> Dict[str, str]:
+    """
+    Nama dokumen (Document.filename) per path. Dengan `root` (sumber berupa folder):
+    path relatif terhadap folder itu, misal "2023/kontrak.pdf" -- file sama nama di
+    subfolder berbeda tetap jadi dokumen terpisah. Tanpa `root`: nama file saja.
+    Nama yang bentrok ditolak, karena diff-apply akan menganggapnya 1 dokumen
+    dan menghapus Ayat milik file lainnya.
+    """
+    names: Dict[str, str] = {}
+    owners: Dict[str, str] = {}
+    for path in files:
+        name = os.path.relpath(path, root).replace(os.sep, "/") if root else os.path.basename(path)
+        if name in owners and os.path.abspath(owners[name]) != os.path.abspath(path):
+            raise ValueError(f"Nama dokumen '{name}' dipakai 2 file: {owners[name]} dan {path}")
+        owners[name] = path
+        names[path] = name
+    return names
+
+
+class Checkpoint:
+    """
+    File JSONL berisi dokumen yang sudah selesai. Kuncinya path + ukuran + mtime,
+    jadi file yang diubah setelah di-ingest akan diproses lagi.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.completed = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        if record.get("status") == "done":
+                            self.completed.add(record["key"])
+
+    @staticmethod
+    def key_for(file_path: str) -> str:
+        stat = os.stat(file_path)
+        return f"{os.path.abspath(file_path)}|{stat.st_size}|{int(stat.st_mtime)}"
+
+    def record(self, key: str, status: str, **extra):
+        entry = {"key": key, "status": status, "finished_at": time.time(), **extra}
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+            if status == "done":
+                self.completed.add(key)
+
+
+class StageStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.documents = 0
+        self.clauses = 0
+        self.busy_seconds = 0.0
+        self.errors = 0
+
+    def add(self, seconds: float, clauses: int = 0, error: bool = False):
+        with self._lock:
+            self.busy_seconds += seconds
+            if error:
+                self.errors += 1
+            else:
+                self.documents += 1
+                self.clauses += clauses
+
+
+class BulkIngestionRunner:
+    """
+    Runner ingest massal: extract -> parse -> embed -> write berjalan sebagai
+    stage paralel yang disambung antrian terbatas (bounded queue), jadi stage
+    lambat otomatis menahan stage di depannya tanpa memori meledak.
+    Satu GraphStore (1 driver Neo4j + 1 EmbeddingService) dipakai bersama.
+    """
+
+    def __init__(self, graph_store: GraphStore, checkpoint_path: str,
+                 workers: Optional[Dict[str, int]] = None, queue_size: int = 8):
+        self.graph_store = graph_store
+        self.checkpoint = Checkpoint(checkpoint_path)
+        self.workers = {"extract": os.cpu_count() or 2, "parse": 1, "embed": 2, "write": 1}
+        self.workers.update(workers or {})
+        self.queue_size = queue_size
+        # Parser reentrant: 1 instance dipakai bersama semua worker parse
+        self.parser = LegalDocParser()
+        self.stats = {stage: StageStats() for stage in STAGES}
+
+    def run(self, files: Iterable[str], root: Optional[str] = None) -> Dict:
+        """`root`: folder sumber; nama dokumen = path relatif terhadapnya (lihat document_names)."""
+        files = list(files)
+        names = document_names(files, root)
+        todo = []
+        missing = 0
+        for path in files:
+            try:
+                key = Checkpoint.key_for(path)
+            except OSError as e:
+                # File di manifest hilang/tak terbaca: catat gagal, batch tetap jalan
+                missing += 1
+                self.stats["extract"].add(0.0, error=True)
+                print(f"   ❌ [extract] {names[path]}: {e}")
+                self.checkpoint.record(os.path.abspath(path), "failed", stage="extract", error=str(e))
+                continue
+            if key not in self.checkpoint.completed:
+                todo.append({"path": path, "key": key, "filename": names[path]})
+        done = len(files) - len(todo) - missing
+        print(f"🚀 [BulkRunner] {len(files)} file, {done} sudah selesai (checkpoint), {missing} tidak ditemukan, {len(todo)} diproses.")
+
+        queues = {stage: queue.Queue(maxsize=self.queue_size) for stage in STAGES}
+        started = time.time()
+
+        with ProcessPoolExecutor(max_workers=self.workers["extract"]) as extract_pool:
+            handlers = {
+                "extract": lambda item: self._extract(item, extract_pool),
+                "parse": self._parse,
+                "embed": self._embed,
+                "write": self._write,
+            }
+            threads = []
+            for i, stage in enumerate(STAGES):
+                next_queue = queues[STAGES[i + 1]] if i + 1 < len(STAGES) else None
+                threads.extend(self._start_stage(stage, handlers[stage], queues[stage], next_queue))
+
+            # Producer: isi antrian pertama (blocking kalau penuh)
+            for item in todo:
+                queues["extract"].put(item)
+            for _ in range(self.workers["extract"]):
+                queues["extract"].put(_DONE)
+
+            for thread in threads:
+                thread.join()
+
+        elapsed = time.time() - started
+        summary = self._summary(elapsed)
+        print(f"🏁 [BulkRunner] Selesai dalam {elapsed:.1f} detik.")
+        for stage, numbers in summary["stages"].items():
+            print(f"   {stage:<8} {numbers['documents_per_s']:>8.2f} dok/s  "
+                  f"{numbers['clauses_per_s']:>9.1f} ayat/s  (busy {numbers['busy_seconds']:.1f}s, error {numbers['errors']})")
+        return summary
+
+    def _start_stage(self, stage, handler, in_queue, out_queue) -> List[threading.Thread]:
+        n_workers = self.workers[stage]
+        remaining = [n_workers]
+        lock = threading.Lock()
+
+        def worker():
+            while True:
+                item = in_queue.get()
+                if item is _DONE:
+                    break
+                t0 = time.time()
+                try:
+                    with span(f"ingest.{stage}"):
+                        clauses = handler(item)
+                    self.stats[stage].add(time.time() - t0, clauses or 0)
+                    if out_queue is not None:
+                        out_queue.put(item)
+                except Exception as e:
+                    self.stats[stage].add(time.time() - t0, error=True)
+                    print(f"   ❌ [{stage}] {item['filename']}: {e}")
+                    self.checkpoint.record(item["key"], "failed", stage=stage, error=str(e))
+
+            # Worker terakhir di stage ini yang meneruskan sinyal selesai ke stage berikutnya
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last and out_queue is not None:
+                for _ in range(self.workers[STAGES[STAGES.index(stage) + 1]]):
+                    out_queue.put(_DONE)
+
+        threads = [threading.Thread(target=worker, name=f"{stage}-{i}", daemon=True) for i in range(n_workers)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    # --- HANDLER TIAP STAGE (mengembalikan jumlah ayat yang diproses) ---
+    def _extract(self, item, pool) -> int:
+        item["pages"] = pool.submit(_extract_document, item["path"]).result()
+        return 0
+
+    def _parse(self, item) -> int:
+        item["articles"] = [article.to_dict() for article in self.parser.parse_stream(item.pop("pages"))]
+        return sum(len(article.get("isi", [])) for article in item["articles"])
+
+    def _embed(self, item) -> int:
+        plan = self.graph_store.plan_ingest(item["filename"], item.pop("articles"))
+        if plan.empty_parse:
+            # Jangan dicatat "done": setelah parser/OCR diperbaiki, dokumen ini harus diproses ulang
+            raise ValueError("parser tidak menghasilkan Ayat, data lama dipertahankan")
+        if not plan.skipped:
+            self.graph_store.embed_plan(plan)
+        item["plan"] = plan
+        return len(plan.rows)
+
+    def _write(self, item) -> int:
+        plan = item.pop("plan")
+        if not plan.skipped:
+            self.graph_store.apply_plan(plan)
+        report = plan.report()
+        self.checkpoint.record(item["key"], "done", file=item["path"], report=report)
+        return report["added"] + report["updated"]
+
+    def _summary(self, elapsed: float) -> Dict:
+        stages = {}
+        for stage, stats in self.stats.items():
+            stages[stage] = {
+                "documents": stats.documents,
+                "clauses": stats.clauses,
+                "errors": stats.errors,
+                "busy_seconds": round(stats.busy_seconds, 3),
+                "documents_per_s": stats.documents / elapsed if elapsed else 0.0,
+                "clauses_per_s": stats.clauses / elapsed if elapsed else 0.0,
+            }
+        return {"elapsed_seconds": round(elapsed, 3), "stages": stages}
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Ingest massal PDF ke Neo4j (resumable).")
+    arg_parser.add_argument("source", help="Folder berisi PDF atau file manifest (.txt / .json)")
+    arg_parser.add_argument("--checkpoint", default="data/processed/bulk_checkpoint.jsonl")
+    arg_parser.add_argument("--queue-size", type=int, default=8)
+    for stage_name in STAGES:
+        arg_parser.add_argument(f"--{stage_name}-workers", type=int, default=None)
+    args = arg_parser.parse_args()
+
+    stage_workers = {
+        stage_name: getattr(args, f"{stage_name}_workers")
+        for stage_name in STAGES if getattr(args, f"{stage_name}_workers")
+    }
+
+    store = GraphStore()
+    try:
+        store.setup_database()
+        runner = BulkIngestionRunner(store, args.checkpoint, workers=stage_workers, queue_size=args.queue_size)
+        source_root = args.source if os.path.isdir(args.source) else None
+        runner.run(list_input_files(args.source), root=source_root)
+    finally:
+        store.close()
@@ -1,93 +1,96 @@
 import re
 import json
-from typing import List, Dict, Optional
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+# --- REGEX PATTERNS (di-compile sekali saat modul di-load) ---
+# 1. Menangkap "PASAL 1", "Pasal 20", "PASAL  3" (Case insensitive)
+# ^\s* = Toleransi spasi di awal baris
+PASAL_PATTERN = re.compile(r"^\s*PASAL\s+(\d+)", re.IGNORECASE)
+
+# 2. Menangkap Sub-poin/Ayat: "1.", "a.", "1)", "a)"
+# \s* = Spasi di awal
+# ([a-zA-Z0-9]+) = Huruf atau Angka
+# [\.\)] = Diikuti Titik atau Kurung Tutup
+SUBPOINT_PATTERN = re.compile(r"^\s*([a-zA-Z0-9]+)[\.\)]\s+")
+
+
+class Article(NamedTuple):
+    """Satu Pasal hasil parsing (ringkas & immutable)."""
+    nomor: str
+    judul: str
+    isi: tuple  # Tuple of strings (Ayat)
+
+    def to_dict(self) -> Dict:
+        return {"nomor": self.nomor, "judul": self.judul, "isi": list(self.isi)}
+
 
 class LegalDocParser:
     """
     Parser khusus untuk dokumen hukum Indonesia (PPJB, SHM, UU).
     Mengubah teks mentah menjadi struktur JSON hierarkis (Pasal -> Ayat).
+    Semua state parsing ada di variabel lokal, jadi 1 instance aman
+    dipakai bersamaan oleh banyak thread.
     """
 
+    PASAL_PATTERN = PASAL_PATTERN
+    SUBPOINT_PATTERN = SUBPOINT_PATTERN
+
     def __init__(self):
-        # --- REGEX PATTERNS ---
-        # 1. Menangkap "PASAL 1", "Pasal 20", "PASAL  3" (Case insensitive)
-        # ^\s* = Toleransi spasi di awal baris
-        self.PASAL_PATTERN = r"(?i)^\s*PASAL\s+(\d+)"
-        
-        # 2. Menangkap Sub-poin/Ayat: "1.", "a.", "1)", "a)"
-        # \s* = Spasi di awal
-        # ([a-zA-Z0-9]+) = Huruf atau Angka
-        # [\.\)] = Diikuti Titik atau Kurung Tutup
-        self.SUBPOINT_PATTERN = r"^\s*([a-zA-Z0-9]+)[\.\)]\s+"
-
-        # State Variables
-        self.current_article: Optional[Dict] = None
+        # Hasil parse() terakhir, hanya untuk helper save_to_json
         self.parsed_data: List[Dict] = []
 
-    def _reset_state(self):
-        """Menyiapkan wadah untuk pasal baru"""
-        self.current_article = {
-            "nomor": "",
-            "judul": "",
-            "isi": [] # List of strings (Ayat)
-        }
+    def parse_stream(self, chunks: Iterable[str]) -> Iterator[Article]:
+        """
+        Mode streaming: `chunks` berisi baris atau halaman utuh (misal dari
+        PDFExtractor.iter_pages atau file yang dibuka). Setiap Pasal langsung
+        di-yield begitu header PASAL berikutnya muncul, jadi memori tetap kecil
+        berapa pun panjang dokumennya.
+        """
+        nomor: Optional[str] = None
+        judul = ""
+        isi: List[str] = []
+
+        for chunk in chunks:
+            for line in chunk.split("\n"):
+                line = line.strip()
+                if not line:
+                    continue
 
-    def _save_current_article(self):
-        """Menyimpan pasal yang sedang diproses ke list hasil"""
-        if self.current_article and self.current_article["nomor"]:
-            self.parsed_data.append(self.current_article)
-            self.current_article = None
+                # --- LOGIC 1: DETEKSI PASAL BARU ---
+                pasal_match = PASAL_PATTERN.match(line)
+                if pasal_match:
+                    # Kirim pasal sebelumnya jika ada, lalu buka pasal baru
+                    if nomor:
+                        yield Article(nomor, judul, tuple(isi))
+                    nomor, judul, isi = pasal_match.group(1), "", []
+                    continue
+
+                # --- LOGIC 2: DETEKSI KONTEN (Jika sedang di dalam Pasal) ---
+                if nomor is None:
+                    continue
+                # Baris pertama setelah "PASAL X" yang bukan ayat adalah JUDUL,
+                # selain itu (ayat / kelanjutan teks / narasi bebas) masuk ke isi
+                if judul == "" and not SUBPOINT_PATTERN.match(line):
+                    judul = line
+                else:
+                    isi.append(line)
+
+        # Jangan lupa kirim pasal terakhir (End of File)
+        if nomor:
+            yield Article(nomor, judul, tuple(isi))
 
     def parse(self, text: str) -> List[Dict]:
         """
         Main logic: Menerima string panjang, mengembalikan List of Dict.
         """
-        # Reset data setiap kali parse dipanggil
-        self.parsed_data = []
-        self.current_article = None
-
-        lines = text.split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            # --- LOGIC 1: DETEKSI PASAL BARU ---
-            pasal_match = re.search(self.PASAL_PATTERN, line)
-            if pasal_match:
-                # Simpan pasal sebelumnya jika ada
-                self._save_current_article()
-                
-                # Buka pasal baru
-                self._reset_state()
-                self.current_article["nomor"] = pasal_match.group(1)
-                continue
-
-            # --- LOGIC 2: DETEKSI KONTEN (Jika sedang di dalam Pasal) ---
-            if self.current_article:
-                # Cek apakah ini Ayat/Sub-poin?
-                if re.search(self.SUBPOINT_PATTERN, line):
-                    self.current_article["isi"].append(line)
-                else:
-                    # Jika bukan ayat, kemungkinan ini JUDUL atau kelanjutan teks
-                    if self.current_article["judul"] == "":
-                        # Asumsi: Baris pertama setelah "PASAL X" yang bukan ayat adalah JUDUL
-                        self.current_article["judul"] = line
-                    else:
-                        # Jika judul sudah ada, anggap ini kelanjutan ayat terakhir
-                        # Atau teks narasi bebas (masukkan ke isi saja)
-                        self.current_article["isi"].append(line)
-
-        # Jangan lupa simpan pasal terakhir (End of File)
-        self._save_current_article()
-        
-        return self.parsed_data
-
-    def save_to_json(self, output_path: str):
+        parsed_data = [article.to_dict() for article in self.parse_stream(text.split("\n"))]
+        self.parsed_data = parsed_data
+        return parsed_data
+
+    def save_to_json(self, output_path: str, data: List[Dict] = None):
         """Helper untuk menyimpan hasil ke file JSON"""
         with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(self.parsed_data, f, indent=2, ensure_ascii=False)
+            json.dump(data if data is not None else self.parsed_data, f, indent=2, ensure_ascii=False)
 
 # --- BLOK TESTING (Opsional, hapus saat production) ---
 if __name__ == "__main__":
@@ -1,24 +1,230 @@
+import importlib.util
+import multiprocessing
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Tuple
 import pdfplumber
 
+# pdfminer menulis glyph tanpa mapping unicode sebagai "(cid:123)"
+_CID_PATTERN = re.compile(r"\(cid:\d+\)")
+# Karakter yang wajar muncul di teks hukum berbahasa Indonesia
+_READABLE_PUNCTUATION = set(".,;:()/-\"'%&§")
+
+# Engine OCR dibuat sekali per proses worker (load model ONNX itu mahal)
+_OCR_ENGINE = None
+_CLEANER = None
+
+
+def looks_unreadable(text: str, min_chars: int = 20) -> bool:
+    """
+    True kalau teks layer sebuah halaman kosong/terlalu pendek, didominasi
+    "(cid:..)", atau kebanyakan isinya karakter aneh (font tanpa mapping).
+    """
+    stripped = text.strip()
+    if len(stripped) < min_chars:
+        return True
+    without_cid = _CID_PATTERN.sub("", stripped)
+    if len(without_cid) < len(stripped) * 0.7:
+        return True
+    readable = sum(1 for ch in without_cid if ch.isalnum() or ch.isspace() or ch in _READABLE_PUNCTUATION)
+    return readable < len(without_cid) * 0.7
+
+
+def _page_needs_ocr(page, text: str, min_chars: int) -> bool:
+    # Halaman benar-benar kosong (tanpa teks & tanpa gambar) tidak perlu di-OCR
+    return looks_unreadable(text, min_chars) and bool(text.strip() or page.images)
+
+
+def _extract_page_range(file_path: str, start: int, end: int,
+                        detect_ocr: bool = False, ocr_min_chars: int = 20) -> List[Tuple[str, bool]]:
+    """
+    Worker (jalan di proses terpisah): ekstrak teks halaman [start, end), index mulai 0.
+    Hanya halaman di rentang ini yang di-load oleh pdfplumber.
+    Mengembalikan (teks, perlu_ocr) per halaman.
+    """
+    pages = []
+    with pdfplumber.open(file_path, pages=list(range(start + 1, end + 1))) as pdf:
+        for page in pdf.pages:
+            text = page.extract_text() or ""
+            pages.append((text, detect_ocr and _page_needs_ocr(page, text, ocr_min_chars)))
+            # Buang cache objek layout halaman supaya memori worker tidak terus naik
+            page.close()
+    return pages
+
+
+def _ocr_page(file_path: str, page_index: int, dpi: int) -> str:
+    """
+    Worker OCR: render 1 halaman, luruskan dengan DocumentCleaner, lalu baca
+    dengan RapidOCR (onnxruntime, CPU). Import berat dilakukan di sini supaya
+    proses yang tidak pernah OCR tidak ikut memuat OpenCV/ONNX.
+    """
+    global _OCR_ENGINE, _CLEANER
+    import cv2
+    import numpy as np
+    from rapidocr_onnxruntime import RapidOCR
+    from src.modules.ingestion.cleaner import DocumentCleaner
+
+    if _OCR_ENGINE is None:
+        _OCR_ENGINE = RapidOCR()
+        _CLEANER = DocumentCleaner(workers=1)
+
+    with pdfplumber.open(file_path, pages=[page_index + 1]) as pdf:
+        rendered = pdf.pages[0].to_image(resolution=dpi).original
+
+    image = cv2.cvtColor(np.asarray(rendered.convert("RGB")), cv2.COLOR_RGB2BGR)
+    image, _ = _CLEANER.deskew(image)
+    result, _ = _OCR_ENGINE(image)
+    # result: [[box, teks, skor], ...] sudah urut atas -> bawah
+    return "\n".join(line[1] for line in result or [])
+
+
 class PDFExtractor:
     """
     Kelas khusus untuk membaca teks dari PDF secara gratis (Offline).
     Menggantikan fungsi Azure Document Intelligence.
     """
-    
-    def extract_text(self, file_path: str) -> str:
+
+    def __init__(self, workers: int = None, pages_per_task: int = None, parallel_min_pages: int = None,
+                 ocr: bool = None, ocr_workers: int = None):
+        # Jumlah proses untuk mode paralel & ukuran potongan halaman per tugas
+        self.workers = workers or int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 2)))
+        self.pages_per_task = pages_per_task or int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+        # Di bawah jumlah halaman ini, overhead proses lebih mahal dari manfaatnya
+        self.parallel_min_pages = parallel_min_pages or int(os.getenv("PDF_PARALLEL_MIN_PAGES", "24"))
+
+        # OCR hanya untuk halaman scan / teks rusak (butuh rapidocr-onnxruntime)
+        if ocr is None:
+            ocr = os.getenv("PDF_OCR", "1") == "1"
+        self.ocr = ocr and importlib.util.find_spec("rapidocr_onnxruntime") is not None
+        if ocr and not self.ocr:
+            print("⚠️ [PDFExtractor] rapidocr-onnxruntime tidak terpasang, halaman scan tidak akan di-OCR.")
+        self.ocr_workers = ocr_workers or int(os.getenv("PDF_OCR_WORKERS", str(self.workers)))
+        if multiprocessing.parent_process() is not None:
+            # Extractor ini sendiri jalan di worker proses (misal bulk runner): OCR langsung,
+            # jangan bikin pool bersarang apa pun isi PDF_OCR_WORKERS
+            self.ocr_workers = 1
+        self.ocr_dpi = int(os.getenv("PDF_OCR_DPI", "300"))
+        self.ocr_min_chars = int(os.getenv("PDF_OCR_MIN_CHARS", "20"))
+
+    def extract_text(self, file_path: str, parallel: bool = None) -> str:
         print(f"📄 [PDFExtractor] Membaca file: {file_path}")
-        full_text = ""
-        
+
         try:
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        # Gabungkan teks dan beri jeda baris
-                        full_text += text + "\n"
-            return full_text
-            
+            # Gabungkan teks dan beri jeda baris (join sekali di akhir, bukan += per halaman)
+            return "".join(text + "\n" for text in self.iter_pages(file_path, parallel) if text)
+
         except Exception as e:
             print(f"❌ Error saat membaca PDF: {e}")
-            raise e
\ No newline at end of file
+            raise e
+
+    def iter_pages(self, file_path: str, parallel: bool = None) -> Iterator[str]:
+        """
+        Generator: yield teks tiap halaman SESUAI URUTAN, begitu halaman itu siap.
+        Halaman tanpa teks menghasilkan string kosong. Halaman scan / teks rusak
+        diganti hasil OCR (kalau OCR aktif).
+        parallel=None -> otomatis paralel kalau jumlah halaman >= parallel_min_pages.
+        """
+        yield from self._route_ocr(file_path, self._iter_text_layer(file_path, parallel))
+
+    def _iter_text_layer(self, file_path: str, parallel: bool = None) -> Iterator[Tuple[str, bool]]:
+        """Yield (teks, perlu_ocr) per halaman dari text layer PDF."""
+        with pdfplumber.open(file_path) as pdf:
+            total_pages = len(pdf.pages)
+
+            if parallel is None:
+                parallel = self.workers > 1 and total_pages >= self.parallel_min_pages
+
+            if not parallel:
+                for page in pdf.pages:
+                    text = page.extract_text() or ""
+                    yield text, self.ocr and _page_needs_ocr(page, text, self.ocr_min_chars)
+                    page.close()
+                return
+
+        yield from self._iter_pages_parallel(file_path, total_pages)
+
+    def _iter_pages_parallel(self, file_path: str, total_pages: int) -> Iterator[Tuple[str, bool]]:
+        """
+        Potong dokumen jadi rentang halaman, ekstrak di process pool.
+        Hanya `workers * 2` rentang yang boleh "in flight", jadi memori tetap terbatas
+        berapa pun jumlah halamannya.
+        """
+        ranges = [
+            (start, min(start + self.pages_per_task, total_pages))
+            for start in range(0, total_pages, self.pages_per_task)
+        ]
+        max_in_flight = self.workers * 2
+        print(f"⚡ [PDFExtractor] Mode paralel: {total_pages} halaman, {len(ranges)} tugas, {self.workers} proses")
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+            next_range = 0
+            while pending or next_range < len(ranges):
+                # Isi antrian sampai batas in-flight
+                while next_range < len(ranges) and len(pending) < max_in_flight:
+                    start, end = ranges[next_range]
+                    pending.append(pool.submit(_extract_page_range, file_path, start, end,
+                                               self.ocr, self.ocr_min_chars))
+                    next_range += 1
+
+                # Ambil hasil paling depan (menjaga urutan halaman)
+                for page in pending.popleft().result():
+                    yield page
+
+    def _route_ocr(self, file_path: str, pages: Iterator[Tuple[str, bool]]) -> Iterator[str]:
+        """
+        Halaman digital langsung diteruskan; halaman yang perlu OCR dikirim ke pool OCR
+        (dibuat hanya kalau memang ada halaman scan). Hasil digabung lagi sesuai urutan
+        halaman, dengan buffer terbatas supaya memori tidak tumbuh tanpa batas.
+        """
+        pool = None
+        pending = deque()  # isi: teks siap pakai, atau (future, teks_asli, nomor_halaman)
+        max_buffered = self.ocr_workers * 4
+        ocr_pages = 0
+
+        def pop_front() -> str:
+            item = pending.popleft()
+            if isinstance(item, str):
+                return item
+            future, original, page_index = item
+            try:
+                return future.result()
+            except Exception as e:
+                print(f"⚠️ [PDFExtractor] OCR halaman {page_index + 1} gagal ({e}), pakai teks layer.")
+                return original
+
+        try:
+            for page_index, (text, needs_ocr) in enumerate(pages):
+                if needs_ocr and self.ocr_workers <= 1:
+                    # Tanpa pool (misal sudah di dalam worker proses): OCR langsung di sini
+                    pending.append(self._ocr_inline(file_path, page_index, text))
+                    ocr_pages += 1
+                elif needs_ocr:
+                    if pool is None:
+                        pool = ProcessPoolExecutor(max_workers=self.ocr_workers)
+                    pending.append((pool.submit(_ocr_page, file_path, page_index, self.ocr_dpi), text, page_index))
+                    ocr_pages += 1
+                else:
+                    pending.append(text)
+
+                # Keluarkan halaman depan yang sudah siap; tunggu kalau buffer penuh
+                while pending and (isinstance(pending[0], str) or pending[0][0].done()
+                                   or len(pending) > max_buffered):
+                    yield pop_front()
+
+            while pending:
+                yield pop_front()
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+            if ocr_pages:
+                print(f"🔎 [PDFExtractor] {ocr_pages} halaman scan dibaca dengan OCR.")
+
+    def _ocr_inline(self, file_path: str, page_index: int, original: str) -> str:
+        try:
+            return _ocr_page(file_path, page_index, self.ocr_dpi)
+        except Exception as e:
+            print(f"⚠️ [PDFExtractor] OCR halaman {page_index + 1} gagal ({e}), pakai teks layer.")
+            return original
@@ -19,6 +19,7 @@ print(f"📂 Project Root diset ke: {project_root}")
 
 # --- BARU LAKUKAN IMPORT SETELAH PATH DI-SET ---
 try:
+    from src.core.metrics import span
     from src.modules.ingestion.pdf_extractor import PDFExtractor
     from src.modules.ingestion.parser import LegalDocParser
     from src.modules.rag.graph_store import GraphStore
@@ -39,20 +40,20 @@ def run_ingestion_pipeline(file_path: str, output_json_path: str):
         print(f"❌ [INIT ERROR] Gagal inisialisasi modul: {e}")
         return
 
-    # 2. EKSTRAKSI (Tugas Karyawan 1)
+    # 2 + 3. EKSTRAKSI & TRANSFORMASI (Karyawan 1 & 2 kerja bareng)
+    # Halaman PDF langsung dialirkan ke parser, tiap Pasal selesai langsung diterima,
+    # jadi teks mentah satu dokumen tidak pernah ditampung utuh di memori.
+    print("⚙️ [Step 1-2] Membaca PDF & Parsing Struktur Pasal (streaming)...")
+    structured_data = []
     try:
-        print("step 1")
-        raw_text = extractor.extract_text(file_path)
-        print(f"   ✅ Berhasil membaca PDF. Total: {len(raw_text)} karakter")
+        with span("ingest.extract_parse"):
+            for article in parser.parse_stream(extractor.iter_pages(file_path)):
+                structured_data.append(article.to_dict())
+        print(f"   ✅ Ditemukan {len(structured_data)} Pasal.")
     except Exception as e:
-        print(f"   ❌ Gagal baca PDF, pipeline berhenti.")
+        print(f"   ❌ Gagal baca PDF, pipeline berhenti: {e}")
         return
 
-    # 3. TRANSFORMASI (Tugas Karyawan 2)
-    print("⚙️ [Step 2] Parsing Struktur Pasal...")
-    structured_data = parser.parse(raw_text)
-    print(f"   ✅ Ditemukan {len(structured_data)} Pasal.")
-
     # 4. BACKUP DATA (Administrasi)
     print("💾 [Step 3] Menyimpan backup JSON...")
     os.makedirs(os.path.dirname(output_json_path), exist_ok=True)
@@ -64,8 +65,10 @@ def run_ingestion_pipeline(file_path: str, output_json_path: str):
     try:
         graph_store.setup_database()
         filename = os.path.basename(file_path)
-        graph_store.ingest_document(filename, structured_data)
+        report = graph_store.ingest_document(filename, structured_data)
         graph_store.close()
+        print(f"   📊 Ayat baru: {report['added']}, berubah: {report['updated']}, "
+              f"sama: {report['unchanged']}, dihapus: {report['deleted']}, gagal: {report['failed']}")
         print("🎉 SUKSES BESAR! Data PDF sudah masuk ke Otak AI.")
     except Exception as e:
         print(f"   ❌ Gagal menyimpan ke Neo4j: {e}")
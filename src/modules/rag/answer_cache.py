@@ -0,0 +1,153 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from src.core.metrics import record_cache_lookup
+from src.modules.rag.embeddings import EmbeddingService
+
+# Kunci scope: kumpulan (ayat_id, versi dokumen) hasil retrieval.
+# Kalau dokumen di-ingest ulang (di proses mana pun), versinya berubah -> kunci berubah.
+ScopeKey = FrozenSet[Tuple[str, Optional[str]]]
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def _dot(a: List[float], b: List[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+@dataclass
+class _Entry:
+    question: str
+    vector: List[float]  # sudah dinormalisasi
+    scope: ScopeKey
+    documents: FrozenSet[str]
+    answer: str
+    expires_at: float
+
+
+class AnswerCache:
+    """
+    Cache jawaban semantik di depan RAGGenerator.generate_answer.
+    Sebuah pertanyaan dianggap "sama" kalau:
+    1. Kumpulan Ayat hasil retrieval-nya identik (termasuk versi dokumennya), dan
+    2. Cosine similarity embedding pertanyaannya >= threshold.
+    Entry kadaluarsa setelah TTL, dan entry paling lama tak dipakai dibuang (LRU)
+    kalau jumlahnya melewati max_entries.
+    """
+
+    def __init__(self, embedder: EmbeddingService, threshold: float = None,
+                 ttl_seconds: float = None, max_entries: int = None):
+        self.embedder = embedder
+        self.threshold = threshold or float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+        self.max_entries = max_entries or int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._by_scope: Dict[ScopeKey, List[int]] = {}
+        self._next_id = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _scope_key(context_data: list) -> ScopeKey:
+        return frozenset((item.get("ayat_id"), item.get("doc_version")) for item in context_data)
+
+    # --- LOOKUP ---
+    def get(self, question: str, context_data: list) -> Optional[str]:
+        vector = self.embedder.get_embedding(question)
+        return self._lookup(vector, context_data)
+
+    async def aget(self, question: str, context_data: list) -> Optional[str]:
+        vector = await self.embedder.aget_embedding(question)
+        return self._lookup(vector, context_data)
+
+    def _lookup(self, vector: List[float], context_data: list) -> Optional[str]:
+        if not vector or not context_data:
+            return None
+        vector = _normalize(vector)
+        scope = self._scope_key(context_data)
+        now = time.time()
+
+        with self._lock:
+            best_id, best_score = None, self.threshold
+            for entry_id in list(self._by_scope.get(scope, [])):
+                entry = self._entries[entry_id]
+                if entry.expires_at < now:
+                    self._remove(entry_id)
+                    continue
+                score = _dot(vector, entry.vector)
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                record_cache_lookup("answer", hits=0, misses=1)
+                return None
+
+            self._entries.move_to_end(best_id)  # LRU: tandai baru dipakai
+            self.hits += 1
+            record_cache_lookup("answer", hits=1, misses=0)
+            print(f"⚡ [AnswerCache] HIT (similarity {best_score:.3f}) untuk: '{self._entries[best_id].question}'")
+            return self._entries[best_id].answer
+
+    # --- SIMPAN ---
+    def put(self, question: str, context_data: list, answer: str):
+        self._store(question, self.embedder.get_embedding(question), context_data, answer)
+
+    async def aput(self, question: str, context_data: list, answer: str):
+        self._store(question, await self.embedder.aget_embedding(question), context_data, answer)
+
+    def _store(self, question: str, vector: List[float], context_data: list, answer: str):
+        if not vector or not context_data:
+            return
+        entry = _Entry(
+            question=question,
+            vector=_normalize(vector),
+            scope=self._scope_key(context_data),
+            documents=frozenset(item.get("source_doc") for item in context_data),
+            answer=answer,
+            expires_at=time.time() + self.ttl_seconds,
+        )
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = entry
+            self._by_scope.setdefault(entry.scope, []).append(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    # --- INVALIDASI ---
+    def invalidate_document(self, filename: str):
+        """Buang semua jawaban yang bersumber dari dokumen ini (dipanggil setelah ingest)."""
+        with self._lock:
+            stale = [entry_id for entry_id, entry in self._entries.items() if filename in entry.documents]
+            for entry_id in stale:
+                self._remove(entry_id)
+        if stale:
+            print(f"🧹 [AnswerCache] {len(stale)} jawaban dibuang karena {filename} di-ingest ulang.")
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        ids = self._by_scope.get(entry.scope, [])
+        ids.remove(entry_id)
+        if not ids:
+            self._by_scope.pop(entry.scope, None)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
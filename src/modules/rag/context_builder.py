@@ -0,0 +1,104 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.modules.rag.tokenizer import count_tokens, truncate_to_tokens
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+# Ayat teratas selalu masuk walau budget kecil, minimal sebanyak ini tokennya
+MIN_FIRST_CLAUSE_TOKENS = 32
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class BuiltContext:
+    text: str
+    tokens: int
+    clauses: int          # jumlah Ayat yang masuk konteks
+    pasal: int            # jumlah blok Pasal
+    duplicates: int = 0   # Ayat dibuang karena (hampir) identik dengan Ayat lain
+    over_budget: int = 0  # Ayat dibuang karena token_budget habis
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tokens": self.tokens,
+            "clauses": self.clauses,
+            "pasal": self.pasal,
+            "duplicates": self.duplicates,
+            "over_budget": self.over_budget,
+        }
+
+
+class ContextBuilder:
+    """
+    Menyusun teks konteks untuk prompt dari hasil retrieval (urutan = ranking):
+    1. Ayat yang hampir identik (Jaccard kata >= dedup_threshold) dibuang, yang ranking-nya lebih tinggi dipertahankan.
+    2. Ayat dari Pasal (dan dokumen) yang sama digabung jadi satu blok, header Pasal cukup sekali.
+    3. Ayat diisi sesuai ranking sampai token_budget habis; Ayat teratas selalu masuk (dipotong kalau perlu).
+    Formatnya ringkas tanpa indentasi dan deterministik, jadi input yang sama selalu menghasilkan teks yang sama.
+    """
+
+    def __init__(self, token_budget: int = None, dedup_threshold: float = None):
+        self.token_budget = token_budget or int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+        self.dedup_threshold = dedup_threshold or float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.9"))
+
+    @staticmethod
+    def _header(item: dict) -> str:
+        header = f"PASAL: {item['pasal']} | JUDUL: {item['judul']}"
+        if item.get("source_doc"):
+            header += f" | DOKUMEN: {item['source_doc']}"
+        return header
+
+    def build(self, context_data: list) -> BuiltContext:
+        blocks: Dict[Tuple[Optional[str], str], List[str]] = {}  # urutan insert = urutan ranking
+        headers: Dict[Tuple[Optional[str], str], str] = {}
+        kept_words: List[Set[str]] = []
+        used_tokens = 0
+        duplicates = over_budget = clauses = 0
+
+        for item in context_data:
+            teks = " ".join((item.get("isi") or "").split())
+            if not teks:
+                continue
+
+            # 1. Near-duplicate (misal ayat yang sama di dua versi kontrak)
+            words = set(_WORD_PATTERN.findall(teks.lower()))
+            if any(_jaccard(words, other) >= self.dedup_threshold for other in kept_words):
+                duplicates += 1
+                continue
+
+            # 2. Hitung biaya token: baris ayat (+ header kalau Pasal-nya baru), +1 per pemisah baris
+            key = (item.get("source_doc"), str(item["pasal"]))
+            line = f"- {teks}"
+            line_cost = count_tokens(line) + 1
+            header_cost = 0 if key in blocks else count_tokens(self._header(item)) + 2
+            remaining = self.token_budget - used_tokens
+
+            # 3. Budget
+            if line_cost + header_cost > remaining:
+                if clauses:
+                    over_budget += 1
+                    continue
+                line = truncate_to_tokens(line, max(remaining - header_cost, MIN_FIRST_CLAUSE_TOKENS))
+                line_cost = count_tokens(line) + 1
+
+            if key not in blocks:
+                blocks[key] = []
+                headers[key] = self._header(item)
+            blocks[key].append(line)
+            kept_words.append(words)
+            used_tokens += line_cost + header_cost
+            clauses += 1
+
+        text = "\n\n".join(headers[key] + "\n" + "\n".join(lines) for key, lines in blocks.items())
+        return BuiltContext(
+            text=text, tokens=count_tokens(text), clauses=clauses, pasal=len(blocks),
+            duplicates=duplicates, over_budget=over_budget,
+        )
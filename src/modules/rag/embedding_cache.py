@@ -0,0 +1,131 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+
+
+def normalize_text(text: str) -> str:
+    """Normalisasi sebelum hashing: rapikan semua whitespace (spasi ganda, tab, newline)."""
+    return " ".join(text.split())
+
+
+def make_key(model: str, text: str) -> str:
+    """Kunci cache = hash(model + teks ternormalisasi). Ganti model = cache otomatis beda."""
+    payload = f"{model}\x00{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Cache embedding persisten di disk (SQLite), content-addressed.
+    Vektor disimpan sebagai blob float32 (1536 dim = 6 KB per item).
+    Eviction LRU: kalau jumlah item melewati `max_entries`, item yang paling
+    lama tidak diakses dibuang.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        # Satu koneksi dipakai bersama antar thread, dijaga dengan lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings(last_access)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model: str, texts: List[str]) -> Dict[str, List[float]]:
+        """Mengembalikan {teks: vektor} untuk teks yang sudah ada di cache."""
+        keys = {make_key(model, text): text for text in texts}
+        found: Dict[str, List[float]] = {}
+        now = time.time()
+
+        with self._lock:
+            key_list = list(keys)
+            # SQLite membatasi jumlah parameter per query, jadi dipecah
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[keys[key]] = vector.tolist()
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                        [(now, key) for key, _ in rows]
+                    )
+            self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        return self.get_many(model, [text]).get(text)
+
+    def put_many(self, model: str, items: Dict[str, List[float]]):
+        """Menyimpan {teks: vektor} ke cache, lalu evict kalau kepenuhan."""
+        if not items:
+            return
+        now = time.time()
+        rows = [
+            (make_key(model, text), model, array("f", vector).tobytes(), now)
+            for text, vector in items.items()
+        ]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, model, vector, last_access) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._size += self._conn.total_changes - before
+            if self._size > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Buang sedikit lebih banyak dari kelebihannya (90% kapasitas),
+        # supaya tidak evict di setiap put berikutnya
+        target = int(self.max_entries * 0.9)
+        excess = self._size - target
+        self._conn.execute("""
+            DELETE FROM embeddings WHERE key IN (
+                SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?
+            )
+        """, (excess,))
+        self._size = target
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "entries": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
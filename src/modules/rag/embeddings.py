@@ -1,40 +1,251 @@
+import asyncio
 import os
-from typing import List
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
 from dotenv import load_dotenv
+from src.core.metrics import record_cache_lookup, record_llm_usage, span
+from src.core.openai_client import is_transient, shared_clients
+from src.modules.rag.embedding_cache import EmbeddingCache, normalize_text
+from src.modules.rag.tokenizer import count_tokens
 
 load_dotenv()
 
+# Root project (embeddings -> rag -> modules -> src -> ROOT)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../.."))
+DEFAULT_CACHE_PATH = os.path.join(PROJECT_ROOT, "data", "cache", "embeddings.sqlite3")
+
+# Batas dari OpenAI untuk model text-embedding-3-*
+MAX_TOKENS_PER_INPUT = 8191
+MAX_INPUTS_PER_REQUEST = 2048
+
+
+@dataclass
+class EmbeddingBatchResult:
+    """
+    Hasil get_embeddings(). Urutan `vectors` sama dengan urutan input.
+    Item yang gagal bernilai None dan alasannya ada di `errors[index]`.
+    """
+    vectors: List[Optional[List[float]]]
+    errors: Dict[int, str] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
 class EmbeddingService:
-    def __init__(self):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY tidak ditemukan di .env")
-        
-        self.client = OpenAI(api_key=api_key)
+    def __init__(self, max_batch_tokens: int = None, max_concurrency: int = None,
+                 cache: Optional[EmbeddingCache] = None, client=None, async_client=None):
+        # client/async_client bisa diganti (misal OpenAI palsu untuk benchmark offline).
+        # Default: client bersama (retry + rate limit adaptif, lihat src/core/openai_client.py)
+        if client is None or async_client is None:
+            shared_client, shared_async_client = shared_clients()
+            client = client or shared_client
+            async_client = async_client or shared_async_client
+
+        self.client = client
+        # Client async untuk jalur serving asyncio (src/api/main.py)
+        self.async_client = async_client
         # Model 'small' sudah sangat bagus dan murah untuk hukum
-        self.model = "text-embedding-3-small" 
+        self.model = "text-embedding-3-small"
+
+        # Ukuran 1 request (dalam token) & jumlah request yang jalan bersamaan
+        # (batas atas; yang benar-benar jalan diatur limiter adaptif di client bersama)
+        self.max_batch_tokens = max_batch_tokens or int(os.getenv("EMBEDDING_BATCH_TOKENS", "50000"))
+        self.max_concurrency = max_concurrency or int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+
+        # Cache di disk. Set EMBEDDING_CACHE_PATH="" untuk mematikan.
+        if cache is None:
+            cache_path = os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH)
+            if cache_path:
+                max_entries = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+                cache = EmbeddingCache(cache_path, max_entries=max_entries)
+        self.cache = cache
+
+    @staticmethod
+    def _clean(text: str) -> str:
+        # Bersihkan newline & spasi berlebih agar akurasi vektor lebih bagus
+        # (sekaligus jadi bentuk normal untuk kunci cache)
+        return normalize_text(text)
 
     def get_embedding(self, text: str) -> List[float]:
         """
         Mengubah teks tunggal menjadi vektor list float.
         """
-        # Bersihkan newline berlebih agar akurasi vektor lebih bagus
-        text = text.replace("\n", " ")
-        
+        result = self.get_embeddings([text])
+        if not result.ok:
+            print(f"[Embedding Error] Gagal memproses teks: {result.errors[0]}")
+            return []
+        return result.vectors[0]
+
+    def get_embeddings(self, texts: List[str], max_concurrency: int = None) -> EmbeddingBatchResult:
+        """
+        Versi batch: memecah input menjadi beberapa request berdasarkan jumlah token,
+        menjalankan request-request itu secara paralel, lalu mengembalikan vektor
+        sesuai urutan input. Satu item yang gagal tidak menggagalkan item lain.
+        Teks yang sudah ada di cache (atau duplikat di input yang sama) tidak dikirim ulang.
+        """
+        result, pending, batches = self._plan_batches(texts)
+        if not batches:
+            return result
+
+        # Kirim batch secara paralel (dibatasi max_concurrency)
+        workers = min(max_concurrency or self.max_concurrency, len(batches))
+        with span("embedding"):
+            if workers <= 1:
+                outcomes = [self._embed_batch(batch) for batch in batches]
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    outcomes = list(pool.map(self._embed_batch, batches))
+
+        return self._collect_outcomes(result, pending, outcomes)
+
+    async def aget_embedding(self, text: str) -> List[float]:
+        """Versi async dari get_embedding (pakai AsyncOpenAI)."""
+        result = await self.aget_embeddings([text])
+        if not result.ok:
+            print(f"[Embedding Error] Gagal memproses teks: {result.errors[0]}")
+            return []
+        return result.vectors[0]
+
+    async def aget_embeddings(self, texts: List[str], max_concurrency: int = None) -> EmbeddingBatchResult:
+        """
+        Versi async dari get_embeddings: batch dikirim bersamaan dengan asyncio.
+        Baca/tulis cache SQLite dijalankan di thread: file cache dipakai bersama proses
+        ingest, dan menunggu write lock-nya (busy timeout 5 detik) di event loop akan
+        membekukan semua request yang sedang jalan.
+        """
+        result, pending, batches = await asyncio.to_thread(self._plan_batches, texts)
+        if not batches:
+            return result
+
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+
+        async def run(batch):
+            async with semaphore:
+                return await self._aembed_batch(batch)
+
+        with span("embedding"):
+            outcomes = await asyncio.gather(*(run(batch) for batch in batches))
+        return await asyncio.to_thread(self._collect_outcomes, result, pending, outcomes)
+
+    def _plan_batches(self, texts: List[str]):
+        """Validasi input, cek cache, lalu susun batch request berdasarkan token."""
+        result = EmbeddingBatchResult(vectors=[None] * len(texts))
+
+        # 1. Validasi per item & kelompokkan teks yang identik
+        pending: Dict[str, List[int]] = {}  # teks unik -> daftar index input
+        for i, text in enumerate(texts):
+            text = self._clean(text or "")
+            if not text:
+                result.errors[i] = "Teks kosong"
+                continue
+            pending.setdefault(text, []).append(i)
+
+        # 2. Ambil yang sudah pernah di-embed dari cache
+        if self.cache and pending:
+            cached = self.cache.get_many(self.model, list(pending))
+            record_cache_lookup("embedding", hits=len(cached), misses=len(pending) - len(cached))
+            for text, vector in cached.items():
+                for i in pending.pop(text):
+                    result.vectors[i] = vector
+
+        # 3. Susun batch berdasarkan token
+        batches: List[List[str]] = []
+        current: List[str] = []
+        current_tokens = 0
+        for text in list(pending):
+            n_tokens = count_tokens(text)
+            if n_tokens > MAX_TOKENS_PER_INPUT:
+                for i in pending.pop(text):
+                    result.errors[i] = f"Teks terlalu panjang ({n_tokens} token, maks {MAX_TOKENS_PER_INPUT})"
+                continue
+
+            if current and (current_tokens + n_tokens > self.max_batch_tokens
+                            or len(current) >= MAX_INPUTS_PER_REQUEST):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(text)
+            current_tokens += n_tokens
+        if current:
+            batches.append(current)
+
+        return result, pending, batches
+
+    def _collect_outcomes(self, result: EmbeddingBatchResult, pending: Dict[str, List[int]], outcomes) -> EmbeddingBatchResult:
+        """Sebar hasil tiap batch ke index input & simpan yang baru ke cache."""
+        embedded: Dict[str, List[float]] = {}
+        for vectors, errors in outcomes:
+            embedded.update(vectors)
+            for text, reason in errors.items():
+                for i in pending[text]:
+                    result.errors[i] = reason
+        for text, vector in embedded.items():
+            for i in pending[text]:
+                result.vectors[i] = vector
+        if self.cache:
+            self.cache.put_many(self.model, embedded)
+
+        return result
+
+    def _embed_batch(self, texts: List[str]) -> Tuple[Dict[str, List[float]], Dict[str, str]]:
+        """Embed satu batch. Mengembalikan ({teks: vektor}, {teks: alasan gagal})."""
         try:
-            response = self.client.embeddings.create(
-                input=[text],
-                model=self.model
-            )
-            return response.data[0].embedding
+            return dict(zip(texts, self._request(texts))), {}
         except Exception as e:
-            print(f"[Embedding Error] Gagal memproses teks: {e}")
-            return []
+            if len(texts) == 1 or is_transient(e):
+                # Rate limit/timeout yang retry-nya sudah habis: dipecah per item malah menambah beban
+                return {}, {text: str(e) for text in texts}
+
+        # Batch gagal: ulangi satu per satu supaya ketahuan item mana yang bermasalah
+        print(f"[Embedding Warning] Batch {len(texts)} teks gagal, mencoba per item...")
+        vectors, errors = {}, {}
+        for text in texts:
+            ok, failed = self._embed_batch([text])
+            vectors.update(ok)
+            errors.update(failed)
+        return vectors, errors
+
+    async def _aembed_batch(self, texts: List[str]) -> Tuple[Dict[str, List[float]], Dict[str, str]]:
+        """Versi async dari _embed_batch."""
+        try:
+            return dict(zip(texts, await self._arequest(texts))), {}
+        except Exception as e:
+            if len(texts) == 1 or is_transient(e):
+                return {}, {text: str(e) for text in texts}
+
+        print(f"[Embedding Warning] Batch {len(texts)} teks gagal, mencoba per item...")
+        vectors, errors = {}, {}
+        for ok, failed in await asyncio.gather(*(self._aembed_batch([text]) for text in texts)):
+            vectors.update(ok)
+            errors.update(failed)
+        return vectors, errors
+
+    def _request(self, inputs: List[str]) -> List[List[float]]:
+        response = self.client.embeddings.create(
+            input=inputs,
+            model=self.model
+        )
+        record_llm_usage(self.model, response.usage)
+        # Urutkan berdasarkan index dari API, jangan percaya urutan list begitu saja
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+    async def _arequest(self, inputs: List[str]) -> List[List[float]]:
+        response = await self.async_client.embeddings.create(
+            input=inputs,
+            model=self.model
+        )
+        record_llm_usage(self.model, response.usage)
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
 
 # --- TEST CODE ---
 if __name__ == "__main__":
     embedder = EmbeddingService()
     vector = embedder.get_embedding("Pasal 1: Pihak Pertama wajib membayar lunas.")
     print(f"Dimensi Vektor: {len(vector)}") # Harusnya 1536 dimensi
-    print(f"Contoh data: {vector[:5]}...")
\ No newline at end of file
+    print(f"Contoh data: {vector[:5]}...")
+    batch = embedder.get_embeddings(["Pasal 2: Harga Rp 500jt.", "", "Pasal 3: Serah terima."])
+    print(f"Batch OK: {batch.ok}, Error: {batch.errors}")
+    if embedder.cache:
+        print(f"Cache: {embedder.cache.stats()}")
@@ -1,35 +1,168 @@
+import asyncio
+import contextvars
 import os
 import json
-from openai import OpenAI
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
+from src.core.metrics import CRITIC_RETRIES, record_llm_usage, record_stage, span
+from src.core.openai_client import shared_clients
+from src.modules.auditor.verifier import INCONCLUSIVE, LocalVerifier
+from src.modules.rag.answer_cache import AnswerCache
+from src.modules.rag.context_builder import BuiltContext, ContextBuilder
 
 load_dotenv()
 
+# Mode generate jawaban:
+# - "sequential": Tulis -> Kritik -> Revisi (maks 3x), hemat token
+# - "parallel"  : Best-of-N, N draft ditulis & dikritik bersamaan, ambil yang pertama lolos
+MODE_SEQUENTIAL = "sequential"
+MODE_PARALLEL = "parallel"
+GENERATION_MODES = (MODE_SEQUENTIAL, MODE_PARALLEL)
+# Batas atas N draft per request (tiap draft = 1 thread + 2 panggilan LLM)
+BEST_OF_N_MAX = int(os.getenv("BEST_OF_N_MAX", "8"))
+
+
+def valid_n_drafts(n_drafts) -> bool:
+    """n_drafts dari body request: None (pakai default) atau int 1..BEST_OF_N_MAX."""
+    if n_drafts is None:
+        return True
+    return isinstance(n_drafts, int) and not isinstance(n_drafts, bool) and 1 <= n_drafts <= BEST_OF_N_MAX
+
+DISCLAIMER = "\n\n(Catatan Sistem: Jawaban ini mungkin belum sempurna setelah beberapa kali revisi)."
+UNVERIFIED_DISCLAIMER = "\n\n(Catatan Sistem: Jawaban ini belum diverifikasi karena Critic sedang tidak bisa dihubungi)."
+# Status review kalau Critic LLM gagal dipanggil (bukan PASS, bukan FAIL)
+CRITIC_ERROR = "ERROR"
+
+# Layout prompt: [SHARED_SYSTEM_PROMPT, konteks + pertanyaan] selalu jadi awalan yang identik
+# untuk semua panggilan Writer & Critic (termasuk revisi). Bagian yang berubah (instruksi peran,
+# draft, kritik) ditaruh sesudahnya, supaya prompt caching OpenAI (awalan >= 1024 token) kepakai.
+SHARED_SYSTEM_PROMPT = """Anda adalah bagian dari tim audit hukum yang bekerja HANYA berdasarkan KONTEKS PASAL yang diberikan.
+Setiap bagian konteks diawali "PASAL: <nomor> | JUDUL: <judul> | DOKUMEN: <nama file>", diikuti isi ayat-ayatnya."""
+
+WRITER_PROMPT = """Peran Anda: Asisten Hukum (Legal Drafter).
+Tugas: Jawab pertanyaan user berdasarkan KONTEKS PASAL di atas.
+
+Aturan:
+1. Jawaban harus tegas, formal, dan mudah dimengerti.
+2. WAJIB mengutip Nomor Pasal dan Judulnya sebagai dasar hukum.
+3. Jangan berasumsi di luar data."""
+
+CRITIC_PROMPT = """Peran Anda: Senior Legal Auditor (Supervisor).
+Tugas: Memeriksa akurasi jawaban junior Anda.
+
+Kriteria Kelulusan (PASS):
+1. Jawaban menyebutkan Nomor Pasal yang BENAR sesuai Konteks.
+2. Jawaban TIDAK berhalusinasi (menyebut fakta yang tidak ada di konteks).
+3. Jawaban menjawab inti pertanyaan user.
+
+OUTPUT HARUS DALAM FORMAT JSON:
+{
+    "status": "PASS" atau "FAIL",
+    "feedback": "Penjelasan singkat jika FAIL, atau 'Oke' jika PASS"
+}"""
+
+
 class RAGGenerator:
-    def __init__(self):
-        api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=api_key)
-
-    def _format_context(self, context_data):
-        """Helper untuk merapikan data konteks jadi string."""
-        context_text = ""
-        for item in context_data:
-            context_text += f"""
-            ---
-            PASAL: {item['pasal']}
-            JUDUL: {item['judul']}
-            ISI: {item['isi']}
-            ---
-            """
-        return context_text
-
-    def generate_answer(self, user_question: str, context_data: list):
+    def __init__(self, answer_cache: AnswerCache = None, client=None, async_client=None,
+                 context_builder: ContextBuilder = None, verifier: LocalVerifier = None):
+        # Cache jawaban semantik (opsional), dicek sebelum Loop Agentic jalan
+        self.answer_cache = answer_cache
+        # Penyusun konteks: dedup, gabung ayat se-Pasal, batasi token (CONTEXT_TOKEN_BUDGET)
+        self.context_builder = context_builder or ContextBuilder()
+        # Verifier lokal (cek pasal & angka) sebelum Critic LLM. LOCAL_VERIFIER=0 untuk mematikan.
+        if verifier is None and os.getenv("LOCAL_VERIFIER", "1") == "1":
+            verifier = LocalVerifier()
+        self.verifier = verifier
+        # client/async_client bisa diganti (misal OpenAI palsu untuk benchmark offline).
+        # Default: client bersama (retry + rate limit adaptif, lihat src/core/openai_client.py)
+        if client is None or async_client is None:
+            shared_client, shared_async_client = shared_clients()
+            client = client or shared_client
+            async_client = async_client or shared_async_client
+        self.client = client
+        self.async_client = async_client
+
+        self.default_mode = os.getenv("GENERATION_MODE", MODE_SEQUENTIAL)
+        self.n_drafts = int(os.getenv("BEST_OF_N", "3"))
+
+    def _build_context(self, context_data) -> BuiltContext:
+        """Susun konteks sekali per pertanyaan; teks yang sama dipakai di semua panggilan Writer & Critic."""
+        context = self.context_builder.build(context_data)
+        print(f"   📦 [Context] {context.clauses} ayat / {context.pasal} pasal, {context.tokens} token "
+              f"({context.duplicates} duplikat, {context.over_budget} lewat budget dibuang)")
+        return context
+
+    def generate_answer(self, user_question: str, context_data: list, mode: str = None, n_drafts: int = None):
         """
         Fungsi Utama: Menjalankan Loop Tulis-Kritik-Revisi.
         """
-        context_text = self._format_context(context_data)
+        return self.generate_answer_detailed(user_question, context_data, mode, n_drafts)["answer"]
+
+    def generate_answer_detailed(self, user_question: str, context_data: list, mode: str = None, n_drafts: int = None):
+        """
+        Sama seperti generate_answer, tapi mengembalikan dict lengkap:
+        answer, status, mode, attempts, critiques (hasil review tiap draft), llm_calls, cached.
+        """
+        for event in self._answer_events(user_question, context_data, mode=mode, n_drafts=n_drafts):
+            if event["event"] == "final":
+                return event["data"]
+
+    def stream_answer(self, user_question: str, context_data: list, mode: str = None, n_drafts: int = None):
+        """
+        Versi streaming dari generate_answer (generator of events):
+        - {"event": "token", "data": "..."}     -> potongan token draft pertama dari Writer (mode sequential)
+        - {"event": "critique", "data": {...}}   -> hasil review Critic tiap percobaan / draft
+        - {"event": "final", "data": {...}}      -> jawaban akhir (draft yang lolos / hasil revisi)
+        """
+        yield from self._answer_events(user_question, context_data, stream=True, mode=mode, n_drafts=n_drafts)
+
+    def _answer_events(self, user_question: str, context_data: list, stream: bool = False,
+                       mode: str = None, n_drafts: int = None):
+        """Cek cache jawaban dulu; kalau miss, jalankan Loop Agentic lalu simpan jawaban yang lolos."""
+        mode = mode or self.default_mode
+        if mode not in GENERATION_MODES:
+            raise ValueError(f"Mode tidak dikenal: {mode}. Pilihan: {', '.join(GENERATION_MODES)}")
+        if not valid_n_drafts(n_drafts):
+            raise ValueError(f"n_drafts harus bilangan bulat 1-{BEST_OF_N_MAX}")
+
+        if self.answer_cache:
+            with span("generation.cache_lookup"):
+                cached = self.answer_cache.get(user_question, context_data)
+            if cached is not None:
+                yield self._cached_final_event(cached, mode)
+                return
+
+        context = self._build_context(context_data)
+        if mode == MODE_PARALLEL:
+            events = self._best_of_n_events(user_question, context.text,
+                                            self.n_drafts if n_drafts is None else n_drafts)
+        else:
+            events = self._agent_events(user_question, context.text, stream=stream)
+
+        for event in events:
+            if event["event"] == "final":
+                event["data"]["mode"] = mode
+                event["data"]["context"] = context.stats()
+                if event["data"]["status"] == "PASS" and self.answer_cache:
+                    self.answer_cache.put(user_question, context_data, event["data"]["answer"])
+            yield event
+
+    @staticmethod
+    def _cached_final_event(answer: str, mode: str):
+        return {"event": "final", "data": {
+            "answer": answer, "status": "PASS", "revised": False, "attempts": 0,
+            "critiques": [], "llm_calls": 0, "mode": mode, "cached": True
+        }}
+
+    def _agent_events(self, user_question: str, context_text: str, stream: bool = False):
+        """Inti Loop Agentic. Kalau stream=True, token draft pertama ikut di-yield."""
         max_retries = 3  # Maksimal 3x revisi biar gak infinite loop
         current_draft = ""
+        critique_feedback = ""
+        critiques = []
+        llm_calls = 0
         
         print(f"\n🚀 [Agent] Memulai proses berpikir untuk pertanyaan: '{user_question}'")
 
@@ -38,111 +171,411 @@ class RAGGenerator:
             print(f"\n🔄 --- Percobaan ke-{attempt + 1} ---")
 
             # LANGKAH 1: WRITER (Penulis)
-            if attempt == 0:
+            if attempt == 0 and stream:
+                # Percobaan pertama (streaming): kirim token ke user selagi ditulis
+                parts = []
+                for token in self._writer_agent_stream(user_question, context_text):
+                    parts.append(token)
+                    yield {"event": "token", "data": token}
+                current_draft = "".join(parts)
+            elif attempt == 0:
                 # Percobaan pertama: Tulis dari nol
                 current_draft = self._writer_agent(user_question, context_text)
             else:
                 # Percobaan kedua dst: Tulis ulang berdasarkan kritik
                 print("   ✍️ [Writer] Sedang merevisi jawaban...")
                 current_draft = self._writer_agent(user_question, context_text, prev_draft=current_draft, feedback=critique_feedback)
+            llm_calls += 1
 
             # LANGKAH 2: CRITIC (Pengkritik)
             print("   🧐 [Critic] Sedang memeriksa draft...")
-            critique_result = self._critic_agent(user_question, context_text, current_draft)
+            critique_result = self._review(user_question, context_text, current_draft)
+            if critique_result["reviewer"] == "llm":
+                llm_calls += 1
             
             status = critique_result.get("status", "FAIL")
             critique_feedback = critique_result.get("feedback", "Tidak ada feedback.")
 
-            print(f"   📊 Status Review: {status}")
+            print(f"   📊 Status Review ({critique_result['reviewer']}): {status}")
+            critique = {"attempt": attempt + 1, "status": status, "feedback": critique_feedback,
+                        "reviewer": critique_result["reviewer"]}
+            critiques.append(critique)
+            yield {"event": "critique", "data": critique}
             
             # LANGKAH 3: DECISION (Keputusan)
             if status == "PASS":
                 print("   ✅ [Manager] Kualitas bagus. Kirim ke user.")
-                return current_draft
+                yield {"event": "final", "data": {
+                    "answer": current_draft, "status": "PASS",
+                    "revised": attempt > 0, "attempts": attempt + 1,
+                    "critiques": critiques, "llm_calls": llm_calls
+                }}
+                return
+            if status == CRITIC_ERROR:
+                # Revisi tanpa kritik yang valid tidak ada gunanya, kirim draft apa adanya (tidak di-cache)
+                print("   ⚠️ [Manager] Critic tidak bisa dihubungi. Kirim draft tanpa verifikasi.")
+                yield {"event": "final", "data": self._unverified(current_draft, attempt, critiques, llm_calls)}
+                return
             else:
                 print(f"   ⚠️ [Manager] Ditolak! Kritik: {critique_feedback}")
                 # Loop akan berlanjut ke attempt berikutnya untuk revisi
+                if attempt < max_retries - 1:
+                    CRITIC_RETRIES.inc(mode=MODE_SEQUENTIAL)
 
         # Jika sudah max_retries masih gagal, kirim draft terakhir dengan disclaimer
-        return current_draft + "\n\n(Catatan Sistem: Jawaban ini mungkin belum sempurna setelah beberapa kali revisi)."
+        yield {"event": "final", "data": {
+            "answer": current_draft + DISCLAIMER,
+            "status": "FAIL", "revised": max_retries > 1, "attempts": max_retries,
+            "critiques": critiques, "llm_calls": llm_calls
+        }}
 
-    # --- AGENT 1: SI PENULIS ---
-    def _writer_agent(self, question, context, prev_draft=None, feedback=None):
-        system_prompt = """
-        Anda adalah Asisten Hukum (Legal Drafter). 
-        Tugas: Jawab pertanyaan user berdasarkan KONTEKS PASAL yang diberikan.
-        
-        Aturan:
-        1. Jawaban harus tegas, formal, dan mudah dimengerti.
-        2. WAJIB mengutip Nomor Pasal dan Judulnya sebagai dasar hukum.
-        3. Jangan berasumsi di luar data.
+    @staticmethod
+    def _draft_temperatures(n: int):
+        """Sebar temperature draft dari konservatif (0.2) sampai kreatif (1.0)."""
+        if n <= 1:
+            return [0.7]
+        return [round(0.2 + 0.8 * i / (n - 1), 2) for i in range(n)]
+
+    def _best_of_n_events(self, user_question: str, context_text: str, n: int):
+        """
+        Mode paralel (Best-of-N): N draft ditulis bersamaan dengan temperature berbeda,
+        tiap draft langsung dikritik begitu selesai. Draft pertama yang PASS dipakai,
+        sisanya dibatalkan (yang belum mulai tidak jalan, yang sudah jalan tidak dilanjut ke Critic).
         """
+        temperatures = self._draft_temperatures(n)
+        cancelled = threading.Event()
+        counter_lock = threading.Lock()
+        llm_calls = [0]
+
+        def count_call():
+            with counter_lock:
+                llm_calls[0] += 1
+
+        def write_and_critique(draft_no, temperature):
+            if cancelled.is_set():
+                return None
+            draft = self._writer_agent(user_question, context_text, temperature=temperature)
+            count_call()
+            if cancelled.is_set():
+                return None
+            critique = self._review(user_question, context_text, draft)
+            if critique["reviewer"] == "llm":
+                count_call()
+            return draft_no, temperature, draft, critique
+
+        print(f"\n🚀 [Agent] Best-of-{n} paralel untuk pertanyaan: '{user_question}'")
 
-        user_prompt = f"Konteks:\n{context}\n\nPertanyaan: {question}"
+        critiques = []
+        first_draft = None
+        winner = None
+        pool = ThreadPoolExecutor(max_workers=n)
+        # Salin context tiap draft supaya span di thread ikut breakdown timing request ini
+        futures = [pool.submit(contextvars.copy_context().run, write_and_critique, i + 1, t)
+                   for i, t in enumerate(temperatures)]
+        try:
+            for future in as_completed(futures):
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    print(f"   ❌ [Writer] Draft gagal dibuat: {e}")
+                    continue
+                if outcome is None:
+                    continue
+
+                draft_no, temperature, draft, critique_result = outcome
+                status = critique_result.get("status", "FAIL")
+                critique = {
+                    "attempt": draft_no, "temperature": temperature, "status": status,
+                    "feedback": critique_result.get("feedback", "Tidak ada feedback."),
+                    "reviewer": critique_result["reviewer"]
+                }
+                critiques.append(critique)
+                print(f"   📊 Draft #{draft_no} (temp {temperature}): {status}")
+                yield {"event": "critique", "data": critique}
+
+                first_draft = first_draft or draft
+                if status == "PASS":
+                    winner = draft
+                    break
+                if status != CRITIC_ERROR:
+                    CRITIC_RETRIES.inc(mode=MODE_PARALLEL)
+        finally:
+            # Batalkan draft yang masih antri / belum sampai ke Critic
+            cancelled.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        if winner is not None:
+            print("   ✅ [Manager] Ada draft yang lolos. Kirim ke user.")
+            yield {"event": "final", "data": {
+                "answer": winner, "status": "PASS", "revised": False, "attempts": len(critiques),
+                "critiques": critiques, "llm_calls": llm_calls[0]
+            }}
+            return
+
+        if self._all_errors(critiques):
+            yield {"event": "final", "data": self._unverified(first_draft, 0, critiques, llm_calls[0])}
+            return
+        yield {"event": "final", "data": {
+            "answer": (first_draft or "Maaf, jawaban gagal dibuat.") + DISCLAIMER,
+            "status": "FAIL", "revised": False, "attempts": len(critiques),
+            "critiques": critiques, "llm_calls": llm_calls[0]
+        }}
+
+    # --- PREFIX BERSAMA ---
+    @staticmethod
+    def _prefix_messages(question, context):
+        """Awalan identik untuk semua panggilan LLM satu pertanyaan (lihat SHARED_SYSTEM_PROMPT)."""
+        return [
+            {"role": "system", "content": SHARED_SYSTEM_PROMPT},
+            {"role": "user", "content": f"KONTEKS PASAL:\n{context}\n\nPERTANYAAN USER:\n{question}"}
+        ]
 
-        # Jika ini adalah revisi, tambahkan instruksi khusus
+    # --- AGENT 1: SI PENULIS ---
+    def _writer_messages(self, question, context, prev_draft=None, feedback=None):
+        messages = self._prefix_messages(question, context) + [
+            {"role": "system", "content": WRITER_PROMPT},
+            {"role": "user", "content": "Tulis jawaban untuk pertanyaan di atas."}
+        ]
+
+        # Jika ini adalah revisi, draft sebelumnya & kritik ditambahkan di belakang (awalan tetap sama)
         if prev_draft and feedback:
-            user_prompt += f"""
-            \n\n--- INSTRUKSI REVISI ---
-            Draft sebelumnya: "{prev_draft}"
-            Kritik dari Supervisor: "{feedback}"
-            
-            TOLONG TULIS ULANG jawaban yang memperbaiki kesalahan di atas.
-            """
-
-        response = self.client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7 # Sedikit kreatif untuk menulis
-        )
+            messages += [
+                {"role": "assistant", "content": prev_draft},
+                {"role": "user", "content": (
+                    "--- INSTRUKSI REVISI ---\n"
+                    f"Kritik dari Supervisor: \"{feedback}\"\n\n"
+                    "TOLONG TULIS ULANG jawaban yang memperbaiki kesalahan di atas."
+                )}
+            ]
+        return messages
+
+    def _writer_agent(self, question, context, prev_draft=None, feedback=None, temperature=0.7):
+        with span("generation.writer"):
+            response = self.client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=self._writer_messages(question, context, prev_draft, feedback),
+                temperature=temperature # Default sedikit kreatif untuk menulis
+            )
+        record_llm_usage(response.model, response.usage)
         return response.choices[0].message.content
 
+    def _writer_agent_stream(self, question, context):
+        """Sama seperti _writer_agent, tapi yield potongan token begitu datang dari API."""
+        # Bukan span(): waktu consumer SSE di antara token (saat generator berhenti di yield)
+        # tidak dihitung, supaya latency writer streaming & non-streaming bisa dibandingkan.
+        started = time.perf_counter()
+        waiting = 0.0
+        try:
+            stream = self.client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=self._writer_messages(question, context),
+                temperature=0.7,
+                stream=True,
+                stream_options={"include_usage": True}  # chunk terakhir berisi jumlah token
+            )
+            for chunk in stream:
+                if chunk.usage:
+                    record_llm_usage(chunk.model, chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    paused = time.perf_counter()
+                    try:
+                        yield chunk.choices[0].delta.content
+                    finally:
+                        waiting += time.perf_counter() - paused
+        finally:
+            record_stage("generation.writer", time.perf_counter() - started - waiting)
+
     # --- AGENT 2: SI PENGKRITIK ---
+    def _critic_messages(self, question, context, draft):
+        return self._prefix_messages(question, context) + [
+            {"role": "system", "content": CRITIC_PROMPT},
+            {"role": "user", "content": f"JAWABAN JUNIOR:\n{draft}\n\nBerikan penilaian Anda dalam JSON."}
+        ]
+
+    def _local_review(self, question, context, draft):
+        """Verifier lokal. Mengembalikan hasil review kalau jelas PASS/FAIL, None kalau perlu Critic LLM."""
+        if self.verifier is None:
+            return None
+        with span("generation.verify"):
+            verdict = self.verifier.verify(question, context, draft)
+        if verdict.status == INCONCLUSIVE:
+            return None
+        return {**verdict.as_critique(), "reviewer": "local"}
+
+    def _review(self, question, context, draft):
+        """Verifier lokal dulu; Critic LLM hanya dipanggil kalau hasilnya INCONCLUSIVE."""
+        result = self._local_review(question, context, draft)
+        if result is None:
+            result = {**self._critic_agent(question, context, draft), "reviewer": "llm"}
+        return result
+
+    async def _areview(self, question, context, draft):
+        result = self._local_review(question, context, draft)
+        if result is None:
+            result = {**await self._acritic_agent(question, context, draft), "reviewer": "llm"}
+        return result
+
     def _critic_agent(self, question, context, draft):
-        system_prompt = """
-        Anda adalah Senior Legal Auditor (Supervisor).
-        Tugas: Memeriksa akurasi jawaban junior Anda.
-        
-        Kriteria Kelulusan (PASS):
-        1. Jawaban menyebutkan Nomor Pasal yang BENAR sesuai Konteks.
-        2. Jawaban TIDAK berhalusinasi (menyebut fakta yang tidak ada di konteks).
-        3. Jawaban menjawab inti pertanyaan user.
-        
-        OUTPUT HARUS DALAM FORMAT JSON:
-        {
-            "status": "PASS" atau "FAIL",
-            "feedback": "Penjelasan singkat jika FAIL, atau 'Oke' jika PASS"
-        }
-        """
+        try:
+            with span("generation.critic"):
+                response = self.client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=self._critic_messages(question, context, draft),
+                    temperature=0, # Harus ketat & konsisten
+                    response_format={"type": "json_object"} # Memaksa output JSON valid
+                )
+            record_llm_usage(response.model, response.usage)
+            return json.loads(response.choices[0].message.content)
+        except Exception as e:
+            # Jangan anggap lolos: draft yang tidak sempat dicek ditandai ERROR
+            print(f"❌ Error Critic: {e}")
+            return {"status": CRITIC_ERROR, "feedback": f"Critic gagal dipanggil: {e}"}
 
-        user_prompt = f"""
-        KONTEKS ASLI:
-        {context}
+    @staticmethod
+    def _all_errors(critiques):
+        """Best-of-N: tidak ada draft yang sempat dinilai Critic (semua ERROR)."""
+        return bool(critiques) and all(c["status"] == CRITIC_ERROR for c in critiques)
 
-        PERTANYAAN USER:
-        {question}
+    @staticmethod
+    def _unverified(draft, attempt, critiques, llm_calls):
+        """Hasil akhir kalau Critic gagal dipanggil: draft dikirim dengan catatan, status UNVERIFIED."""
+        return {"answer": draft + UNVERIFIED_DISCLAIMER, "status": "UNVERIFIED", "revised": attempt > 0,
+                "attempts": max(attempt + 1, len(critiques)), "critiques": critiques, "llm_calls": llm_calls}
 
-        JAWABAN JUNIOR:
-        {draft}
-        
-        Berikan penilaian Anda dalam JSON.
+    # --- VERSI ASYNC (untuk jalur serving asyncio di src/api/main.py) ---
+    async def agenerate_answer(self, user_question: str, context_data: list, mode: str = None, n_drafts: int = None):
+        """
+        Versi async dari generate_answer: Loop Tulis-Kritik-Revisi yang sama,
+        tapi tiap panggilan LLM di-await sehingga event loop bisa melayani
+        pertanyaan lain selama menunggu OpenAI.
         """
+        return (await self.agenerate_answer_detailed(user_question, context_data, mode, n_drafts))["answer"]
+
+    async def agenerate_answer_detailed(self, user_question: str, context_data: list, mode: str = None, n_drafts: int = None):
+        mode = mode or self.default_mode
+        if mode not in GENERATION_MODES:
+            raise ValueError(f"Mode tidak dikenal: {mode}. Pilihan: {', '.join(GENERATION_MODES)}")
+        if not valid_n_drafts(n_drafts):
+            raise ValueError(f"n_drafts harus bilangan bulat 1-{BEST_OF_N_MAX}")
+
+        if self.answer_cache:
+            with span("generation.cache_lookup"):
+                cached = await self.answer_cache.aget(user_question, context_data)
+            if cached is not None:
+                return self._cached_final_event(cached, mode)["data"]
+
+        context = self._build_context(context_data)
+        if mode == MODE_PARALLEL:
+            result = await self._abest_of_n(user_question, context.text,
+                                            self.n_drafts if n_drafts is None else n_drafts)
+        else:
+            result = await self._aagent_loop(user_question, context.text)
+        result["mode"] = mode
+        result["context"] = context.stats()
 
+        if result["status"] == "PASS" and self.answer_cache:
+            await self.answer_cache.aput(user_question, context_data, result["answer"])
+        return result
+
+    async def _aagent_loop(self, user_question: str, context_text: str):
+        max_retries = 3
+        current_draft = ""
+        critique_feedback = ""
+        critiques = []
+        llm_calls = 0
+
+        for attempt in range(max_retries):
+            if attempt == 0:
+                current_draft = await self._awriter_agent(user_question, context_text)
+            else:
+                current_draft = await self._awriter_agent(user_question, context_text, prev_draft=current_draft, feedback=critique_feedback)
+            critique_result = await self._areview(user_question, context_text, current_draft)
+            llm_calls += 2 if critique_result["reviewer"] == "llm" else 1
+
+            status = critique_result.get("status", "FAIL")
+            critique_feedback = critique_result.get("feedback", "Tidak ada feedback.")
+            critiques.append({"attempt": attempt + 1, "status": status, "feedback": critique_feedback,
+                              "reviewer": critique_result["reviewer"]})
+            print(f"   📊 [Async] Status Review percobaan ke-{attempt + 1}: {status}")
+
+            if status == "PASS":
+                return {"answer": current_draft, "status": "PASS", "revised": attempt > 0,
+                        "attempts": attempt + 1, "critiques": critiques, "llm_calls": llm_calls}
+            if status == CRITIC_ERROR:
+                return self._unverified(current_draft, attempt, critiques, llm_calls)
+            if attempt < max_retries - 1:
+                CRITIC_RETRIES.inc(mode=MODE_SEQUENTIAL)
+
+        return {"answer": current_draft + DISCLAIMER, "status": "FAIL", "revised": max_retries > 1,
+                "attempts": max_retries, "critiques": critiques, "llm_calls": llm_calls}
+
+    async def _abest_of_n(self, user_question: str, context_text: str, n: int):
+        """Best-of-N versi async: draft yang kalah benar-benar di-cancel (task asyncio)."""
+        llm_calls = 0
+
+        async def write_and_critique(draft_no, temperature):
+            nonlocal llm_calls
+            draft = await self._awriter_agent(user_question, context_text, temperature=temperature)
+            llm_calls += 1
+            critique = await self._areview(user_question, context_text, draft)
+            if critique["reviewer"] == "llm":
+                llm_calls += 1
+            return draft_no, temperature, draft, critique
+
+        tasks = [asyncio.ensure_future(write_and_critique(i + 1, t))
+                 for i, t in enumerate(self._draft_temperatures(n))]
+        critiques = []
+        first_draft = None
         try:
-            response = self.client.chat.completions.create(
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    draft_no, temperature, draft, critique_result = await next_done
+                except Exception as e:
+                    print(f"   ❌ [Async Writer] Draft gagal dibuat: {e}")
+                    continue
+
+                status = critique_result.get("status", "FAIL")
+                critiques.append({
+                    "attempt": draft_no, "temperature": temperature, "status": status,
+                    "feedback": critique_result.get("feedback", "Tidak ada feedback."),
+                    "reviewer": critique_result["reviewer"]
+                })
+                first_draft = first_draft or draft
+                if status == "PASS":
+                    return {"answer": draft, "status": "PASS", "revised": False, "attempts": len(critiques),
+                            "critiques": critiques, "llm_calls": llm_calls}
+                if status != CRITIC_ERROR:
+                    CRITIC_RETRIES.inc(mode=MODE_PARALLEL)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if self._all_errors(critiques):
+            return self._unverified(first_draft, 0, critiques, llm_calls)
+        return {"answer": (first_draft or "Maaf, jawaban gagal dibuat.") + DISCLAIMER, "status": "FAIL",
+                "revised": False, "attempts": len(critiques), "critiques": critiques, "llm_calls": llm_calls}
+
+    async def _awriter_agent(self, question, context, prev_draft=None, feedback=None, temperature=0.7):
+        with span("generation.writer"):
+            response = await self.async_client.chat.completions.create(
                 model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0, # Harus ketat & konsisten
-                response_format={"type": "json_object"} # Memaksa output JSON valid
+                messages=self._writer_messages(question, context, prev_draft, feedback),
+                temperature=temperature
             )
+        record_llm_usage(response.model, response.usage)
+        return response.choices[0].message.content
+
+    async def _acritic_agent(self, question, context, draft):
+        try:
+            with span("generation.critic"):
+                response = await self.async_client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=self._critic_messages(question, context, draft),
+                    temperature=0,
+                    response_format={"type": "json_object"}
+                )
+            record_llm_usage(response.model, response.usage)
             return json.loads(response.choices[0].message.content)
         except Exception as e:
-            # Fallback jika error parsing JSON
             print(f"❌ Error Critic: {e}")
-            return {"status": "PASS", "feedback": "Error parsing, anggap saja bagus."}
\ No newline at end of file
+            return {"status": CRITIC_ERROR, "feedback": f"Critic gagal dipanggil: {e}"}
@@ -1,7 +1,10 @@
+import hashlib
 import os
-from typing import List, Dict, Any 
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
 from neo4j import GraphDatabase
 from dotenv import load_dotenv
+from src.core.metrics import span
 from src.modules.rag.embeddings import EmbeddingService
 
 # --- FIX PATH .ENV ---
@@ -11,19 +14,43 @@ env_path = os.path.join(root_dir, ".env")
 load_dotenv(env_path)
 # ---------------------
 
+# Callback yang dipanggil setiap kali sebuah dokumen selesai di-ingest di proses ini
+# (misal: invalidasi cache jawaban). Signature: callback(filename: str)
+_ingest_listeners: List[Callable[[str], None]] = []
+
+
+def on_document_ingested(callback: Callable[[str], None]):
+    """Daftarkan callback yang dipanggil setelah GraphStore.ingest_document selesai."""
+    _ingest_listeners.append(callback)
+
+
+def notify_document_ingested(filename: str):
+    for callback in list(_ingest_listeners):
+        try:
+            callback(filename)
+        except Exception as e:
+            print(f"⚠️ Listener ingest gagal untuk {filename}: {e}")
+
+
 class GraphStore:
-    def __init__(self):
-        # Ambil kredensial
-        uri = os.getenv("NEO4J_URI")
-        user = os.getenv("NEO4J_USERNAME")
-        password = os.getenv("NEO4J_PASSWORD")
+    def __init__(self, driver=None, embedder: EmbeddingService = None):
+        # driver/embedder bisa diberikan dari luar (misal backend palsu untuk benchmark)
+        if driver is None:
+            # Ambil kredensial
+            uri = os.getenv("NEO4J_URI")
+            user = os.getenv("NEO4J_USERNAME")
+            password = os.getenv("NEO4J_PASSWORD")
+
+            if not password:
+                print(f"⚠️ Debug: Mencari .env di: {env_path}")
+                raise ValueError("NEO4J_PASSWORD is not set in .env")
 
-        if not password:
-            print(f"⚠️ Debug: Mencari .env di: {env_path}")
-            raise ValueError("NEO4J_PASSWORD is not set in .env")
+            driver = GraphDatabase.driver(uri, auth=(user, password))
 
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
-        self.embedder = EmbeddingService()
+        self.driver = driver
+        self.embedder = embedder or EmbeddingService()
+        # Jumlah Ayat per transaksi UNWIND pada mode bulk
+        self.batch_size = int(os.getenv("NEO4J_INGEST_BATCH_SIZE", "500"))
 
     def close(self):
         self.driver.close()
@@ -33,6 +60,11 @@ class GraphStore:
         print("⚙️ Membuat/Memastikan Vector Index 'ayat_vector'...")
         with self.driver.session() as session:
             session.run("CREATE CONSTRAINT doc_name IF NOT EXISTS FOR (d:Document) REQUIRE d.filename IS UNIQUE")
+            # Index komposit supaya MERGE Pasal/Ayat jadi index lookup, bukan label scan
+            session.run("CREATE INDEX pasal_lookup IF NOT EXISTS FOR (p:Pasal) ON (p.nomor, p.source_doc)")
+            session.run("CREATE INDEX ayat_lookup IF NOT EXISTS FOR (a:Ayat) ON (a.source_doc, a.source_pasal, a.urutan)")
+            # Pencarian per dokumen (retriever dengan `document`) scan semua Ayat satu dokumen
+            session.run("CREATE INDEX ayat_doc IF NOT EXISTS FOR (a:Ayat) ON (a.source_doc)")
             session.run("""
                 CREATE VECTOR INDEX ayat_vector IF NOT EXISTS
                 FOR (a:Ayat) ON (a.embedding)
@@ -41,12 +73,125 @@ class GraphStore:
                     `vector.similarity_function`: 'cosine'
                 }}
             """)
+            # Full-text index (Lucene) untuk kaki keyword di hybrid search.
+            # Analyzer 'indonesian' melakukan stemming & buang stopword Bahasa Indonesia.
+            print("⚙️ Membuat/Memastikan Full-text Index 'ayat_fulltext'...")
+            session.run("""
+                CREATE FULLTEXT INDEX ayat_fulltext IF NOT EXISTS
+                FOR (a:Ayat) ON EACH [a.teks]
+                OPTIONS {indexConfig: {
+                    `fulltext.analyzer`: 'indonesian'
+                }}
+            """)
+            # Versi yang juga meng-index source_doc, untuk kaki keyword per dokumen
+            # (klausa +source_doc:"..." di query Lucene). Index terpisah karena index lama
+            # tidak bisa diubah lewat IF NOT EXISTS.
+            session.run("""
+                CREATE FULLTEXT INDEX ayat_fulltext_doc IF NOT EXISTS
+                FOR (a:Ayat) ON EACH [a.teks, a.source_doc]
+                OPTIONS {indexConfig: {
+                    `fulltext.analyzer`: 'indonesian'
+                }}
+            """)
         print("✅ Database Setup Selesai.")
 
-    def ingest_document(self, filename: str, structured_data: List[Dict]):
-        """Fungsi Utama: Simpan JSON parser ke Graph + Vector."""
+    def ingest_document(self, filename: str, structured_data: List[Dict], bulk: bool = True,
+                        batch_size: int = None, force: bool = False) -> Dict[str, int]:
+        """
+        Fungsi Utama: Simpan JSON parser ke Graph + Vector.
+        Ingest bersifat inkremental: setiap Ayat/Pasal/Dokumen menyimpan content hash,
+        sehingga saat dokumen revisi di-ingest ulang hanya Ayat yang baru/berubah yang
+        di-embed & ditulis, Ayat yang hilang dihapus, dan yang sama dibiarkan.
+        Mode bulk (default) menulis dengan transaksi `UNWIND $rows` berisi `batch_size`
+        baris; bulk=False menulis satu Ayat per transaksi. force=True mengabaikan hash.
+        Hasil parser kosong untuk dokumen yang sudah ada dilewati (tidak menghapus
+        apa pun) kecuali force=True.
+        Mengembalikan laporan jumlah: added, updated, unchanged, deleted, failed.
+        """
         print(f"📥 Memproses {filename} untuk disimpan ke Neo4j...")
-        
+
+        with span("ingest.plan"):
+            plan = self.plan_ingest(filename, structured_data, force=force)
+        if not plan.skipped:
+            with span("ingest.embed"):
+                self.embed_plan(plan)
+            with span("ingest.write"):
+                self.apply_plan(plan, batch_size=batch_size if bulk else 1)
+
+        report = plan.report()
+        print(f"🎉 Selesai {filename}: {report}")
+        return report
+
+    # --- TAHAP 1: DIFF ---
+    def plan_ingest(self, filename: str, structured_data: List[Dict], force: bool = False) -> "IngestPlan":
+        """Bandingkan hasil parser dengan isi graph sekarang (1 query baca)."""
+        rows = self._collect_rows(structured_data)
+        doc_hash = _hash_parts(*(row["content_hash"] for row in rows))
+
+        with self.driver.session() as session:
+            record = session.run("""
+                OPTIONAL MATCH (a:Ayat {source_doc: $filename})
+                WITH collect(a {.source_pasal, .urutan, .content_hash}) AS ayat
+                OPTIONAL MATCH (d:Document {filename: $filename})
+                RETURN d.content_hash AS doc_hash, ayat
+            """, filename=filename).single()
+
+        plan = IngestPlan(filename=filename, doc_hash=doc_hash, total=len(rows))
+
+        # Parser tidak menemukan satu Pasal pun (PDF rusak, OCR gagal, format asing) padahal
+        # dokumen sudah punya Ayat: jangan diartikan "semua Pasal dihapus". Pakai force=True
+        # kalau memang ingin mengosongkan dokumen.
+        if not force and not rows and record["ayat"]:
+            print(f"⚠️ {filename}: parser tidak menghasilkan Ayat, {len(record['ayat'])} Ayat lama "
+                  f"dipertahankan (pakai force=True untuk mengosongkan).")
+            plan.skipped = True
+            plan.empty_parse = True
+            return plan
+
+        if not force and record["doc_hash"] == doc_hash:
+            print(f"⏭️ {filename} tidak berubah sejak ingest terakhir, dilewati.")
+            plan.skipped = True
+            plan.unchanged = len(rows)
+            return plan
+
+        existing = {} if force else {
+            (a["source_pasal"], a["urutan"]): a["content_hash"] for a in record["ayat"]
+        }
+        new_keys = set()
+        for row in rows:
+            key = (row["nomor"], row["urutan"])
+            new_keys.add(key)
+            old_hash = existing.get(key)
+            if old_hash == row["content_hash"]:
+                plan.unchanged += 1
+            else:
+                row["is_new"] = key not in existing
+                plan.rows.append(row)
+
+        # Ayat yang ada di graph tapi sudah tidak ada di dokumen revisi
+        for source_pasal, urutan in ({(a["source_pasal"], a["urutan"]) for a in record["ayat"]} - new_keys):
+            plan.deleted.append({"nomor": source_pasal, "urutan": urutan})
+        plan.pasal_list = sorted({row["nomor"] for row in rows})
+        return plan
+
+    # --- TAHAP 2: EMBEDDING (hanya Ayat baru/berubah) ---
+    def embed_plan(self, plan: "IngestPlan"):
+        embeddings = self.embedder.get_embeddings([row["context_text"] for row in plan.rows])
+        for i, reason in sorted(embeddings.errors.items()):
+            row = plan.rows[i]
+            print(f"⚠️ Skip Pasal {row['nomor']} ayat {row['urutan']}: embedding gagal ({reason})")
+        for row, vector in zip(plan.rows, embeddings.vectors):
+            row["vector"] = vector
+        plan.failed = len(embeddings.errors)
+
+    # --- TAHAP 3: TULIS KE NEO4J ---
+    def apply_plan(self, plan: "IngestPlan", batch_size: int = None):
+        filename = plan.filename
+        ready_rows = [
+            {key: row[key] for key in ("nomor", "judul", "teks", "urutan", "vector", "content_hash", "pasal_hash")}
+            for row in plan.rows if row.get("vector")
+        ]
+
         with self.driver.session() as session:
             # A. Buat Node Dokumen Induk
             session.run("""
@@ -54,57 +199,138 @@ class GraphStore:
                 ON CREATE SET d.created_at = datetime()
             """, filename=filename)
 
-            # B. Loop setiap Pasal
-            for pasal in structured_data:
-                # --- PERBAIKAN ANTI-ERROR (ROBUST) ---
-                # Kita cari key 'nomor' ATAU 'pasal_ke'. Kalau tidak ada dua-duanya, pakai string kosong.
-                nomor_pasal = pasal.get('nomor') or pasal.get('pasal_ke')
-                judul_pasal = pasal.get('judul', 'Tanpa Judul')
-                isi_list = pasal.get('isi', [])
-                # -------------------------------------
-
-                if not nomor_pasal:
-                    print(f"⚠️ Skip data aneh (tidak punya nomor pasal): {pasal}")
-                    continue
-
-                # C. Loop setiap Ayat/Isi
-                for i, ayat_text in enumerate(isi_list):
-                    # 1. Generate Contextual Embedding
-                    context_text = f"Pasal {nomor_pasal} {judul_pasal}: {ayat_text}"
-                    vector = self.embedder.get_embedding(context_text)
-                    
-                    if not vector:
-                        continue 
-
-                    # 2. Simpan ke Neo4j
-                    session.run("""
-                        MATCH (d:Document {filename: $filename})
-                        
-                        MERGE (p:Pasal {nomor: $nomor, source_doc: $filename})
-                        ON CREATE SET p.judul = $judul
-                        
-                        MERGE (d)-[:MEMILIKI]->(p)
-                        
-                        MERGE (a:Ayat { 
-                            source_pasal: $nomor,
-                            urutan: $urutan,
-                            source_doc: $filename
-                        })
-                        ON CREATE SET 
-                            a.teks = $teks,
-                            a.embedding = $vector
-                        
-                        MERGE (p)-[:BERISI]->(a)
-                    """, 
-                    filename=filename,
-                    nomor=nomor_pasal,
-                    judul=judul_pasal,
-                    teks=ayat_text,
-                    urutan=i+1,
-                    vector=vector
-                    )
-        
-        print(f"🎉 Sukses menyimpan data Pasal dari {filename} ke Neo4j.")
+            # B. Simpan Pasal & Ayat yang baru/berubah
+            size = batch_size or self.batch_size
+            for start in range(0, len(ready_rows), size):
+                session.execute_write(self._write_rows, filename, ready_rows[start:start + size])
+
+            # C. Hapus Ayat yang hilang, lalu Pasal yang sudah tidak ada di dokumen
+            if plan.deleted:
+                session.execute_write(self._delete_rows, filename, plan.deleted)
+            session.run("""
+                MATCH (p:Pasal {source_doc: $filename})
+                WHERE NOT p.nomor IN $pasal_list
+                DETACH DELETE p
+            """, filename=filename, pasal_list=plan.pasal_list)
+
+            # D. Tandai versi dokumen. Cache (misal cache jawaban) memakai nilai ini
+            # untuk tahu bahwa isi dokumen sudah berubah, walau di proses lain.
+            # Hash dokumen hanya disimpan kalau semua Ayat sukses, supaya run berikutnya
+            # tidak melewati Ayat yang gagal.
+            session.run("""
+                MATCH (d:Document {filename: $filename})
+                SET d.ingested_at = datetime(),
+                    d.content_hash = CASE WHEN $complete THEN $doc_hash ELSE null END
+            """, filename=filename, doc_hash=plan.doc_hash, complete=plan.failed == 0)
+
+        notify_document_ingested(filename)
+
+    # Query upsert banyak Ayat sekaligus dalam 1 transaksi.
+    # Pakai SET (bukan ON CREATE SET) supaya teks yang berubah ikut ter-update.
+    WRITE_ROWS_QUERY = """
+        MATCH (d:Document {filename: $filename})
+        UNWIND $rows AS row
+
+        MERGE (p:Pasal {nomor: row.nomor, source_doc: $filename})
+        SET p.judul = row.judul,
+            p.content_hash = row.pasal_hash
+
+        MERGE (d)-[:MEMILIKI]->(p)
+
+        MERGE (a:Ayat {
+            source_pasal: row.nomor,
+            urutan: row.urutan,
+            source_doc: $filename
+        })
+        SET a.teks = row.teks,
+            a.embedding = row.vector,
+            a.content_hash = row.content_hash
+
+        MERGE (p)-[:BERISI]->(a)
+    """
+
+    DELETE_ROWS_QUERY = """
+        UNWIND $rows AS row
+        MATCH (a:Ayat {source_doc: $filename, source_pasal: row.nomor, urutan: row.urutan})
+        DETACH DELETE a
+    """
+
+    @classmethod
+    def _write_rows(cls, tx, filename: str, rows: List[Dict[str, Any]]):
+        tx.run(cls.WRITE_ROWS_QUERY, filename=filename, rows=rows).consume()
+
+    @classmethod
+    def _delete_rows(cls, tx, filename: str, rows: List[Dict[str, Any]]):
+        tx.run(cls.DELETE_ROWS_QUERY, filename=filename, rows=rows).consume()
+
+    @staticmethod
+    def _collect_rows(structured_data: List[Dict]) -> List[Dict[str, Any]]:
+        """Meratakan hasil parser (Pasal -> Ayat) menjadi list baris siap simpan, lengkap dengan hash."""
+        rows = []
+        for pasal in structured_data:
+            # --- PERBAIKAN ANTI-ERROR (ROBUST) ---
+            # Kita cari key 'nomor' ATAU 'pasal_ke'. Kalau tidak ada dua-duanya, pakai string kosong.
+            nomor_pasal = pasal.get('nomor') or pasal.get('pasal_ke')
+            judul_pasal = pasal.get('judul', 'Tanpa Judul')
+            isi_list = pasal.get('isi', [])
+            # -------------------------------------
+
+            if not nomor_pasal:
+                print(f"⚠️ Skip data aneh (tidak punya nomor pasal): {pasal}")
+                continue
+
+            pasal_rows = []
+            for i, ayat_text in enumerate(isi_list):
+                pasal_rows.append({
+                    "nomor": nomor_pasal,
+                    "judul": judul_pasal,
+                    "teks": ayat_text,
+                    "urutan": i + 1,
+                    # Contextual Embedding: sertakan nomor & judul Pasal
+                    "context_text": f"Pasal {nomor_pasal} {judul_pasal}: {ayat_text}",
+                    # Judul ikut di-hash karena ikut menentukan embedding
+                    "content_hash": _hash_parts(nomor_pasal, judul_pasal, ayat_text),
+                })
+
+            pasal_hash = _hash_parts(judul_pasal, *(row["content_hash"] for row in pasal_rows))
+            for row in pasal_rows:
+                row["pasal_hash"] = pasal_hash
+            rows.extend(pasal_rows)
+        return rows
+
+
+def _hash_parts(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+@dataclass
+class IngestPlan:
+    """Hasil diff satu dokumen: apa yang perlu di-embed, ditulis, dan dihapus."""
+    filename: str
+    doc_hash: str
+    total: int = 0
+    rows: List[Dict[str, Any]] = field(default_factory=list)      # Ayat baru/berubah
+    deleted: List[Dict[str, Any]] = field(default_factory=list)   # Ayat yang hilang
+    pasal_list: List[str] = field(default_factory=list)           # Pasal yang masih ada
+    unchanged: int = 0
+    failed: int = 0
+    skipped: bool = False  # True kalau dokumen identik dengan ingest terakhir
+    empty_parse: bool = False  # True kalau dilewati karena parser kosong (Ayat lama dipertahankan)
+
+    def report(self) -> Dict[str, int]:
+        written = [row for row in self.rows if row.get("vector")]
+        return {
+            "total": self.total,
+            "added": sum(1 for row in written if row.get("is_new")),
+            "updated": sum(1 for row in written if not row.get("is_new")),
+            "unchanged": self.unchanged,
+            "deleted": len(self.deleted),
+            "failed": self.failed,
+        }
 
 # --- TEST RUN ---
 if __name__ == "__main__":
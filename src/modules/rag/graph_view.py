@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from src.core.metrics import record_cache_lookup
+
+# Versi dokumen = waktu ingest terakhir. Berubah setiap kali dokumen di-ingest ulang
+# (di proses mana pun), jadi cukup untuk validasi cache & ETag.
+DOC_VERSION_QUERY = """
+MATCH (d:Document {filename: $doc})
+RETURN toString(d.ingested_at) AS version
+"""
+
+# Lookup Pasal lewat index pasal_lookup (nomor, source_doc), hanya di dokumen yang diminta.
+# Ayat dibatasi per Pasal dan teksnya dipotong di Neo4j supaya payload tetap kecil.
+GRAPH_QUERY = """
+MATCH (p:Pasal)
+WHERE p.source_doc = $doc AND p.nomor IN $pasal_list
+CALL {
+    WITH p
+    MATCH (p)-[:BERISI]->(a:Ayat)
+    WITH a ORDER BY a.urutan
+    LIMIT $max_ayat
+    RETURN collect({id: elementId(a), teks: left(a.teks, $tooltip_chars)}) AS ayat
+}
+RETURN p.nomor AS pasal, p.judul AS judul, COUNT { (p)-[:BERISI]->() } AS total_ayat, ayat
+"""
+
+PasalKey = Tuple[str, ...]
+
+
+@dataclass
+class RenderedGraph:
+    etag: str
+    body: bytes  # JSON vis.js yang sudah diserialisasi
+    version: Optional[str]
+
+
+class GraphView:
+    """
+    Menyusun data graph (node & edge vis.js) untuk /get-graph.
+    - Selalu dibatasi ke satu dokumen, maksimal max_pasal Pasal & max_ayat Ayat per Pasal.
+    - Hasil render disimpan (LRU) dengan kunci (dokumen, set pasal) dan divalidasi
+      dengan versi dokumen, jadi klik berikutnya cukup 1 query kecil ke Neo4j.
+    - ETag diturunkan dari dokumen + versi + set pasal, untuk balasan 304.
+    """
+
+    def __init__(self, driver, max_pasal: int = None, max_ayat: int = None,
+                 tooltip_chars: int = None, max_entries: int = None):
+        self.driver = driver
+        self.max_pasal = max_pasal or int(os.getenv("GRAPH_MAX_PASAL", "20"))
+        self.max_ayat = max_ayat or int(os.getenv("GRAPH_MAX_AYAT_PER_PASAL", "50"))
+        self.tooltip_chars = tooltip_chars or int(os.getenv("GRAPH_TOOLTIP_CHARS", "500"))
+        self.max_entries = max_entries or int(os.getenv("GRAPH_CACHE_MAX_ENTRIES", "500"))
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, PasalKey, bool], RenderedGraph]" = OrderedDict()
+
+    def pasal_key(self, pasal_list: List) -> Tuple[PasalKey, bool]:
+        """Set pasal yang dinormalisasi (unik, urut, dibatasi max_pasal) + apakah ada yang terpotong."""
+        unique = sorted({str(nomor).strip() for nomor in pasal_list if str(nomor).strip()})
+        return tuple(unique[:self.max_pasal]), len(unique) > self.max_pasal
+
+    def etag(self, doc: str, version: Optional[str], pasal: PasalKey, trimmed: bool) -> str:
+        raw = json.dumps([doc, version, pasal, trimmed, self.max_ayat, self.tooltip_chars])
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    # --- LOOKUP ---
+    def document_version(self, doc: str) -> Tuple[bool, Optional[str]]:
+        """(dokumen ada?, versi)."""
+        with self.driver.session() as session:
+            record = session.run(DOC_VERSION_QUERY, doc=doc).single()
+        if record is None:
+            return False, None
+        return True, record["version"]
+
+    def render(self, doc: str, pasal_list: List) -> Optional[RenderedGraph]:
+        """Graph untuk pasal_list di dokumen doc. None kalau dokumennya tidak ada."""
+        exists, version = self.document_version(doc)
+        if not exists:
+            return None
+        pasal, trimmed = self.pasal_key(pasal_list)
+        key = (doc, pasal, trimmed)
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached.version == version:
+                self._entries.move_to_end(key)
+                record_cache_lookup("graph", hits=1, misses=0)
+                return cached
+        record_cache_lookup("graph", hits=0, misses=1)
+
+        payload = self._build(doc, pasal)
+        payload["truncated"] = payload["truncated"] or trimmed
+        rendered = RenderedGraph(
+            etag=self.etag(doc, version, pasal, trimmed),
+            body=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+            version=version,
+        )
+        with self._lock:
+            self._entries[key] = rendered
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return rendered
+
+    def _build(self, doc: str, pasal: PasalKey) -> Dict:
+        nodes, edges = [], []
+        truncated = False
+        if not pasal:
+            return {"document": doc, "nodes": nodes, "edges": edges, "truncated": truncated}
+
+        with self.driver.session() as session:
+            records = list(session.run(
+                GRAPH_QUERY, doc=doc, pasal_list=list(pasal),
+                max_ayat=self.max_ayat, tooltip_chars=self.tooltip_chars,
+            ))
+
+        for record in records:
+            p_id = f"pasal_{record['pasal']}"
+            # 1. Node PASAL (Induk) - Warna Biru
+            nodes.append({
+                "id": p_id,
+                "label": f"Pasal {record['pasal']}\n{record['judul']}",
+                "color": "#3498db",
+                "shape": "box",
+                "font": {"color": "white"}
+            })
+            if record["total_ayat"] > len(record["ayat"]):
+                truncated = True
+
+            for ayat in record["ayat"]:
+                a_id = f"ayat_{ayat['id']}"
+                # 2. Node AYAT (Anak) - Warna Kuning, teks dipotong biar gak kepanjangan di layar
+                nodes.append({
+                    "id": a_id,
+                    "label": ayat["teks"][:20] + "...",
+                    "title": ayat["teks"],  # Tooltip (muncul pas mouse hover)
+                    "color": "#f1c40f",
+                    "shape": "ellipse"
+                })
+                # 3. Garis Hubung
+                edges.append({"from": p_id, "to": a_id})
+
+        return {"document": doc, "nodes": nodes, "edges": edges, "truncated": truncated}
+
+    # --- INVALIDASI ---
+    def invalidate_document(self, filename: str):
+        """Buang graph dokumen ini dari cache (dipanggil setelah ingest)."""
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == filename]
+            for key in stale:
+                del self._entries[key]
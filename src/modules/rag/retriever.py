@@ -1,81 +1,541 @@
 import os
-from neo4j import GraphDatabase
+import re
+from typing import Dict, List, Optional, Tuple
+from neo4j import AsyncDriver, GraphDatabase
+from src.core.metrics import span
 from src.modules.rag.embeddings import EmbeddingService
+from src.modules.rag.vector_index import DOC_VECTORS_QUERY, DOC_VERSIONS_QUERY, MmapVectorIndex
+
+# Konstanta k standar dari paper Reciprocal Rank Fusion (Cormack dkk., 2009)
+RRF_K = 60
+
+# Token kata/angka saja -> otomatis aman dari karakter spesial sintaks Lucene
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+VECTOR_LEG = """
+    CALL db.index.vector.queryNodes('ayat_vector', $candidates, $query_vector)
+    YIELD node, score
+    RETURN node, score, 'vector' AS source
+"""
+
+# Kaki vector eksak untuk satu dokumen: hitung cosine ke semua Ayat dokumen itu (lewat index
+# source_doc), bukan ANN ke seluruh database yang top-k-nya habis oleh dokumen lain.
+# Skornya sama dengan skor vector index (cosine dinormalisasi ke 0..1).
+SCOPED_VECTOR_LEG = """
+    MATCH (node:Ayat {source_doc: $document})
+    WHERE node.embedding IS NOT NULL
+    WITH node, vector.similarity.cosine(node.embedding, $query_vector) AS score
+    ORDER BY score DESC LIMIT $top_k
+    RETURN node, score, 'vector' AS source
+"""
+
+# Kaki vector kalau pencarian dilakukan di index lokal (MmapVectorIndex):
+# Neo4j cukup mengambil node-nya lewat elementId (tanpa query ke vector index)
+LOCAL_VECTOR_LEG = """
+    UNWIND $vector_hits AS hit
+    MATCH (node:Ayat) WHERE elementId(node) = hit.id
+    RETURN node, hit.score AS score, 'vector' AS source
+"""
+
+KEYWORD_LEG = """
+    CALL db.index.fulltext.queryNodes('ayat_fulltext', $keyword_query, {limit: $candidates})
+    YIELD node, score
+    RETURN node, score, 'keyword' AS source
+"""
+
+# Kaki keyword untuk satu dokumen: $keyword_query sudah memuat klausa +source_doc:"..."
+# (lihat build_scoped_keyword_query), jadi Lucene hanya menilai Ayat dokumen itu. Kalau
+# disaring setelah top-N global, dokumen yang mirip (ribuan template PPJB) menghabiskan kuotanya.
+SCOPED_KEYWORD_LEG = """
+    CALL db.index.fulltext.queryNodes('ayat_fulltext_doc', $keyword_query, {limit: $top_k})
+    YIELD node, score
+    RETURN node, score, 'keyword' AS source
+"""
+
+# Buang kandidat dari dokumen lain (kaki ANN yang di-over-fetch) sebelum hydrate
+SCOPE_FILTER = """
+WITH node, score, source
+WHERE node.source_doc = $document
+"""
+
+# Jumlah Ayat ber-embedding di satu dokumen -> pilih scan eksak atau over-fetch
+SCOPE_SIZE_QUERY = """
+MATCH (a:Ayat {source_doc: $document}) WHERE a.embedding IS NOT NULL
+RETURN count(a) AS size
+"""
+
+# Strategi pencarian yang dibatasi ke satu dokumen
+SCOPE_EXACT = "exact"
+SCOPE_OVERFETCH = "overfetch"
+
+HYDRATE_PARENT = """
+MATCH (p:Pasal)-[:BERISI]->(node)
+OPTIONAL MATCH (d:Document {filename: node.source_doc})
+RETURN elementId(node) AS ayat_id, node.teks AS teks, node.source_doc AS source_doc,
+       toString(d.ingested_at) AS doc_version,
+       p.nomor AS nomor, p.judul AS judul, score, source
+"""
+
+
+# Versi batch: banyak pertanyaan dalam 1 round trip. Tiap pertanyaan jadi 1 baris $queries
+# ({idx, vector, keyword, hits}); hasilnya dikelompokkan lagi per idx di Python.
+BATCH_VECTOR_LEG = """
+    WITH q
+    WITH q WHERE q.vector IS NOT NULL
+    CALL db.index.vector.queryNodes('ayat_vector', $candidates, q.vector)
+    YIELD node, score
+    RETURN node, score, 'vector' AS source
+"""
+
+BATCH_LOCAL_VECTOR_LEG = """
+    WITH q
+    UNWIND q.hits AS hit
+    MATCH (node:Ayat) WHERE elementId(node) = hit.id
+    RETURN node, hit.score AS score, 'vector' AS source
+"""
+
+BATCH_SCOPED_VECTOR_LEG = """
+    WITH q
+    WITH q WHERE q.vector IS NOT NULL
+    MATCH (node:Ayat {source_doc: $document})
+    WHERE node.embedding IS NOT NULL
+    WITH node, vector.similarity.cosine(node.embedding, q.vector) AS score
+    ORDER BY score DESC LIMIT $top_k
+    RETURN node, score, 'vector' AS source
+"""
+
+BATCH_KEYWORD_LEG = """
+    WITH q
+    WITH q WHERE q.keyword <> ''
+    CALL db.index.fulltext.queryNodes('ayat_fulltext', q.keyword, {limit: $candidates})
+    YIELD node, score
+    RETURN node, score, 'keyword' AS source
+"""
+
+BATCH_SCOPED_KEYWORD_LEG = """
+    WITH q
+    WITH q WHERE q.keyword <> ''
+    CALL db.index.fulltext.queryNodes('ayat_fulltext_doc', q.keyword, {limit: $top_k})
+    YIELD node, score
+    RETURN node, score, 'keyword' AS source
+"""
+
+# Batasi kandidat ke satu dokumen (kalau $document di-set) sebelum hydrate
+BATCH_SCOPE_FILTER = """
+WITH q, node, score, source
+WHERE $document IS NULL OR node.source_doc = $document
+"""
+
+
+def build_keyword_query(query: str) -> str:
+    """
+    Mengubah pertanyaan user jadi query Lucene: "denda OR keterlambatan OR 5".
+    Hanya token alfanumerik yang dipakai, dan query dikirim sebagai parameter
+    (bukan disisipkan ke string Cypher).
+    """
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(query.lower()):
+        # Kata pendek biasanya kata sambung, tapi angka ("5", "12") tetap penting
+        if (len(token) > 2 or token.isdigit()) and token not in tokens:
+            tokens.append(token)
+    return " OR ".join(tokens)
+
+
+def build_scoped_keyword_query(keyword_query: str, document: str) -> str:
+    """
+    Query Lucene yang dibatasi ke satu dokumen (untuk index 'ayat_fulltext_doc'):
+    +source_doc:"kontrak.pdf" +teks:(denda OR keterlambatan). Kosong kalau tidak ada kata kunci.
+    """
+    if not keyword_query:
+        return ""
+    phrase = document.replace("\\", "\\\\").replace('"', '\\"')
+    return f'+source_doc:"{phrase}" +teks:({keyword_query})'
+
+
+def build_hybrid_query(keyword_query: str, local_vector: bool = False, scope: str = None) -> str:
+    """
+    Gabungkan kaki vector (+ keyword kalau ada) dalam 1 subquery, lalu hydrate Pasal induk.
+    `scope` (SCOPE_EXACT / SCOPE_OVERFETCH) kalau pencarian dibatasi ke $document.
+    """
+    if local_vector:
+        vector_leg = LOCAL_VECTOR_LEG
+    else:
+        vector_leg = SCOPED_VECTOR_LEG if scope == SCOPE_EXACT else VECTOR_LEG
+    legs = [vector_leg]
+    if keyword_query:
+        legs.append(SCOPED_KEYWORD_LEG if scope else KEYWORD_LEG)
+    return "CALL {" + "\n    UNION ALL\n".join(legs) + "}" + (SCOPE_FILTER if scope else "") + HYDRATE_PARENT
+
+
+def build_batch_query(local_vector: bool = False, scope: str = None) -> str:
+    """Seperti build_hybrid_query, tapi untuk UNWIND banyak pertanyaan sekaligus."""
+    if local_vector:
+        vector_leg = BATCH_LOCAL_VECTOR_LEG
+    else:
+        vector_leg = BATCH_SCOPED_VECTOR_LEG if scope == SCOPE_EXACT else BATCH_VECTOR_LEG
+    legs = [vector_leg, BATCH_SCOPED_KEYWORD_LEG if scope else BATCH_KEYWORD_LEG]
+    hydrate = HYDRATE_PARENT.replace("RETURN ", "RETURN q.idx AS idx, ", 1)
+    return "UNWIND $queries AS q\nCALL {" + "\n    UNION ALL\n".join(legs) + "}" + BATCH_SCOPE_FILTER + hydrate
+
+
+def reciprocal_rank_fusion(ranked_lists: List[List[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """
+    Menggabungkan beberapa daftar peringkat (list of ID, terbaik di depan).
+    Skor tiap ID = sum(1 / (k + rank)). Mengembalikan [(id, skor)] urut menurun.
+    """
+    fused: Dict[str, float] = {}
+    for ranked in ranked_lists:
+        for rank, item_id in enumerate(ranked, start=1):
+            fused[item_id] = fused.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def load_vector_index(path: str = None):
+    """
+    Load index vektor lokal dari VECTOR_INDEX_PATH (kalau di-set & sudah di-build).
+    Mengembalikan None kalau tidak ada -> retriever pakai vector index Neo4j.
+    """
+    path = path if path is not None else os.getenv("VECTOR_INDEX_PATH", "")
+    if not path or not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    index = MmapVectorIndex(path)
+    print(f"🧭 [Retriever] Index vektor lokal dipakai: {path} ({index.count} vektor)")
+    return index
+
+
+def _vector_hits(index: MmapVectorIndex, query_vector: List[float], top_k: int,
+                 documents: List[str] = None) -> List[Dict]:
+    return [{"id": ayat_id, "score": score} for ayat_id, score in index.search(query_vector, top_k, documents)]
+
+
+class ScopePolicy:
+    """
+    Cara mencari kalau retrieval dibatasi ke satu dokumen:
+    - Dokumen kecil (<= RETRIEVAL_EXACT_SCAN_MAX Ayat) atau ada index lokal: vector search eksak
+      hanya di Ayat dokumen itu, 1 round trip.
+    - Dokumen besar: ANN global di-over-fetch (top_k x RETRIEVAL_SCOPE_OVERFETCH) lalu disaring;
+      kalau hasil di dokumen itu belum cukup, kandidat dinaikkan 4x (maks RETRIEVAL_MAX_CANDIDATES).
+    Kaki keyword selalu eksak: query Lucene-nya memuat klausa dokumen (build_scoped_keyword_query).
+    Ukuran dokumen di-cache sampai dokumen di-ingest ulang.
+    """
+
+    def __init__(self):
+        self.overfetch = int(os.getenv("RETRIEVAL_SCOPE_OVERFETCH", "10"))
+        self.exact_scan_max = int(os.getenv("RETRIEVAL_EXACT_SCAN_MAX", "20000"))
+        self.max_candidates = int(os.getenv("RETRIEVAL_MAX_CANDIDATES", "10000"))
+        self._sizes: Dict[str, int] = {}
+
+    def cached_size(self, document: str) -> Optional[int]:
+        return self._sizes.get(document)
+
+    def remember_size(self, document: str, size: int):
+        self._sizes[document] = size
+
+    def invalidate_document(self, filename: str):
+        self._sizes.pop(filename, None)
+
+    def strategy(self, size: int, local_vector: bool) -> str:
+        return SCOPE_EXACT if local_vector or size <= self.exact_scan_max else SCOPE_OVERFETCH
+
+    def candidates(self, top_k: int) -> int:
+        return min(self.max_candidates, top_k * self.overfetch)
+
+    def next_candidates(self, strategy: str, candidates: int, records, top_k: int, size: int) -> Optional[int]:
+        """None kalau hasil sudah cukup (atau sudah mentok), kalau belum: jumlah kandidat berikutnya."""
+        if strategy == SCOPE_EXACT or candidates >= self.max_candidates:
+            return None
+        found = len({record["ayat_id"] for record in records if record["source"] == "vector"})
+        if found >= min(top_k, size):
+            return None
+        return min(self.max_candidates, candidates * 4)
+
 
 class GraphRetriever:
-    def __init__(self, driver: GraphDatabase.driver):
+    def __init__(self, driver: GraphDatabase.driver, embedder: EmbeddingService = None,
+                 vector_index: MmapVectorIndex = None):
         self.driver = driver
-        self.embedder = EmbeddingService()
+        self.embedder = embedder or EmbeddingService()
+        # Opsional: vector search di proses sendiri, Neo4j hanya untuk keyword & hydration
+        self.vector_index = vector_index
+        self.sync_interval = float(os.getenv("VECTOR_INDEX_SYNC_SECONDS", "30"))
+        # retrieve_many: jumlah pertanyaan per round trip
+        self.batch_size = int(os.getenv("RETRIEVAL_BATCH_SIZE", "100"))
+        # Pencarian yang dibatasi ke satu dokumen (parameter `document`)
+        self.scope = ScopePolicy()
+
+    def invalidate_document(self, filename: str):
+        """Dipanggil saat dokumen di-ingest ulang (lihat on_document_ingested)."""
+        self.scope.invalidate_document(filename)
 
-    def retrieve(self, query: str, top_k: int = 5): # Kita naikkan jadi 5 kandidat
+    def retrieve(self, query: str, top_k: int = 5, return_stats: bool = False, # Kita naikkan jadi 5 kandidat
+                 document: str = None):
         """
-        Melakukan Hybrid Search: Menggabungkan Vector Search + Keyword Search sederhana.
+        Melakukan Hybrid Search: Vector Search + Full-text Search, digabung dengan
+        Reciprocal Rank Fusion. Data Pasal induk ikut diambil di query yang sama,
+        jadi cukup 1 round trip ke Neo4j.
+        `document` membatasi pencarian ke satu dokumen (lihat ScopePolicy).
+        Kalau return_stats=True, mengembalikan (results, stats).
         """
         # 1. Siapkan Vector
-        query_vector = self.embedder.get_embedding(query)
-        
-        # 2. Ekstrak kata kunci sederhana (misal user tanya "denda", kita cari kata "denda")
-        # Kita ambil kata yang panjangnya > 3 huruf agar kata sambung tidak ikut
-        keywords = [word for word in query.lower().split() if len(word) > 3]
-        keyword_clause = " OR ".join([f"toLower(node.teks) CONTAINS '{word}'" for word in keywords])
-        
-        if not keyword_clause:
-            keyword_clause = "1=0" # Kalau tidak ada keyword, abaikan bagian ini
-
-        # 3. Query Cypher: GABUNGAN (UNION)
-        # Bagian A: Cari berdasarkan Vector (Makna)
-        # Bagian B: Cari berdasarkan Teks (Keyword match)
-        cypher_query = f"""
-        // BAGIAN 1: VECTOR SEARCH
-        CALL db.index.vector.queryNodes('ayat_vector', $top_k, $query_vector)
-        YIELD node, score
-        RETURN node, score, 'vector' as source
-        
-        UNION
-        
-        // BAGIAN 2: KEYWORD SEARCH (Backup jika vector meleset)
-        MATCH (node:Ayat)
-        WHERE {keyword_clause}
-        RETURN node, 1.0 as score, 'keyword' as source
-        LIMIT $top_k
+        with span("retrieval.embed_query"):
+            query_vector = self.embedder.get_embedding(query)
+
+        # 2. Siapkan query full-text (misal user tanya "denda", kita cari kata "denda")
+        keyword_query = build_keyword_query(query)
+
+        local_vector = self.vector_index is not None
+        stats = {"round_trips": 0, "candidates": 0}
+
+        print(f"🔍 [Retriever] Mencari: '{query}'" + (f" di dokumen {document}" if document else ""))
+
+        with self.driver.session() as session:
+            # 3. Kalau dibatasi ke 1 dokumen: eksak (dokumen kecil) atau over-fetch (dokumen besar)
+            scope, candidates, size = None, top_k, None
+            if document:
+                size = self._scope_size(session, document, stats)
+                scope, candidates = self.scope.strategy(size, local_vector), self.scope.candidates(top_k)
+                keyword_query = build_scoped_keyword_query(keyword_query, document)
+
+            vector_hits = []
+            if local_vector:
+                if self.vector_index.needs_sync(self.sync_interval):
+                    with span("retrieval.index_sync"):
+                        stats["round_trips"] += self._sync_vector_index(session)
+                with span("retrieval.local_vector"):
+                    vector_hits = _vector_hits(self.vector_index, query_vector, top_k,
+                                               [document] if document else None)
+
+            # 4. Query Cypher: kedua kaki pencarian di dalam subquery,
+            # lalu langsung sambung ke Pasal induknya (tanpa query kecil per hasil)
+            # Bagian A: Cari berdasarkan Vector (Makna)
+            # Bagian B: Cari berdasarkan Teks (Full-text index, kalau ada kata kunci)
+            cypher_query = build_hybrid_query(keyword_query, local_vector=local_vector, scope=scope)
+            while True:
+                with span("retrieval.neo4j"):
+                    records = list(session.run(cypher_query,
+                                        query_vector=query_vector,
+                                        vector_hits=vector_hits,
+                                        keyword_query=keyword_query,
+                                        document=document,
+                                        candidates=candidates,
+                                        top_k=top_k))
+                stats["round_trips"] += 1
+                next_candidates = self.scope.next_candidates(scope, candidates, records, top_k, size) if scope else None
+                if next_candidates is None:
+                    break
+                candidates = next_candidates
+            stats["candidates"] = len(records)
+            if scope:
+                stats["scope"] = {"document": document, "strategy": scope, "size": size, "candidates": candidates}
+
+        results = self._fuse(records, top_k)
+
+        stats["results"] = len(results)
+        print(f"   📶 [Retriever] {stats['round_trips']} round trip ke Neo4j, {stats['results']} hasil.")
+
+        if return_stats:
+            return results, stats
+        return results
+
+    def retrieve_many(self, queries: List[str], top_k: int = 5, document: str = None) -> Tuple[List[List[Dict]], Dict]:
         """
-        
-        results = []
-        seen_ids = set() # Untuk mencegah duplikat (kalau ketemu di vector & keyword)
+        Hybrid search untuk banyak pertanyaan sekaligus (misal checklist audit):
+        semua pertanyaan di-embed dalam 1 batch, lalu vector + keyword search + hydrate
+        untuk semuanya dijalankan dalam 1 query UNWIND (per RETRIEVAL_BATCH_SIZE pertanyaan).
+        `document` membatasi hasil ke satu dokumen. Mengembalikan (hasil per pertanyaan, stats).
+        """
+        with span("retrieval.embed_query"):
+            embedded = self.embedder.get_embeddings(queries)
+
+        local_vector = self.vector_index is not None
+        documents = [document] if document else None
+        stats = {"round_trips": 0, "candidates": 0, "queries": len(queries), "embedding_errors": len(embedded.errors)}
+        grouped: Dict[int, List] = {i: [] for i in range(len(queries))}
 
-        print(f"🔍 [Retriever] Mencari: '{query}'")
+        print(f"🔍 [Retriever] Batch {len(queries)} pertanyaan" + (f" di dokumen {document}" if document else ""))
 
         with self.driver.session() as session:
-            records = session.run(cypher_query, 
-                                query_vector=query_vector, 
-                                top_k=top_k)
-            
-            for record in records:
-                node = record['node']
-                score = record['score']
-                source_method = record['source']
-                
-                # Cek Duplikat (Kita pakai ID internal Neo4j)
-                if node.element_id in seen_ids:
-                    continue
-                seen_ids.add(node.element_id)
-
-                # Ambil data Bapaknya (Pasal)
-                # Kita perlu query kecil lagi untuk cari parent-nya karena UNION tadi memutus rantai
-                parent_info = session.run("""
-                    MATCH (n)-[:BERISI]-(p:Pasal) 
-                    WHERE elementId(n) = $node_id
-                    RETURN p.nomor AS nomor, p.judul AS judul
-                """, node_id=node.element_id).single()
-
-                if parent_info:
-                    print(f"   ✅ Ketemu via {source_method.upper()}: Pasal {parent_info['nomor']} (Score: {score:.2f})")
-                    
-                    results.append({
-                        "pasal": parent_info["nomor"],
-                        "judul": parent_info["judul"],
-                        "isi": node["teks"],
-                        "score": score
-                    })
-        
-        return results
\ No newline at end of file
+            # Kalau dibatasi ke 1 dokumen, kandidat ANN (dokumen besar) di-over-fetch karena sebagian
+            # akan tersaring. Di batch tidak ada putaran adaptif, cukup 1 kali over-fetch.
+            scope, candidates = None, top_k
+            if document:
+                size = self._scope_size(session, document, stats)
+                scope, candidates = self.scope.strategy(size, local_vector), self.scope.candidates(top_k)
+                stats["scope"] = {"document": document, "strategy": scope, "size": size, "candidates": candidates}
+
+            if self.vector_index is not None and self.vector_index.needs_sync(self.sync_interval):
+                with span("retrieval.index_sync"):
+                    stats["round_trips"] += self._sync_vector_index(session)
+
+            rows = []
+            for i, (query, vector) in enumerate(zip(queries, embedded.vectors)):
+                hits = []
+                if self.vector_index is not None and vector:
+                    # Index lokal bisa menyaring dokumen secara eksak, tanpa over-fetch
+                    with span("retrieval.local_vector"):
+                        hits = _vector_hits(self.vector_index, vector, top_k, documents)
+                keyword = build_keyword_query(query)
+                if document:
+                    keyword = build_scoped_keyword_query(keyword, document)
+                rows.append({"idx": i, "vector": vector or None, "hits": hits, "keyword": keyword})
+
+            cypher_query = build_batch_query(local_vector=local_vector, scope=scope)
+            for start in range(0, len(rows), self.batch_size):
+                with span("retrieval.neo4j"):
+                    records = list(session.run(cypher_query, queries=rows[start:start + self.batch_size],
+                                               candidates=candidates, document=document, top_k=top_k))
+                stats["round_trips"] += 1
+                stats["candidates"] += len(records)
+                for record in records:
+                    grouped[record["idx"]].append(record)
+
+        results = [self._fuse(grouped[i], top_k) for i in range(len(queries))]
+        print(f"   📶 [Retriever] {stats['round_trips']} round trip ke Neo4j untuk {len(queries)} pertanyaan.")
+        return results, stats
+
+    def _scope_size(self, session, document: str, stats: Dict) -> int:
+        size = self.scope.cached_size(document)
+        if size is None:
+            size = session.run(SCOPE_SIZE_QUERY, document=document).single()["size"]
+            self.scope.remember_size(document, size)
+            stats["round_trips"] += 1
+        return size
+
+    def _sync_vector_index(self, session) -> int:
+        """Samakan index lokal dengan dokumen di Neo4j. Mengembalikan jumlah round trip."""
+        index = self.vector_index
+        db_versions = {r["doc"]: r["version"] for r in session.run(DOC_VERSIONS_QUERY)}
+        changed, removed = index.stale_documents(db_versions)
+        for doc in changed:
+            rows = list(session.run(DOC_VECTORS_QUERY, doc=doc))
+            index.apply_document(doc, db_versions[doc], [r["id"] for r in rows], [r["embedding"] for r in rows])
+        for doc in removed:
+            index.remove_document(doc)
+        index.finish_sync()
+        if changed or removed:
+            print(f"🔄 [Retriever] Index lokal disinkron: {len(changed)} dokumen berubah, {len(removed)} dihapus.")
+        return 1 + len(changed)
+
+    @staticmethod
+    def _fuse(records, top_k: int) -> List[Dict]:
+        """Ranking ulang hasil vector & keyword dengan RRF, lalu ambil top_k."""
+        rows: Dict[str, Dict] = {}
+        matched_by: Dict[str, List[str]] = {}
+        ranked: Dict[str, List[str]] = {"vector": [], "keyword": []}
+
+        # Urutkan per kaki pencarian berdasarkan skor aslinya. Tiap kaki cukup top_k teratas,
+        # supaya kandidat over-fetch (pencarian per dokumen) tidak menggeser ranking RRF.
+        for record in sorted(records, key=lambda r: r["score"], reverse=True):
+            if len(ranked[record["source"]]) >= top_k:
+                continue
+            ayat_id = record["ayat_id"]
+            rows.setdefault(ayat_id, record)
+            matched_by.setdefault(ayat_id, []).append(record["source"])
+            ranked[record["source"]].append(ayat_id)
+
+        results = []
+        for ayat_id, score in reciprocal_rank_fusion(list(ranked.values()))[:top_k]:
+            record = rows[ayat_id]
+            methods = "+".join(matched_by[ayat_id]).upper()
+            print(f"   ✅ Ketemu via {methods}: Pasal {record['nomor']} (RRF Score: {score:.4f})")
+
+            results.append({
+                "pasal": record["nomor"],
+                "judul": record["judul"],
+                "isi": record["teks"],
+                "score": score,
+                "source_doc": record["source_doc"],
+                "doc_version": record["doc_version"],
+                "ayat_id": ayat_id,
+            })
+        return results
+
+
+class AsyncGraphRetriever:
+    """
+    Versi asyncio dari GraphRetriever untuk jalur serving async (src/api/main.py).
+    Query & logika fusion sama persis, hanya I/O-nya pakai AsyncDriver + AsyncOpenAI.
+    """
+
+    def __init__(self, driver: AsyncDriver, embedder: EmbeddingService = None,
+                 vector_index: MmapVectorIndex = None):
+        self.driver = driver
+        self.embedder = embedder or EmbeddingService()
+        self.vector_index = vector_index
+        self.sync_interval = float(os.getenv("VECTOR_INDEX_SYNC_SECONDS", "30"))
+        self.scope = ScopePolicy()
+
+    def invalidate_document(self, filename: str):
+        self.scope.invalidate_document(filename)
+
+    async def retrieve(self, query: str, top_k: int = 5, return_stats: bool = False, document: str = None):
+        with span("retrieval.embed_query"):
+            query_vector = await self.embedder.aget_embedding(query)
+        keyword_query = build_keyword_query(query)
+        local_vector = self.vector_index is not None
+
+        stats = {"round_trips": 0, "candidates": 0}
+
+        print(f"🔍 [AsyncRetriever] Mencari: '{query}'" + (f" di dokumen {document}" if document else ""))
+
+        async with self.driver.session() as session:
+            scope, candidates, size = None, top_k, None
+            if document:
+                size = self.scope.cached_size(document)
+                if size is None:
+                    result = await session.run(SCOPE_SIZE_QUERY, document=document)
+                    size = (await result.single())["size"]
+                    self.scope.remember_size(document, size)
+                    stats["round_trips"] += 1
+                scope, candidates = self.scope.strategy(size, local_vector), self.scope.candidates(top_k)
+                keyword_query = build_scoped_keyword_query(keyword_query, document)
+
+            vector_hits = []
+            if local_vector:
+                if self.vector_index.needs_sync(self.sync_interval):
+                    with span("retrieval.index_sync"):
+                        stats["round_trips"] += await self._sync_vector_index(session)
+                with span("retrieval.local_vector"):
+                    vector_hits = _vector_hits(self.vector_index, query_vector, top_k,
+                                               [document] if document else None)
+
+            cypher_query = build_hybrid_query(keyword_query, local_vector=local_vector, scope=scope)
+            while True:
+                with span("retrieval.neo4j"):
+                    result = await session.run(cypher_query,
+                                        query_vector=query_vector,
+                                        vector_hits=vector_hits,
+                                        keyword_query=keyword_query,
+                                        document=document,
+                                        candidates=candidates,
+                                        top_k=top_k)
+                    records = [record async for record in result]
+                stats["round_trips"] += 1
+                next_candidates = self.scope.next_candidates(scope, candidates, records, top_k, size) if scope else None
+                if next_candidates is None:
+                    break
+                candidates = next_candidates
+            stats["candidates"] = len(records)
+            if scope:
+                stats["scope"] = {"document": document, "strategy": scope, "size": size, "candidates": candidates}
+
+        results = GraphRetriever._fuse(records, top_k)
+        stats["results"] = len(results)
+
+        if return_stats:
+            return results, stats
+        return results
+
+    async def _sync_vector_index(self, session) -> int:
+        index = self.vector_index
+        result = await session.run(DOC_VERSIONS_QUERY)
+        db_versions = {r["doc"]: r["version"] async for r in result}
+        changed, removed = index.stale_documents(db_versions)
+        for doc in changed:
+            result = await session.run(DOC_VECTORS_QUERY, doc=doc)
+            rows = [r async for r in result]
+            index.apply_document(doc, db_versions[doc], [r["id"] for r in rows], [r["embedding"] for r in rows])
+        for doc in removed:
+            index.remove_document(doc)
+        index.finish_sync()
+        return 1 + len(changed)
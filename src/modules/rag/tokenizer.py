@@ -0,0 +1,50 @@
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken opsional, ada fallback perkiraan kasar
+    tiktoken = None
+
+# Encoding yang dipakai model embedding & chat OpenAI generasi sekarang
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=4)
+def _get_encoding(name: str):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception:
+        # Misal file BPE tidak bisa diunduh (offline)
+        return None
+
+
+def count_tokens(text: str, encoding_name: str = DEFAULT_ENCODING) -> int:
+    """
+    Menghitung jumlah token sebuah teks.
+    Kalau tiktoken tidak tersedia, pakai perkiraan ~3 karakter per token
+    (sengaja konservatif karena teks hukum Bahasa Indonesia banyak kata panjang).
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(encoding_name)
+    if encoding is None:
+        return len(text) // 3 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, encoding_name: str = DEFAULT_ENCODING, suffix: str = " ...") -> str:
+    """Potong teks (per kata) supaya tidak lebih dari max_tokens token, termasuk suffix."""
+    if count_tokens(text, encoding_name) <= max_tokens:
+        return text
+    words = text.split()
+    # Cari jumlah kata terbanyak yang masih muat (binary search)
+    low, high = 0, len(words)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:mid]) + suffix, encoding_name) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return " ".join(words[:low]) + suffix if low else ""
@@ -0,0 +1,293 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+# --- QUERY UNTUK EXPORT & SINKRONISASI DENGAN NEO4J ---
+EXPORT_COUNT_QUERY = """
+MATCH (a:Ayat) WHERE a.embedding IS NOT NULL
+RETURN count(a) AS n
+"""
+
+EXPORT_QUERY = """
+MATCH (a:Ayat) WHERE a.embedding IS NOT NULL
+RETURN elementId(a) AS id, a.source_doc AS doc, a.embedding AS embedding
+"""
+
+DOC_VERSIONS_QUERY = """
+MATCH (d:Document)
+RETURN d.filename AS doc, toString(d.ingested_at) AS version
+"""
+
+DOC_VECTORS_QUERY = """
+MATCH (a:Ayat {source_doc: $doc}) WHERE a.embedding IS NOT NULL
+RETURN elementId(a) AS id, a.embedding AS embedding
+"""
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def _train_ivf(vectors: np.ndarray, nlist: int, iterations: int = 10, sample_size: int = 50_000) -> np.ndarray:
+    """K-means (spherical) sederhana untuk membagi korpus jadi `nlist` partisi."""
+    rng = np.random.default_rng(42)
+    n = vectors.shape[0]
+    sample = np.asarray(vectors[rng.choice(n, size=min(n, sample_size), replace=False)])
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(nlist):
+            members = sample[assign == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+            else:
+                # Partisi kosong: isi ulang dengan titik acak
+                centroids[c] = sample[rng.integers(len(sample))]
+        centroids = _normalize_rows(centroids)
+    return centroids
+
+
+class MmapVectorIndex:
+    """
+    Index vektor lokal (in-process) untuk kaki vector search di GraphRetriever.
+
+    Isi folder index:
+    - vectors.f32  : matriks float32 [n, dim] (sudah dinormalisasi), dibaca via memory-map
+    - doc_idx.i32  : index dokumen tiap baris (untuk filter & invalidasi per dokumen)
+    - ids.txt      : elementId Ayat di Neo4j per baris (untuk hydration ke graph)
+    - meta.json    : dimensi, jumlah baris, daftar dokumen & versinya saat export
+    - ivf_*.f32/.i32 (opsional) : centroid & partisi untuk korpus besar
+
+    Sinkronisasi: dokumen yang versinya (Document.ingested_at) berubah setelah export
+    di-"tombstone" di matriks utama dan vektor barunya disimpan di overlay RAM.
+    Build ulang berkala akan merapikan overlay ini kembali ke file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+
+        self.dim = meta["dim"]
+        self.count = meta["count"]
+        self.docs: List[str] = meta["docs"]
+        self._doc_index = {doc: i for i, doc in enumerate(self.docs)}
+        self.doc_versions: Dict[str, Optional[str]] = dict(meta["doc_versions"])
+
+        if self.count:
+            self.vectors = np.memmap(os.path.join(path, "vectors.f32"), dtype=np.float32,
+                                     mode="r", shape=(self.count, self.dim))
+            self.doc_idx = np.memmap(os.path.join(path, "doc_idx.i32"), dtype=np.int32,
+                                     mode="r", shape=(self.count,))
+        else:
+            self.vectors = np.zeros((0, self.dim), dtype=np.float32)
+            self.doc_idx = np.zeros((0,), dtype=np.int32)
+        with open(os.path.join(path, "ids.txt"), encoding="utf-8") as f:
+            self.ids = [line.rstrip("\n") for line in f]
+
+        # IVF (opsional)
+        self.nlist = meta.get("nlist", 0)
+        self.nprobe = int(os.getenv("VECTOR_INDEX_NPROBE", str(max(1, self.nlist // 10))))
+        self._lists: List[np.ndarray] = []
+        if self.nlist:
+            self.centroids = np.fromfile(os.path.join(path, "ivf_centroids.f32"), dtype=np.float32).reshape(self.nlist, self.dim)
+            assign = np.memmap(os.path.join(path, "ivf_assign.i32"), dtype=np.int32, mode="r", shape=(self.count,))
+            order = np.argsort(assign, kind="stable")
+            bounds = np.searchsorted(assign[order], np.arange(self.nlist + 1))
+            self._lists = [order[bounds[c]:bounds[c + 1]] for c in range(self.nlist)]
+
+        # Overlay untuk dokumen yang berubah setelah export
+        self._lock = threading.Lock()
+        self._tombstoned: Set[int] = set()
+        self._overlay: Dict[str, Tuple[List[str], np.ndarray]] = {}
+        self._dirty: Set[str] = set()
+        self.last_sync = 0.0
+
+    # --- PENCARIAN ---
+    def search(self, query_vector: Sequence[float], top_k: int,
+               documents: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """Top-k (elementId, cosine score). `documents` membatasi ke dokumen tertentu."""
+        q = np.asarray(query_vector, dtype=np.float32)
+        q /= (np.linalg.norm(q) or 1.0)
+        allowed = set(documents) if documents is not None else None
+
+        with self._lock:
+            tombstoned = set(self._tombstoned)
+            overlay = dict(self._overlay)
+
+        hits: List[Tuple[str, float]] = []
+
+        # 1. Matriks utama (memory-mapped)
+        if self.count:
+            if allowed is not None:
+                # Scoped: brute-force semua baris dokumen itu. Jangan lewat IVF -- nprobe partisi
+                # terdekat bisa nyaris tak berisi baris dokumen ini, hasilnya kurang dari top_k.
+                allowed_idx = [self._doc_index[d] for d in allowed if d in self._doc_index]
+                rows = np.flatnonzero(np.isin(self.doc_idx, allowed_idx))
+            else:
+                rows = self._candidate_rows(q)
+            doc_of_rows = self.doc_idx[rows] if rows is not None else np.asarray(self.doc_idx)
+            mask = np.ones(len(doc_of_rows), dtype=bool)
+            if tombstoned:
+                mask &= ~np.isin(doc_of_rows, list(tombstoned))
+
+            matrix = self.vectors[rows] if rows is not None else self.vectors
+            scores = np.asarray(matrix @ q)
+            scores[~mask] = -np.inf
+            k = min(top_k, int(mask.sum()))
+            if k:
+                best = np.argpartition(-scores, k - 1)[:k]
+                for i in best:
+                    row = int(rows[i]) if rows is not None else int(i)
+                    hits.append((self.ids[row], float(scores[i])))
+
+        # 2. Overlay (dokumen yang diperbarui setelah export)
+        for doc, (ids, matrix) in overlay.items():
+            if allowed is not None and doc not in allowed:
+                continue
+            scores = matrix @ q
+            for i in np.argsort(-scores)[:top_k]:
+                hits.append((ids[int(i)], float(scores[i])))
+
+        hits.sort(key=lambda hit: hit[1], reverse=True)
+        return hits[:top_k]
+
+    def _candidate_rows(self, q: np.ndarray) -> Optional[np.ndarray]:
+        """Dengan IVF: baris dari `nprobe` partisi terdekat. Tanpa IVF: None (= semua baris)."""
+        if not self.nlist:
+            return None
+        probes = np.argsort(-(self.centroids @ q))[:self.nprobe]
+        return np.sort(np.concatenate([self._lists[c] for c in probes]))
+
+    # --- SINKRONISASI DENGAN INGEST ---
+    def mark_dirty(self, doc: str):
+        """Dipanggil listener ingest di proses yang sama: paksa cek ulang dokumen ini."""
+        with self._lock:
+            self._dirty.add(doc)
+
+    def needs_sync(self, interval: float) -> bool:
+        return bool(self._dirty) or time.time() - self.last_sync >= interval
+
+    def stale_documents(self, db_versions: Dict[str, Optional[str]]) -> Tuple[List[str], List[str]]:
+        """Bandingkan versi dokumen di Neo4j dengan yang diketahui index -> (berubah, dihapus)."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        changed = [doc for doc, version in db_versions.items()
+                   if doc in dirty or self.doc_versions.get(doc, "<baru>") != version]
+        removed = [doc for doc in self.doc_versions if doc not in db_versions]
+        return changed, removed
+
+    def apply_document(self, doc: str, version: Optional[str], ids: List[str], vectors: List[List[float]]):
+        matrix = _normalize_rows(np.asarray(vectors, dtype=np.float32)) if vectors else np.zeros((0, self.dim), np.float32)
+        with self._lock:
+            if doc in self._doc_index:
+                self._tombstoned.add(self._doc_index[doc])
+            self._overlay[doc] = (list(ids), matrix)
+            self.doc_versions[doc] = version
+
+    def remove_document(self, doc: str):
+        with self._lock:
+            if doc in self._doc_index:
+                self._tombstoned.add(self._doc_index[doc])
+            self._overlay.pop(doc, None)
+            self.doc_versions.pop(doc, None)
+
+    def finish_sync(self):
+        self.last_sync = time.time()
+
+    # --- BUILD DARI NEO4J ---
+    @classmethod
+    def build(cls, driver, path: str, nlist: int = 0, dim: int = 1536) -> "MmapVectorIndex":
+        """
+        Export semua embedding Ayat dari Neo4j ke folder `path` (ditulis ke folder
+        sementara dulu, lalu ditukar, supaya pembaca lain tidak melihat file setengah jadi).
+        """
+        tmp_path = path.rstrip("/\\") + ".building"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        with driver.session() as session:
+            # Versi dokumen diambil SEBELUM export: kalau ada ingest di tengah export,
+            # versinya terlihat "lebih baru" dan akan disinkron ulang saat dipakai.
+            doc_versions = {r["doc"]: r["version"] for r in session.run(DOC_VERSIONS_QUERY)}
+            total = session.run(EXPORT_COUNT_QUERY).single()["n"]
+
+            docs: List[str] = []
+            doc_index: Dict[str, int] = {}
+            count = 0
+            if total:
+                vectors = np.memmap(os.path.join(tmp_path, "vectors.f32"), dtype=np.float32, mode="w+", shape=(total, dim))
+                doc_idx = np.memmap(os.path.join(tmp_path, "doc_idx.i32"), dtype=np.int32, mode="w+", shape=(total,))
+            with open(os.path.join(tmp_path, "ids.txt"), "w", encoding="utf-8") as ids_file:
+                for record in session.run(EXPORT_QUERY):
+                    if count >= total:
+                        break  # Ayat baru masuk di tengah export, akan ikut via sinkronisasi
+                    doc = record["doc"]
+                    if doc not in doc_index:
+                        doc_index[doc] = len(docs)
+                        docs.append(doc)
+                    vectors[count] = _normalize_rows(np.asarray([record["embedding"]], dtype=np.float32))[0]
+                    doc_idx[count] = doc_index[doc]
+                    ids_file.write(record["id"] + "\n")
+                    count += 1
+
+        meta = {"dim": dim, "count": count, "docs": docs, "doc_versions": doc_versions,
+                "nlist": 0, "built_at": time.time()}
+        if count:
+            vectors.flush()
+            doc_idx.flush()
+            if nlist and count >= nlist * 10:
+                data = np.memmap(os.path.join(tmp_path, "vectors.f32"), dtype=np.float32, mode="r", shape=(count, dim))
+                centroids = _train_ivf(data, nlist)
+                centroids.tofile(os.path.join(tmp_path, "ivf_centroids.f32"))
+                assign = np.memmap(os.path.join(tmp_path, "ivf_assign.i32"), dtype=np.int32, mode="w+", shape=(count,))
+                for start in range(0, count, 50_000):
+                    assign[start:start + 50_000] = np.argmax(data[start:start + 50_000] @ centroids.T, axis=1)
+                assign.flush()
+                meta["nlist"] = nlist
+
+        with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        old_path = path.rstrip("/\\") + ".old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+        print(f"✅ [VectorIndex] {count} vektor dari {len(docs)} dokumen diekspor ke {path}"
+              + (f" (IVF {meta['nlist']} partisi)" if meta["nlist"] else ""))
+        return cls(path)
+
+
+if __name__ == "__main__":
+    project_root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../.."))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+    from dotenv import load_dotenv
+    from neo4j import GraphDatabase
+
+    load_dotenv()
+    arg_parser = argparse.ArgumentParser(description="Export embedding Ayat dari Neo4j ke index mmap lokal.")
+    arg_parser.add_argument("path", nargs="?", default=os.getenv("VECTOR_INDEX_PATH", "data/vector_index"))
+    arg_parser.add_argument("--nlist", type=int, default=0, help="Jumlah partisi IVF (0 = brute force)")
+    args = arg_parser.parse_args()
+
+    neo4j_driver = GraphDatabase.driver(os.getenv("NEO4J_URI"),
+                                        auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD")))
+    try:
+        MmapVectorIndex.build(neo4j_driver, args.path, nlist=args.nlist)
+    finally:
+        neo4j_driver.close()
@@ -0,0 +1,47 @@
+import pytest
+
+from src.modules.auditor import rules
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("1.500.000", 1_500_000),
+    ("1,500,000", 1_500_000),
+    ("500.000", 500_000),
+    ("1.250,75", 1250.75),
+    ("1,250.75", 1250.75),
+    ("0,5", 0.5),
+    ("1,5", 1.5),
+    ("0.5", 0.5),
+    # Bagian bulat 0: pemisah selalu desimal, walau diikuti 3 digit
+    ("0,125", 0.125),
+    ("0.125", 0.125),
+    ("12.", 12),
+])
+def test_parse_number(raw, expected):
+    assert rules.parse_number(raw) == pytest.approx(expected)
+
+
+def test_parse_number_invalid():
+    assert rules.parse_number(".,") is None
+
+
+def test_extract_pasal_refs():
+    assert rules.extract_pasal_refs("Lihat Pasal 5 ayat (2) dan pasal 12A.") == {"5", "12a"}
+
+
+def test_extract_amounts_normalizes_formats():
+    text = "Harga Rp 500 juta, uang muka Rp500.000.000, biaya 2.500.000 rupiah."
+    assert rules.extract_amounts(text) == {500_000_000, 2_500_000}
+
+
+def test_extract_percentages():
+    assert rules.extract_percentages("Denda 0,125% per hari, maksimal 5 (lima) persen.") == {0.125, 5.0}
+
+
+def test_extract_durations():
+    assert rules.extract_durations("paling lambat 30 (tiga puluh) hari atau 2 tahun") == {(30, "hari"), (2, "tahun")}
+
+
+def test_extract_dates():
+    text = "Serah terima 17 Agustus 2024, pelunasan 01/09/2024."
+    assert rules.extract_dates(text) == {(2024, 8, 17), (2024, 9, 1)}
@@ -0,0 +1,49 @@
+from src.modules.auditor.verifier import FAIL, INCONCLUSIVE, PASS, LocalVerifier
+
+CONTEXT = (
+    "PASAL: 5 | JUDUL: DENDA | DOKUMEN: kontrak.pdf\n"
+    "- Keterlambatan pembayaran dikenakan denda 0,125% per hari dari Rp 500.000.000.\n"
+    "- Denda dibayar paling lambat 30 (tiga puluh) hari sejak 17 Agustus 2024."
+)
+
+
+def verify(question, draft, trust_pass=True):
+    return LocalVerifier(trust_pass=trust_pass).verify(question, CONTEXT, draft).status
+
+
+def test_matching_values_pass():
+    draft = "Menurut Pasal 5, dendanya 0,125% per hari dari Rp 500 juta, dibayar paling lambat 30 hari."
+    assert verify("Berapa denda keterlambatan?", draft) == PASS
+
+
+def test_pass_is_downgraded_without_trust():
+    draft = "Menurut Pasal 5, dendanya 0,125% per hari."
+    assert verify("Berapa denda keterlambatan?", draft, trust_pass=False) == INCONCLUSIVE
+
+
+def test_unknown_pasal_fails():
+    assert verify("Berapa denda?", "Menurut Pasal 9, dendanya 0,125% per hari.") == FAIL
+
+
+def test_wrong_values_fail():
+    assert verify("Berapa denda?", "Menurut Pasal 5, dendanya 1% per hari.") == FAIL
+    assert verify("Kapan batasnya?", "Menurut Pasal 5, paling lambat 14 hari.") == FAIL
+    assert verify("Kapan?", "Menurut Pasal 5, sejak 18 Agustus 2024.") == FAIL
+
+
+def test_qualitative_claim_goes_to_critic():
+    # Tidak ada angka yang bisa dicek -> jangan lolos lokal, biar Critic LLM yang menilai
+    draft = "Menurut Pasal 5, penjual boleh membatalkan sepihak kapan saja."
+    assert verify("Apakah penjual boleh membatalkan perjanjian?", draft) == INCONCLUSIVE
+
+
+def test_value_question_without_values_is_inconclusive():
+    assert verify("Berapa denda keterlambatan?", "Menurut Pasal 5, ada denda keterlambatan.") == INCONCLUSIVE
+
+
+def test_draft_without_pasal_is_inconclusive():
+    assert verify("Berapa denda?", "Dendanya 0,125% per hari.") == INCONCLUSIVE
+
+
+def test_empty_draft_fails():
+    assert verify("Berapa denda?", "  ") == FAIL
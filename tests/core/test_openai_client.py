@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.core import openai_client
+from src.core.openai_client import AdaptiveLimiter, ResilientOpenAI, parse_reset
+
+
+@pytest.fixture(autouse=True)
+def fresh_traffic(monkeypatch):
+    # Limiter & budget per traffic itu singleton per proses; tiap test mulai dari nol
+    monkeypatch.setattr(openai_client, "_traffic", {})
+    monkeypatch.setenv("OPENAI_CHAT_CONCURRENCY", "2")
+    monkeypatch.setenv("OPENAI_CHAT_MAX_CONCURRENCY", "32")
+
+
+class SyncEndpoint:
+    def __init__(self, delay: float = 0.002):
+        self.delay = delay
+
+    def create(self, **kwargs):
+        time.sleep(self.delay)
+        return "ok"
+
+
+class AsyncEndpoint:
+    def __init__(self, delay: float = 0.002):
+        self.delay = delay
+
+    async def create(self, **kwargs):
+        await asyncio.sleep(self.delay)
+        return "ok"
+
+
+def make_client(endpoint, is_async: bool) -> ResilientOpenAI:
+    raw = SimpleNamespace(embeddings=endpoint, chat=SimpleNamespace(completions=endpoint))
+    return ResilientOpenAI(raw, is_async=is_async, max_retries=0)
+
+
+MESSAGES = [{"role": "user", "content": "Berapa denda keterlambatan?"}]
+
+
+def test_sync_limit_grows_while_saturated():
+    client = make_client(SyncEndpoint(), is_async=False)
+    limiter = openai_client.get_traffic("chat").limiter
+
+    def worker():
+        for _ in range(50):
+            client.chat.completions.create(model="m", messages=MESSAGES)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert limiter.limit > 2
+    assert limiter.in_flight == 0
+
+
+def test_async_limit_grows_while_saturated():
+    client = make_client(AsyncEndpoint(), is_async=True)
+    limiter = openai_client.get_traffic("chat").limiter
+
+    async def run():
+        await asyncio.gather(*(client.chat.completions.create(model="m", messages=MESSAGES) for _ in range(400)))
+
+    asyncio.run(run())
+    assert limiter.limit > 2
+    assert limiter.in_flight == 0
+
+
+def test_throttle_halves_once_per_cooldown():
+    limiter = AdaptiveLimiter("test", initial=16, cooldown=60)
+    limiter.on_throttle()
+    limiter.on_throttle()
+    assert limiter.limit == 8
+
+
+def test_success_below_limit_does_not_grow():
+    limiter = AdaptiveLimiter("test", initial=4)
+    limiter.acquire()
+    limiter.on_success()
+    limiter.release()
+    assert limiter.limit == 4
+
+
+@pytest.mark.parametrize("value, seconds", [("20ms", 0.02), ("1s", 1), ("6m0s", 360), ("1h2m3.5s", 3723.5), ("1.5", 1.5)])
+def test_parse_reset(value, seconds):
+    assert parse_reset(value) == pytest.approx(seconds)
+
+
+def test_parse_reset_empty():
+    assert parse_reset(None) is None
+    assert parse_reset("") is None
@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+from src.modules.ingestion.bulk_runner import BulkIngestionRunner, document_names, list_input_files
+
+
+def test_folder_names_are_relative_to_source(tmp_path):
+    for sub in ("2023", "2024"):
+        (tmp_path / sub).mkdir()
+        (tmp_path / sub / "kontrak.pdf").write_bytes(b"%PDF")
+    (tmp_path / "induk.pdf").write_bytes(b"%PDF")
+
+    files = list_input_files(str(tmp_path))
+    names = document_names(files, root=str(tmp_path))
+    assert sorted(names.values()) == ["2023/kontrak.pdf", "2024/kontrak.pdf", "induk.pdf"]
+
+
+def test_duplicate_basenames_without_root_are_rejected(tmp_path):
+    files = [str(tmp_path / "a" / "kontrak.pdf"), str(tmp_path / "b" / "kontrak.pdf")]
+    with pytest.raises(ValueError, match="kontrak.pdf"):
+        document_names(files)
+
+
+def test_missing_manifest_entry_is_recorded_as_failed(tmp_path):
+    checkpoint = tmp_path / "checkpoint.jsonl"
+    runner = BulkIngestionRunner(graph_store=None, checkpoint_path=str(checkpoint), workers={"extract": 1})
+
+    summary = runner.run([str(tmp_path / "hilang.pdf")])
+
+    assert summary["stages"]["extract"]["errors"] == 1
+    record = json.loads(checkpoint.read_text(encoding="utf-8").strip())
+    assert record["status"] == "failed"
+    assert record["key"].endswith("hilang.pdf")
@@ -0,0 +1,41 @@
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from src.modules.ingestion.cleaner import _correct_angle, deskew_array, estimate_skew
+
+
+def make_page(angle: float) -> np.ndarray:
+    """Halaman sintetis: baris-baris 'teks' hitam, diputar `angle` derajat (positif = berlawanan jarum jam)."""
+    page = np.full((1400, 1000, 3), 255, np.uint8)
+    for i in range(20):
+        y = 150 + i * 55
+        cv2.rectangle(page, (120, y), (880 - (i % 4) * 60, y + 18), (0, 0, 0), -1)
+    matrix = cv2.getRotationMatrix2D((500, 700), angle, 1.0)
+    return cv2.warpAffine(page, matrix, (1000, 1400), borderValue=(255, 255, 255))
+
+
+@pytest.mark.parametrize("raw, expected", [
+    # OpenCV < 4.5: [-90, 0)
+    (-90.0, 0.0), (-87.0, -3.0), (-3.0, 3.0),
+    # OpenCV >= 4.5: (0, 90]
+    (90.0, 0.0), (87.0, 3.0), (3.0, -3.0),
+])
+def test_correct_angle_normalizes_both_opencv_ranges(raw, expected):
+    assert _correct_angle(raw) == pytest.approx(expected)
+
+
+def test_upright_page_is_not_rotated():
+    page = make_page(0)
+    assert abs(estimate_skew(page)) < 0.3
+    rotated, _ = deskew_array(page, min_angle=0.3)
+    assert rotated is page
+
+
+@pytest.mark.parametrize("skew", [3, -3])
+def test_skewed_page_is_straightened(skew):
+    page = make_page(skew)
+    assert estimate_skew(page) == pytest.approx(-skew, abs=0.5)
+    rotated, _ = deskew_array(page, min_angle=0.3)
+    assert abs(estimate_skew(rotated)) < 0.5
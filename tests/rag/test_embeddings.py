@@ -0,0 +1,38 @@
+import asyncio
+import threading
+
+from benchmarks.fakes import FakeOpenAI
+from src.modules.rag.embeddings import EmbeddingService
+
+
+class RecordingCache:
+    """Cache palsu yang mencatat di thread mana ia dipanggil."""
+
+    def __init__(self):
+        self.threads = []
+        self.store = {}
+
+    def get_many(self, model, texts):
+        self.threads.append(threading.get_ident())
+        return {text: self.store[text] for text in texts if text in self.store}
+
+    def put_many(self, model, items):
+        self.threads.append(threading.get_ident())
+        self.store.update(items)
+
+
+def test_async_cache_access_runs_off_the_event_loop():
+    cache = RecordingCache()
+    embedder = EmbeddingService(client=FakeOpenAI(), async_client=FakeOpenAI(is_async=True), cache=cache)
+
+    async def run():
+        loop_thread = threading.get_ident()
+        first = await embedder.aget_embeddings(["Pasal 1 denda", "Pasal 2 harga"])
+        again = await embedder.aget_embeddings(["Pasal 1 denda"])
+        return loop_thread, first, again
+
+    loop_thread, first, again = asyncio.run(run())
+
+    assert first.ok and again.vectors[0] == first.vectors[0]
+    assert len(cache.threads) == 3  # get + put, lalu get (hit semua, tanpa put)
+    assert loop_thread not in cache.threads
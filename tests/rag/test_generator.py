@@ -0,0 +1,31 @@
+import time
+
+from benchmarks.fakes import FakeOpenAI
+from src.core.metrics import collect_timings, summarize_timings
+from src.modules.rag.generator import RAGGenerator
+
+CONTEXT = "PASAL: 5 | JUDUL: DENDA | DOKUMEN: kontrak.pdf\n- Denda 0,125% per hari."
+
+
+def test_stream_writer_span_excludes_consumer_time():
+    # API 50 ms, consumer lambat 20 ms per token: yang diukur hanya sisi API
+    generator = RAGGenerator(client=FakeOpenAI(chat_latency=0.05), async_client=FakeOpenAI(is_async=True))
+    with collect_timings() as timings:
+        tokens = 0
+        for _ in generator._writer_agent_stream("Berapa denda?", CONTEXT):
+            tokens += 1
+            time.sleep(0.02)
+    writer_ms = summarize_timings(timings)["generation.writer"]["ms"]
+
+    assert tokens >= 3
+    assert 40 <= writer_ms < 40 + tokens * 20 / 2
+
+
+def test_abandoned_stream_is_still_recorded():
+    generator = RAGGenerator(client=FakeOpenAI(), async_client=FakeOpenAI(is_async=True))
+    with collect_timings() as timings:
+        stream = generator._writer_agent_stream("Berapa denda?", CONTEXT)
+        next(stream)
+        time.sleep(0.05)
+        stream.close()
+    assert summarize_timings(timings)["generation.writer"]["ms"] < 50
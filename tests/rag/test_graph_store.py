@@ -0,0 +1,57 @@
+from src.modules.rag.graph_store import GraphStore
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        return self
+
+    def single(self):
+        return self.driver.record
+
+
+class FakeDriver:
+    def __init__(self, ayat, doc_hash="lama"):
+        self.record = {"doc_hash": doc_hash, "ayat": ayat}
+
+    def session(self):
+        return FakeSession(self)
+
+
+EXISTING = [{"source_pasal": "1", "urutan": 1, "content_hash": "h1"},
+            {"source_pasal": "2", "urutan": 1, "content_hash": "h2"}]
+
+
+def test_empty_parse_keeps_existing_document():
+    driver = FakeDriver(EXISTING)
+    store = GraphStore(driver=driver, embedder=object())
+
+    plan = store.plan_ingest("kontrak.pdf", [])
+
+    assert plan.skipped and plan.empty_parse
+    assert plan.deleted == []
+
+
+def test_force_allows_emptying_document():
+    driver = FakeDriver(EXISTING)
+    store = GraphStore(driver=driver, embedder=object())
+
+    plan = store.plan_ingest("kontrak.pdf", [], force=True)
+
+    assert not plan.skipped
+    assert len(plan.deleted) == 2
+    assert plan.pasal_list == []
+
+
+def test_empty_parse_of_new_document_is_not_blocked():
+    store = GraphStore(driver=FakeDriver([], doc_hash=None), embedder=object())
+    plan = store.plan_ingest("baru.pdf", [])
+    assert not plan.empty_parse
@@ -0,0 +1,63 @@
+import pytest
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.fakes import FakeOpenAI, MemoryGraph
+from src.modules.ingestion.parser import LegalDocParser
+from src.modules.rag.embeddings import EmbeddingCache, EmbeddingService
+from src.modules.rag.graph_store import GraphStore
+from src.modules.rag.retriever import GraphRetriever, build_scoped_keyword_query
+
+QUESTION = "Berapa denda keterlambatan pembayaran?"
+
+
+@pytest.fixture(scope="module")
+def retriever(tmp_path_factory):
+    # Banyak dokumen hampir identik: top-N full-text global habis oleh dokumen lain
+    cache = EmbeddingCache(str(tmp_path_factory.mktemp("cache") / "embeddings.sqlite"))
+    embedder = EmbeddingService(client=FakeOpenAI(), async_client=FakeOpenAI(is_async=True), cache=cache)
+    graph = MemoryGraph()
+    store = GraphStore(driver=graph, embedder=embedder)
+    parser = LegalDocParser()
+    for filename, text in generate_corpus(60, 6):
+        store.ingest_document(filename, parser.parse(text))
+    return GraphRetriever(graph, embedder=embedder)
+
+
+def keyword_records(retriever, monkeypatch, run):
+    """Jalankan `run()` dan kembalikan record kaki keyword yang dikirim backend."""
+    graph, seen = retriever.driver, []
+    dispatch = graph._dispatch
+
+    def recording(query, params):
+        records = dispatch(query, params)
+        seen.extend(r for r in records if isinstance(r, dict) and r.get("source") == "keyword")
+        return records
+
+    monkeypatch.setattr(graph, "_dispatch", recording)
+    run()
+    return seen
+
+
+@pytest.mark.parametrize("document", ["bench_ppjb_00000.pdf", "bench_ppjb_00059.pdf"])
+def test_scoped_keyword_leg_is_document_local(retriever, monkeypatch, document):
+    # Tiap dokumen harus dapat kandidat keyword sendiri, bukan hanya dokumen yang kebetulan teratas global
+    records = keyword_records(retriever, monkeypatch, lambda: retriever.retrieve(QUESTION, top_k=3, document=document))
+    assert len(records) == 3
+    assert {r["source_doc"] for r in records} == {document}
+
+    records = keyword_records(retriever, monkeypatch,
+                              lambda: retriever.retrieve_many([QUESTION], top_k=3, document=document))
+    assert len(records) == 3
+    assert {r["source_doc"] for r in records} == {document}
+
+
+def test_scoped_batch_matches_single_query(retriever):
+    document = "bench_ppjb_00059.pdf"
+    batch, _ = retriever.retrieve_many([QUESTION], top_k=3, document=document)
+    single = retriever.retrieve(QUESTION, top_k=3, document=document)
+    assert [r["ayat_id"] for r in batch[0]] == [r["ayat_id"] for r in single]
+
+
+def test_scoped_keyword_query_escapes_document():
+    assert build_scoped_keyword_query("denda OR bunga", 'a"b\\c.pdf') == '+source_doc:"a\\"b\\\\c.pdf" +teks:(denda OR bunga)'
+    assert build_scoped_keyword_query("", "kontrak.pdf") == ""
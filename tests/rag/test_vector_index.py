@@ -0,0 +1,58 @@
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.modules.rag.vector_index import MmapVectorIndex, _normalize_rows
+
+
+def write_index(path, vectors, doc_idx, docs, nlist):
+    """Tulis folder index langsung (tanpa Neo4j), partisi IVF = centroid terdekat."""
+    vectors = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+    rng = np.random.default_rng(0)
+    centroids = _normalize_rows(rng.normal(size=(nlist, vectors.shape[1])).astype(np.float32))
+    vectors.tofile(os.path.join(path, "vectors.f32"))
+    np.asarray(doc_idx, dtype=np.int32).tofile(os.path.join(path, "doc_idx.i32"))
+    centroids.tofile(os.path.join(path, "ivf_centroids.f32"))
+    np.argmax(vectors @ centroids.T, axis=1).astype(np.int32).tofile(os.path.join(path, "ivf_assign.i32"))
+    with open(os.path.join(path, "ids.txt"), "w", encoding="utf-8") as f:
+        f.writelines(f"ayat-{i}\n" for i in range(len(vectors)))
+    meta = {"dim": vectors.shape[1], "count": len(vectors), "docs": docs,
+            "doc_versions": {doc: "v1" for doc in docs}, "nlist": nlist}
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setenv("VECTOR_INDEX_NPROBE", "1")
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(400, 16))
+    doc_idx = [0] * 380 + [1] * 20  # dokumen kecil tersebar di banyak partisi
+    write_index(str(tmp_path), vectors, doc_idx, ["besar.pdf", "kecil.pdf"], nlist=16)
+    return MmapVectorIndex(str(tmp_path))
+
+
+def test_scoped_search_is_exact_despite_ivf(index):
+    q = np.random.default_rng(2).normal(size=16)
+    hits = index.search(q, top_k=10, documents=["kecil.pdf"])
+
+    rows = np.arange(380, 400)
+    scores = np.asarray(index.vectors[rows]) @ (q / np.linalg.norm(q))
+    expected = [f"ayat-{rows[i]}" for i in np.argsort(-scores)[:10]]
+    assert [hit_id for hit_id, _ in hits] == expected
+
+
+def test_scoped_search_skips_tombstoned_and_unknown_documents(index):
+    q = np.ones(16)
+    index.remove_document("kecil.pdf")
+    assert index.search(q, top_k=5, documents=["kecil.pdf"]) == []
+    assert index.search(q, top_k=5, documents=["tidak-ada.pdf"]) == []
+
+
+def test_unscoped_search_uses_ivf_probes(index):
+    q = np.random.default_rng(3).normal(size=16)
+    hits = index.search(q, top_k=5)
+    assert 0 < len(hits) <= 5